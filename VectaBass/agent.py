@@ -1,17 +1,44 @@
+from .async_chat_strategy import AsyncChat, AsyncOpenAIStrategy
 from .chat_strategy import Chat, OpenAIStrategy
+from .completions_strategy import AsyncChatCompletionsStrategy, ChatCompletionsStrategy
 from .pub_sub_manager import PubSub
 
+# chat_api -> (sync strategy, async strategy)
+STRATEGIES = {
+    "assistants": (OpenAIStrategy, AsyncOpenAIStrategy),
+    "chat_completions": (ChatCompletionsStrategy, AsyncChatCompletionsStrategy),
+}
+
 
 class Agent:
 
-    def __init__(self, parent) -> None:
+    def __init__(self, parent, asynchronous=False, client=None) -> None:
         self.parent = parent
-        self.chat = Chat(OpenAIStrategy(parent))
+        chat_api = getattr(parent, "chat_api", "assistants")
+        if chat_api not in STRATEGIES:
+            raise ValueError(f"chat_api must be one of {tuple(STRATEGIES)}, got {chat_api!r}")
+        strategy, async_strategy = STRATEGIES[chat_api]
+        if asynchronous:
+            self.chat = AsyncChat(async_strategy(parent, client=client))
+        else:
+            self.chat = Chat(strategy(parent, client=client))
         self.pubsub = PubSub()
-        self.pubsub.subscribe(f"print_message_{self.parent.name}", self.print_message)
+        # Printing happens on the PubSub pool so a slow terminal never holds up the message queue;
+        # weak so the subscription does not keep a forgotten agent alive
+        self.pubsub.subscribe(f"print_message_{self.parent.name}", self.print_message, mode="thread", weak=True)
+
+    def start(self):
+        # Returns a coroutine when the agent is asynchronous
+        return self.chat.start()
+
+    def close(self, delete_thread=False):
+        # Returns a coroutine when the agent is asynchronous
+        self.pubsub.unsubscribe(f"print_message_{self.parent.name}", self.print_message)
+        return self.chat.close(delete_thread)
 
     def send_message(self, message):
-        self.chat.send_message(message)
+        # Returns a coroutine when the agent is asynchronous
+        return self.chat.send_message(message)
 
     def print_message(self, message):
         print(self)
@@ -1,27 +1,95 @@
 # base_manager.py
+import asyncio
 import uuid
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from ..registry import Registry, ManagerRegistry
 from ..agent import Agent
 
-import logging
 
-# Set up logging
-logging.basicConfig(
-    filename="system_log.log",
-    filemode="w",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-)
+class BaseManager:
+    """Construction is local only: tools are registered and their schema built, nothing is sent.
 
+    `start()` (or `await astart()`) looks the assistant up and pushes the settled schema in one write.
+    Managers that are never started explicitly start on their first message.
 
-class BaseManager:
-    def __init__(self, name: str, identifier=None):
+    `close()` (or `await aclose()`, or leaving a `with`/`async with` block) unsubscribes the agent,
+    drops its registry entries and the assistant cached in memory, and optionally deletes its remote
+    thread. Only weak references to a manager are kept globally, so one that is simply dropped is
+    reclaimed as well, cached assistant included.
+    """
+
+    # Lifecycle methods, never exposed to the model as tools
+    _reserved_methods = frozenset({"start", "astart", "close", "aclose"})
+    # "assistants" (threads and runs) or "chat_completions" (local history, one request per turn)
+    chat_api = "assistants"
+
+    def __init__(self, name: str, identifier=None, asynchronous=False, client=None, chat_api=None):
         self.identifier = identifier or uuid.uuid4().hex
         self.name = f"{name}_{self.identifier}"
-        self.assistant_manager = Agent(self)
+        self.asynchronous = asynchronous
+        if chat_api is not None:
+            self.chat_api = chat_api
+        self.closed = False
+        self.assistant_manager = Agent(self, asynchronous=asynchronous, client=client)
+        cache = getattr(self.assistant_manager.chat.strategy, "assistant_cache", None)
+        # Runs on close, or when the manager is collected; holds the cache and name, not the manager.
+        # Only the live assistant goes, its stored id serves the next process with the same identifier
+        self._evict_assistant = weakref.finalize(self, cache.evict, self.name) if cache is not None else None
         self.registry = Registry(self)
         ManagerRegistry.add_manager(self)
 
+    def start(self):
+        if self.asynchronous:
+            raise RuntimeError(f"{self.name} is asynchronous, use `await astart()`")
+        self.assistant_manager.start()
+        return self
+
+    async def astart(self):
+        if self.asynchronous:
+            await self.assistant_manager.start()
+        else:
+            await asyncio.to_thread(self.assistant_manager.start)
+        return self
+
+    def close(self, delete_thread=False):
+        if self.asynchronous:
+            raise RuntimeError(f"{self.name} is asynchronous, use `await aclose()`")
+        if not self.closed:
+            self.assistant_manager.close(delete_thread)
+            self._release()
+
+    async def aclose(self, delete_thread=False):
+        if self.closed:
+            return
+        if self.asynchronous:
+            await self.assistant_manager.close(delete_thread)
+        else:
+            await asyncio.to_thread(self.assistant_manager.close, delete_thread)
+        self._release()
+
+    def _release(self):
+        self.closed = True
+        self.registry.clear()
+        if self._evict_assistant is not None:
+            self._evict_assistant()
+        dispatcher = getattr(self.assistant_manager.chat.strategy, "dispatcher", None)
+        if dispatcher is not None:
+            dispatcher.encoder.forget(self)
+        ManagerRegistry.remove_manager(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
     def _instructions(self):
         return ""
 
@@ -47,3 +115,25 @@ class BaseManager:
     # def get_list_of_agents(self):
     #     """Returns the names of all available agents to message"""
     #     return ManagerRegistry.managers.keys()
+
+
+def boot_many(managers, max_workers=32):
+    """Start many synchronous managers concurrently. Returns them in the order given."""
+    managers = list(managers)
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="vectabass-boot") as pool:
+        # Through the instance, so subclasses overriding start() are honoured
+        list(pool.map(lambda manager: manager.start(), managers))
+    return managers
+
+
+async def aboot_many(managers, max_concurrency=64):
+    """Start many managers, sync or async, concurrently from an event loop."""
+    managers = list(managers)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def start(manager):
+        async with semaphore:
+            await manager.astart()
+
+    await asyncio.gather(*(start(manager) for manager in managers))
+    return managers
@@ -0,0 +1,71 @@
+# argument_binder.py
+import inspect
+import weakref
+from typing import Any, get_type_hints
+
+from pydantic import ConfigDict, TypeAdapter
+from typing_extensions import NotRequired, Required, TypedDict
+
+# function -> {annotation key: ArgumentBinder}, shared by every instance exposing the same method
+_binder_cache = weakref.WeakKeyDictionary()
+
+
+class ArgumentBinder:
+    """Validates a tool call's JSON arguments against a method signature in a single parse.
+
+    The signature is compiled once into a TypedDict behind a pydantic TypeAdapter, so nested models,
+    `list[Model]`, `dict[str, Model]`, enums and other generics are all built by pydantic-core. Keys
+    are the parameter names as they are, so names a model could not take as fields (`model_config`,
+    `_private`, `json`, `schema`) bind like any other.
+    """
+
+    def __init__(self, name, method, annotations=None):
+        signature = inspect.signature(method)
+        hints = resolve_annotations(method, annotations)
+        fields = {}
+        accepts_extra = False
+        for param_name, param in signature.parameters.items():
+            if param.kind == param.VAR_KEYWORD:
+                accepts_extra = True
+                continue
+            if param.kind == param.VAR_POSITIONAL:
+                continue
+            hint = hints.get(param_name, Any)
+            # Omitted defaults are left to the method itself
+            fields[param_name] = Required[hint] if param.default is param.empty else NotRequired[hint]
+
+        arguments = TypedDict(f"{name}_arguments", fields)
+        arguments.__pydantic_config__ = ConfigDict(arbitrary_types_allowed=True, extra="allow" if accepts_extra else "forbid")
+        self.adapter = TypeAdapter(arguments)
+
+    @classmethod
+    def for_method(cls, method, annotations=None):
+        func = getattr(method, "__func__", method)
+        key = tuple(sorted((name, repr(value)) for name, value in (annotations or {}).items()))
+        try:
+            binders = _binder_cache.setdefault(func, {})
+        except TypeError:
+            # Not weak-referenceable, compile without caching
+            return cls(func.__name__, method, annotations)
+        if key not in binders:
+            binders[key] = cls(func.__qualname__.replace(".", "_"), method, annotations)
+        return binders[key]
+
+    def bind(self, arguments):
+        """Return the keyword arguments for the call; only the ones the model actually sent."""
+        if isinstance(arguments, (str, bytes)):
+            return self.adapter.validate_json(arguments or "{}")
+        return self.adapter.validate_python(arguments)
+
+
+def resolve_annotations(method, annotations=None):
+    """Resolved type hints of a method, with registry overrides (e.g. a linked model) applied on top."""
+    try:
+        hints = get_type_hints(method)
+    except Exception:
+        hints = dict(getattr(method, "__annotations__", {}))
+    hints.pop("return", None)
+    for name, value in (annotations or {}).items():
+        if name != "return" and not isinstance(value, str):
+            hints[name] = value
+    return hints
@@ -0,0 +1,78 @@
+# assistant_cache.py
+import hashlib
+import json
+import threading
+
+from .stores import MemoryStore
+from .telemetry import count
+
+
+def normalise_tool(tool):
+    if hasattr(tool, "model_dump"):
+        return tool.model_dump(mode="json", exclude_none=True)
+    return tool
+
+
+def assistant_fingerprint(instructions, model, tools):
+    """Content hash over everything get_assistant pushes, so no-op updates can be skipped."""
+    tools = sorted((normalise_tool(tool) for tool in tools or []), key=lambda tool: json.dumps(tool, sort_keys=True, default=str))
+    payload = json.dumps({"instructions": instructions, "model": model, "tools": tools}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CachedAssistant:
+    def __init__(self, assistant_id, fingerprint, assistant=None):
+        self.id = assistant_id
+        self.fingerprint = fingerprint
+        self.assistant = assistant
+
+
+class AssistantCache:
+    """Maps BaseManager names to assistant ids and the fingerprint of the last write.
+
+    Live assistant objects are kept in memory only; the optional store persists ids and
+    fingerprints so a fresh process needs a single retrieve instead of a full listing.
+    """
+
+    _shared = None
+
+    def __init__(self, store=None):
+        self.store = store or MemoryStore()
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def shared(cls):
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def get(self, name):
+        with self.lock:
+            entry = self.entries.get(name)
+        if entry is not None:
+            count("assistant_cache.hits")
+            return entry
+        stored = self.store.get(name)
+        if stored is None:
+            count("assistant_cache.misses")
+            return None
+        count("assistant_cache.hits", source="store")
+        return CachedAssistant(stored["id"], stored["fingerprint"])
+
+    def put(self, name, assistant, fingerprint):
+        with self.lock:
+            previous = self.entries.get(name)
+            self.entries[name] = CachedAssistant(assistant.id, fingerprint, assistant)
+        if previous is None or (previous.id, previous.fingerprint) != (assistant.id, fingerprint):
+            self.store.set(name, {"id": assistant.id, "fingerprint": fingerprint})
+
+    def evict(self, name):
+        """Drop the live assistant kept in memory; the stored id stays for the next process."""
+        with self.lock:
+            self.entries.pop(name, None)
+
+    def forget(self, name):
+        with self.lock:
+            self.entries.pop(name, None)
+        self.store.delete(name)
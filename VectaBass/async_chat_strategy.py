@@ -0,0 +1,226 @@
+import asyncio
+import logging
+from .client_pool import ClientPool
+from .chat_strategy import BaseAssistantsStrategy, NotGiven, is_not_found
+from .run_completion import AsyncPollingCompletion
+from .telemetry import span
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncOpenAIStrategy(BaseAssistantsStrategy):
+    """Coroutine based counterpart of OpenAIStrategy, so one event loop can drive many agents.
+
+    Construction does no network work. The thread and assistant are set up by `init_chat`, or lazily
+    by the first `send_message`. Tool schemas handed to `add_tool` are held until the next sync.
+    """
+
+    def __init__(
+        self, parent, completion=None, dispatcher=None, assistant_cache=None, client=None, thread_pool=None, session_store=None, compaction=None, tool_selector=None
+    ) -> None:
+        super().__init__(parent, dispatcher, assistant_cache, thread_pool, session_store, compaction, tool_selector)
+        # Runs are charged against the tokens per minute budget for the thread they process
+        self.client = client or ClientPool.shared().client(key=parent.name, priority=getattr(parent, "priority", 0), asynchronous=True, thread_tokens=self.thread_tokens)
+        self.completion = completion or AsyncPollingCompletion()
+        self.run_lock = asyncio.Lock()
+
+    async def init_chat(self):
+        await self.sync_assistant()
+
+    async def start(self):
+        await self.sync_assistant()
+        return self.assistant
+
+    async def ensure_ready(self):
+        if self.thread is None:
+            self.thread = await self.open_thread(self.session_key)
+        if self.assistant is None or self.pending_tools is not None:
+            await self.sync_assistant()
+
+    async def sync_assistant(self):
+        tool_schema, tools_to_remove = self.take_pending_tools()
+        self.assistant = await self.get_assistant(assistant_name=self.manager.name, tool_schema=tool_schema, tools_to_remove=tools_to_remove)
+
+    async def add_message_to_thread(self, thread_id, message, role="user", pinned=False):
+        with span("message.add"):
+            added = await self.client.beta.threads.messages.create(**self.message_request(thread_id, message, role, pinned))
+        return self.message_added(thread_id, message, added, pinned)
+
+    async def create_thread(self):
+        return await self.client.beta.threads.create()
+
+    async def open_thread(self, session_key=None):
+        thread = None
+        if session_key is not None:
+            thread_id = self.session_store.get(self.manager.name, session_key)
+            if thread_id is not None:
+                try:
+                    thread = await self.client.beta.threads.retrieve(thread_id)
+                except Exception as e:
+                    if not is_not_found(e):
+                        raise
+                    self.session_store.forget(self.manager.name, session_key)
+        if thread is None:
+            # The pool never blocks on the network, an empty pool just means creating one here
+            thread = self.thread_pool.take() if self.thread_pool is not None else None
+            if thread is None:
+                thread = await self.create_thread()
+            if session_key is not None:
+                self.session_store.put(self.manager.name, session_key, thread.id)
+        return thread
+
+    async def close(self, delete_thread=False):
+        # Waits for the run in progress, if any
+        async with self.run_lock:
+            thread, self.thread = self.thread, None
+            if delete_thread and thread is not None:
+                try:
+                    await self.client.beta.threads.delete(thread.id)
+                except Exception as e:
+                    if not is_not_found(e):
+                        raise
+                if self.session_key is not None:
+                    self.session_store.forget(self.manager.name, self.session_key)
+            self.forget_conversation()
+
+    def get_thread(self):
+        # None until the first message opens the conversation
+        return self.thread
+
+    def set_thread(self, thread):
+        self.switch_thread(thread)
+
+    async def send_message(self, message, direct=False):
+        # One active run per thread; asyncio.Lock wakes waiters in FIFO order so messages keep their order
+        async with self.run_lock:
+            await self.ensure_ready()
+            await self.run_turn(self.thread, [message], direct)
+            await self.maybe_compact(self.thread)
+
+    async def run_turn(self, thread, messages, direct=False, channel=None):
+        for message in messages:
+            await self.add_message_to_thread(thread.id, message)
+        await self.run_thread(thread.id, self.run_tools(messages, direct), channel=channel)
+        return await self.print_responses(thread_id=thread.id, channel=channel)
+
+    async def maybe_compact(self, thread):
+        if not self.compaction_due(thread):
+            return thread
+        return await self.compact_thread(thread)
+
+    async def compact_thread(self, thread):
+        messages = await self.list_messages(thread.id)
+        seed, carried, dropped = self.compaction_seed(messages)
+        if seed is None:
+            return thread
+        compacted = await self.client.beta.threads.create(messages=seed)
+        self.adopt_compacted(thread, compacted)
+        newest = (await self.client.beta.threads.messages.list(compacted.id, order="desc", limit=1)).data
+        return self.thread_compacted(thread, compacted, messages, seed, newest, carried, dropped)
+
+    async def list_messages(self, thread_id, limit=100):
+        messages, params = [], {"order": "asc", "limit": limit}
+        while True:
+            page = await self.client.beta.threads.messages.list(thread_id, **params)
+            messages.extend(page.data)
+            if not self.next_page(page, params):
+                return messages
+
+    async def run_thread(self, thread_id, tools, max_retries=3, retry_delay=1, channel=None):
+        on_event = self.run_event_handler(channel)
+        run = None
+        for attempt in range(1, max_retries + 1):
+            run = await self.completion.run(self.client, thread_id, self.assistant.id, tools, self.process_tool_calls, on_event=on_event)
+            if self.run_settled(run, attempt, max_retries):
+                break
+            await asyncio.sleep(retry_delay)
+        return run
+
+    def add_tool(self, config, tools_to_remove=[]):
+        # Called synchronously by the Registry, so only record the latest schema here
+        self.defer_tools(config, tools_to_remove)
+
+    async def get_assistant(self, assistant_name="tester_app", tool_schema=NotGiven(), tools_to_remove=[]):
+        try:
+            cached = self.assistant_cache.get(assistant_name)
+            assistant = cached.assistant if cached else None
+            if cached and assistant is None:
+                try:
+                    assistant = await self.client.beta.assistants.retrieve(cached.id)
+                except Exception as e:
+                    if not is_not_found(e):
+                        raise
+                    self.assistant_cache.forget(assistant_name)
+                    cached = None
+            if assistant is None:
+                assistant = await self.find_assistant(assistant_name)
+
+            if assistant is not None:
+                fingerprint, update = self.assistant_update(assistant, cached, tool_schema, tools_to_remove)
+                if update is not None:
+                    logger.info("Found existing assistant: %s", assistant_name)
+                    assistant = await self.client.beta.assistants.update(**update)
+                self.assistant_cache.put(assistant_name, assistant, fingerprint)
+                return assistant
+
+            logger.info("Creating new assistant: %s", assistant_name)
+            request = self.assistant_request(assistant_name, tool_schema)
+            return self.assistant_created(assistant_name, await self.client.beta.assistants.create(**request), request)
+
+        except Exception as e:
+            logger.error("An error occurred while syncing assistant %s: %s", assistant_name, e)
+            return None
+
+    async def find_assistant(self, assistant_name):
+        params = {"limit": 100}
+        while True:
+            page = await self.client.beta.assistants.list(**params)
+            assistant = self.matching_assistant(page, assistant_name)
+            if assistant is not None or not self.next_page(page, params):
+                return assistant
+
+    async def process_tool_calls(self, required_action):
+        return await self.dispatcher.adispatch(self.manager, required_action.submit_tool_outputs.tool_calls)
+
+    async def print_responses(self, thread_id, limit=20, channel=None) -> str:
+        with span("messages.fetch"):
+            messages = await self.new_messages(thread_id, limit=limit)
+        return self.publish_replies(messages, channel)
+
+    async def new_messages(self, thread_id, limit=20):
+        params, follow = self.new_messages_request(thread_id, limit)
+        messages = []
+        while True:
+            page = await self.client.beta.threads.messages.list(thread_id, **params)
+            messages.extend(page.data)
+            if not follow or not self.next_page(page, params):
+                return self.messages_seen(thread_id, messages)
+
+
+class AsyncChat:
+    def __init__(self, strategy: AsyncOpenAIStrategy) -> None:
+        self.strategy = strategy
+
+    async def send_message(self, message, direct=False):
+        return await self.strategy.send_message(message, direct)
+
+    def add_tool(self, config, tools_to_remove):
+        self.strategy.add_tool(config, tools_to_remove)
+
+    async def init_chat(self):
+        await self.strategy.init_chat()
+
+    async def start(self):
+        return await self.strategy.start()
+
+    async def close(self, delete_thread=False):
+        await self.strategy.close(delete_thread)
+
+    def get_thread(self):
+        return self.strategy.get_thread()
+
+    def set_thread(self, thread):
+        self.strategy.set_thread(thread)
+
+    async def add_message(self, thread, message):
+        await self.strategy.add_message_to_thread(thread.id, message=message)
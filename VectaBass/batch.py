@@ -0,0 +1,271 @@
+# batch.py
+"""
+Offline mode: push a large number of independent prompts through one agent with batch jobs.
+
+Each prompt becomes one `/v1/chat/completions` request carrying the agent's instructions and the
+Registry's tools, packed by `requests_per_batch` into a JSONL file and submitted as a batch job.
+The Assistants API has no batch support, so this goes through the same chat format as the
+ChatCompletionsStrategy. Tool calls in the answers are dispatched in process, spread over a thread
+pool across prompts, and the conversations that need another round go out in a follow-up batch.
+
+Results come back from `run` as a generator, in input order or as they complete. With a checkpoint
+path every submitted batch, tool round and result is appended to a JSONL log, and a runner started
+again on the same log and prompts picks up the batches still in flight instead of resubmitting.
+"""
+import io
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from .client_pool import ClientPool
+from .completions_strategy import DEFAULT_INSTRUCTIONS
+from .run_completion import Backoff
+from .tool_dispatch import ToolDispatcher
+from .tool_selection import select_tools
+
+ENDPOINT = "/v1/chat/completions"
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def read_prompts(source):
+    """Prompts from an iterable or a JSONL file, as (custom_id, prompt) pairs."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, encoding="utf-8") as f:
+            source = [json.loads(line) for line in f if line.strip()]
+    for index, prompt in enumerate(source):
+        if isinstance(prompt, dict):
+            yield str(prompt.get("custom_id", index)), prompt["prompt"]
+        else:
+            yield str(index), prompt
+
+
+def tool_call_object(tool_call):
+    # Batch output is plain JSON, the dispatcher reads tool calls as attributes
+    function = tool_call["function"]
+    return SimpleNamespace(id=tool_call["id"], function=SimpleNamespace(name=function["name"], arguments=function["arguments"]))
+
+
+class BatchItem:
+    __slots__ = ("custom_id", "prompt", "messages", "round", "reply", "error", "done")
+
+    def __init__(self, custom_id, prompt):
+        self.custom_id = custom_id
+        self.prompt = prompt
+        self.messages = [{"role": "user", "content": prompt}]
+        # Completions already applied to `messages`
+        self.round = 0
+        self.reply = None
+        self.error = None
+        self.done = False
+
+    def result(self):
+        return {"custom_id": self.custom_id, "prompt": self.prompt, "reply": self.reply, "error": self.error}
+
+
+class BatchCheckpoint:
+    """Append only JSONL log of a batch run, replayed when the run is resumed."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def events(self):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, encoding="utf-8") as f:
+            events = []
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    # A line cut short by the interruption
+                    break
+            return events
+
+    def write(self, event, **fields):
+        line = json.dumps({"event": event, **fields}) + "\n"
+        with self.lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+            f.flush()
+
+
+class BatchRunner:
+    """Runs prompts through `manager` with batch jobs.
+
+    `max_tool_rounds` bounds the follow-up batches a prompt may need; a prompt still calling tools
+    after that ends with an error, as does one whose request failed in the batch.
+    """
+
+    def __init__(
+        self,
+        manager,
+        client=None,
+        model="gpt-3.5-turbo",
+        requests_per_batch=1_000,
+        max_workers=16,
+        max_tool_rounds=8,
+        checkpoint=None,
+        backoff=None,
+        timeout=24 * 3600.0,
+        sleep=time.sleep,
+    ):
+        self.manager = manager
+        self.client = client or ClientPool.shared().client(key=manager.name, priority=getattr(manager, "priority", 0))
+        self.model = model
+        self.requests_per_batch = requests_per_batch
+        self.max_workers = max_workers
+        self.max_tool_rounds = max_tool_rounds
+        self.checkpoint = BatchCheckpoint(checkpoint) if isinstance(checkpoint, (str, os.PathLike)) else checkpoint
+        self.backoff = backoff or Backoff(initial=0.5, maximum=30.0)
+        self.timeout = timeout
+        self.sleep = sleep
+        self.dispatcher = ToolDispatcher.shared()
+        self.tool_selector = getattr(manager, "tool_selector", None)
+
+    def run(self, prompts, ordered=True):
+        """Yield one result dict per prompt: custom_id, prompt, reply and error."""
+        items = {}
+        for custom_id, prompt in read_prompts(prompts):
+            if custom_id in items:
+                raise ValueError(f"Duplicate custom_id {custom_id}.")
+            items[custom_id] = BatchItem(custom_id, prompt)
+        in_flight = self._resume(items)
+        order = list(items.values())
+        position = 0
+        instructions = self.manager._instructions() or DEFAULT_INSTRUCTIONS
+        tools = self.manager.registry.generate_json_schema()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="batch-tools") as pool:
+            if not ordered:
+                # Finished before the interruption
+                for item in order:
+                    if item.done:
+                        yield item.result()
+            while True:
+                busy = {custom_id for _, rounds in in_flight for custom_id in rounds}
+                waiting = [item for item in order if not item.done and item.custom_id not in busy]
+                in_flight.extend(self._submit(waiting, instructions, tools))
+                if not in_flight:
+                    break
+                batch, rounds = self._wait(in_flight)
+                in_flight.remove((batch.id, rounds))
+                finished = self._collect(batch, rounds, items, pool)
+                if ordered:
+                    while position < len(order) and order[position].done:
+                        yield order[position].result()
+                        position += 1
+                else:
+                    for item in finished:
+                        yield item.result()
+            if ordered:
+                for item in order[position:]:
+                    yield item.result()
+
+    def run_to_file(self, prompts, path, ordered=True):
+        """Write the results of `run` to a JSONL file, returning how many were written."""
+        count = 0
+        with open(path, "w", encoding="utf-8") as f:
+            for result in self.run(prompts, ordered):
+                f.write(json.dumps(result) + "\n")
+                count += 1
+        return count
+
+    def _resume(self, items):
+        # Replay the checkpoint, returning the batches submitted but not collected yet
+        if self.checkpoint is None:
+            return []
+        submitted = {}
+        for event in self.checkpoint.events():
+            kind = event["event"]
+            item = items.get(event.get("custom_id"))
+            if kind == "submitted":
+                submitted[event["batch_id"]] = (event["batch_id"], event["rounds"])
+            elif kind == "collected":
+                submitted.pop(event["batch_id"], None)
+            elif kind == "messages" and item is not None:
+                item.messages, item.round = event["messages"], event["round"]
+            elif kind == "result" and item is not None:
+                item.reply, item.error, item.done = event["reply"], event["error"], True
+        return [entry for entry in submitted.values() if all(custom_id in items for custom_id in entry[1])]
+
+    def _submit(self, waiting, instructions, tools):
+        submitted = []
+        for start in range(0, len(waiting), self.requests_per_batch):
+            chunk = waiting[start : start + self.requests_per_batch]
+            lines = []
+            for item in chunk:
+                body = {"model": self.model, "messages": [{"role": "system", "content": instructions}, *item.messages]}
+                # Chosen from the prompt, so every round of a conversation offers the same tools
+                item_tools = select_tools(self.tool_selector, [item.prompt], tools, self.manager.registry)
+                if item_tools:
+                    body["tools"] = item_tools
+                lines.append(json.dumps({"custom_id": item.custom_id, "method": "POST", "url": ENDPOINT, "body": body}))
+            data = ("\n".join(lines) + "\n").encode("utf-8")
+            upload = self.client.files.create(file=(f"{self.manager.name}_batch.jsonl", io.BytesIO(data)), purpose="batch")
+            batch = self.client.batches.create(input_file_id=upload.id, endpoint=ENDPOINT, completion_window="24h", metadata={"agent": self.manager.name})
+            # custom_id -> the round its request answers
+            rounds = {item.custom_id: item.round for item in chunk}
+            if self.checkpoint:
+                self.checkpoint.write("submitted", batch_id=batch.id, rounds=rounds)
+            submitted.append((batch.id, rounds))
+        return submitted
+
+    def _wait(self, in_flight):
+        # Polls every batch in flight until one of them ends, returning it with its rounds
+        deadline = time.monotonic() + self.timeout
+        for delay in self.backoff.delays():
+            for batch_id, rounds in in_flight:
+                batch = self.client.batches.retrieve(batch_id)
+                if batch.status in TERMINAL_STATUSES:
+                    return batch, rounds
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"No batch of {len(in_flight)} finished within {self.timeout}s.")
+            self.sleep(delay)
+
+    def _collect(self, batch, rounds, items, pool):
+        # Apply a finished batch to its items, dispatching tool calls; returns the items it finished
+        responses = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                for line in self.client.files.content(file_id).text.splitlines():
+                    if line.strip():
+                        response = json.loads(line)
+                        responses[response["custom_id"]] = response
+
+        def apply(item):
+            # An item already past this round was applied before an interruption
+            if item.done or item.round != rounds[item.custom_id]:
+                return False
+            response = responses.get(item.custom_id)
+            if response is None or response.get("error") or response["response"]["status_code"] != 200:
+                error = (response or {}).get("error") or {"message": f"Batch {batch.id} {batch.status} without a response."}
+                return self._finish(item, None, error.get("message") if isinstance(error, dict) else str(error))
+            message = response["response"]["body"]["choices"][0]["message"]
+            tool_calls = message.get("tool_calls")
+            assistant = {"role": "assistant", "content": message.get("content")}
+            if not tool_calls:
+                return self._finish(item, message.get("content") or "", None)
+            if item.round >= self.max_tool_rounds:
+                return self._finish(item, None, f"Max tool rounds ({self.max_tool_rounds}) reached.")
+            assistant["tool_calls"] = tool_calls
+            outputs = self.dispatcher.dispatch(self.manager, [tool_call_object(tool_call) for tool_call in tool_calls])
+            item.messages = item.messages + [assistant] + [{"role": "tool", "tool_call_id": output["tool_call_id"], "content": output["output"]} for output in outputs]
+            item.round += 1
+            if self.checkpoint:
+                self.checkpoint.write("messages", custom_id=item.custom_id, round=item.round, messages=item.messages)
+            return False
+
+        batch_items = [items[custom_id] for custom_id in rounds]
+        finished = [item for item, done in zip(batch_items, pool.map(apply, batch_items)) if done]
+        if self.checkpoint:
+            self.checkpoint.write("collected", batch_id=batch.id)
+        return finished
+
+    def _finish(self, item, reply, error):
+        item.reply, item.error, item.done = reply, error, True
+        if self.checkpoint:
+            self.checkpoint.write("result", custom_id=item.custom_id, reply=reply, error=error)
+        return True
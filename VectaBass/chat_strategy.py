@@ -1,10 +1,71 @@
 from abc import ABC, abstractmethod
-import json
+import logging
+import threading
 import time
-from openai import OpenAI
-from pydantic import BaseModel
+from .assistant_cache import AssistantCache, assistant_fingerprint
+from .client_pool import ClientPool
+from .compaction import approx_tokens, is_pinned
+from .message_queue import MessageQueue
 from .pub_sub_manager import PubSub
-from openai._types import NotGiven
+from .run_completion import PollingCompletion
+from .sessions import SessionStore
+from .thread_pool import WarmThreadPool
+from .tool_dispatch import ToolDispatcher
+from .telemetry import count, span
+from .tool_selection import select_tools
+
+logger = logging.getLogger(__name__)
+
+
+class NotGiven:
+    # Marks an omitted tool schema, as opposed to an explicit empty one
+    def __repr__(self):
+        return "NOT_GIVEN"
+
+
+def is_not_found(error):
+    # openai.NotFoundError and any other client error carrying a 404
+    return getattr(error, "status_code", None) == 404
+
+
+def merge_tools(existing_tools, new_tool_schema, tools_to_remove=[]):
+    # Transform existing tools into a dictionary for easier lookup
+    existing_tools_dict = {tool.function.name: tool for tool in existing_tools}
+    for tool_name in tools_to_remove:
+        if tool_name in existing_tools_dict:
+            del existing_tools_dict[tool_name]
+    # Iterate through new tools and merge or add appropriately
+    for new_tool in new_tool_schema:
+        tool_name = new_tool["function"]["name"]
+        if tool_name in existing_tools_dict:
+            # If marked for removal, skip updating and schedule for deletion
+            if tool_name in tools_to_remove:
+                continue
+            # Update the existing tool with new tool information
+            existing_tools_dict[tool_name] = new_tool
+        elif tool_name not in tools_to_remove:
+            # Add new tool if it's not marked for removal
+            existing_tools_dict[tool_name] = new_tool
+
+    # Remove the tools as specified by tools_to_remove
+    for tool_name in tools_to_remove:
+        if tool_name in existing_tools_dict:
+            del existing_tools_dict[tool_name]
+
+    # Convert the dictionary back to a list for the final merged tools
+    return list(existing_tools_dict.values())
+
+
+def message_text(message):
+    # Every text part of a message, image and file parts are skipped
+    return "\n".join(part.text.value for part in message.content if getattr(part, "text", None) is not None)
+
+
+def carried_message(message, pinned):
+    carried = {"role": message.role, "content": message_text(message)}
+    if pinned:
+        carried["metadata"] = {"pinned": "true"}
+    return carried
 
 
 class ChatStrategy(ABC):
@@ -30,35 +91,303 @@ class ChatStrategy(ABC):
         pass
 
 
-class OpenAIStrategy(ChatStrategy):
+class BaseAssistantsStrategy(ChatStrategy):
+    """State and decisions shared by OpenAIStrategy and AsyncOpenAIStrategy.
+
+    Nothing here talks to the API: run events, reply filtering, assistant matching, compaction
+    bookkeeping and the requests to send are worked out here, the subclasses only make the calls.
+    """
 
-    def __init__(self, parent) -> None:
-        self.client = OpenAI()
+    def __init__(self, parent, dispatcher=None, assistant_cache=None, thread_pool=None, session_store=None, compaction=None, tool_selector=None) -> None:
         self.thread = None
         self.assistant = None
         self.manager = parent
+        self.dispatcher = dispatcher or ToolDispatcher.shared()
+        self.assistant_cache = assistant_cache or AssistantCache.shared()
         self.pubsub = PubSub()
-        self.message_queue = []
-        self.is_processing = False
-        self.init_chat()
+        self.thread_pool = thread_pool or WarmThreadPool.installed
+        self.session_store = session_store or SessionStore.shared()
+        self.session_key = None
+        self.pending_tools = None
+        # thread id -> id of the newest message already seen on it
+        self.last_message_ids = {}
+        # thread id -> approximate tokens of the messages added or seen on it
+        self.thread_tokens = {}
+        self.pinned_messages = set()
+        # CompactionPolicy, None keeps threads growing; managers can set a `compaction` class attribute
+        self.compaction = compaction or getattr(parent, "compaction", None)
+        # ToolSelector narrowing the tools of each run, None sends them all; also a manager class attribute
+        self.tool_selector = tool_selector or getattr(parent, "tool_selector", None)
         super().__init__()
 
+    def pin_message(self, message_id):
+        """Keep a message verbatim when its thread is compacted."""
+        self.pinned_messages.add(message_id)
+
+    def message_request(self, thread_id, message, role="user", pinned=False):
+        request = {"thread_id": thread_id, "role": role, "content": message}
+        if pinned:
+            request["metadata"] = {"pinned": "true"}
+        return request
+
+    def message_added(self, thread_id, content, message, pinned=False):
+        self.last_message_ids[thread_id] = message.id
+        self.thread_tokens[thread_id] = self.thread_tokens.get(thread_id, 0) + (approx_tokens(content) if isinstance(content, str) else 0)
+        if pinned:
+            self.pinned_messages.add(message.id)
+        return message
+
+    def switch_thread(self, thread):
+        if isinstance(thread, str):
+            self.session_key = thread
+            self.thread = None
+        else:
+            self.session_key = None
+            self.thread = thread
+
+    def forget_conversation(self):
+        self.last_message_ids.clear()
+        self.thread_tokens.clear()
+        self.pinned_messages.clear()
+
+    def defer_tools(self, config, tools_to_remove=[]):
+        # Keep the latest schema and every removal, the next sync pushes them in a single write
+        removed = list(self.pending_tools[1]) if self.pending_tools else []
+        removed.extend(name for name in tools_to_remove if name not in removed)
+        self.pending_tools = (config, removed)
+
+    def take_pending_tools(self):
+        tool_schema, tools_to_remove = self.pending_tools or (NotGiven(), [])
+        self.pending_tools = None
+        return tool_schema, tools_to_remove
+
+    def run_tools(self, messages, direct=False):
+        if direct:
+            return {}
+        return select_tools(self.tool_selector, messages, self.assistant.tools, self.manager.registry)
+
+    def run_event_handler(self, channel=None):
+        return self.handle_run_event if channel is None else (lambda event: self.handle_run_event(event, channel))
+
+    def handle_run_event(self, event, channel=None):
+        if event.event == "thread.message.delta":
+            for part in event.data.delta.content or []:
+                text = getattr(part, "text", None)
+                if text is not None and text.value:
+                    self.pubsub.publish(f"message_delta_{channel or self.manager.name}", text.value)
+
+    def run_settled(self, run, attempt, max_retries):
+        # False when a failed run should be tried again
+        if run is None or run.status != "failed":
+            return True
+        if attempt < max_retries:
+            count("run.retries")
+            logger.warning("Run failed. Retrying (%s/%s)...", attempt, max_retries)
+            return False
+        logger.error("Max retries reached. Aborting.")
+        return True
+
+    @staticmethod
+    def next_page(page, params):
+        """Point `params` past `page`, False once the listing is exhausted."""
+        if not page.data or not getattr(page, "has_more", False):
+            return False
+        params["after"] = page.data[-1].id
+        return True
+
+    def new_messages_request(self, thread_id, limit=20):
+        # Nothing seen on this thread yet: only the newest message is of interest
+        after = self.last_message_ids.get(thread_id)
+        if after is None:
+            return {"order": "desc", "limit": 1}, False
+        return {"order": "asc", "after": after, "limit": limit}, True
+
+    def messages_seen(self, thread_id, messages):
+        if messages:
+            self.last_message_ids[thread_id] = messages[-1].id
+            self.thread_tokens[thread_id] = self.thread_tokens.get(thread_id, 0) + sum(approx_tokens(message_text(message)) for message in messages)
+        return messages
+
+    def publish_replies(self, messages, channel=None) -> str:
+        replies = [message_text(message) for message in messages if message.role == "assistant"]
+        for reply in replies:
+            self.pubsub.publish(f"print_message_{channel or self.manager.name}", f"**{self.manager.name}**" + ": \n" + reply)
+        return "\n".join(replies)
+
+    def compaction_due(self, thread):
+        return self.compaction is not None and self.compaction.due(self.thread_tokens.get(thread.id, 0))
+
+    def compaction_seed(self, messages):
+        """(seed of the compacted thread, carried messages, dropped messages); the seed is None when nothing is dropped."""
+        digest, carried, dropped = self.compaction.plan(messages, self.pinned_messages)
+        if not dropped:
+            return None, carried, dropped
+        pinned = {message.id for message in carried if is_pinned(message, self.pinned_messages)}
+        seed = [{"role": "assistant", "content": digest}] if digest else []
+        seed.extend(carried_message(message, message.id in pinned) for message in carried)
+        return seed, carried, dropped
+
+    def adopt_compacted(self, thread, compacted):
+        # Unlike set_thread, the session key stays and now points at the new thread
+        # A thread served for someone else (a SessionServer session) is remapped by its owner
+        if self.thread is thread:
+            self.thread = compacted
+            if self.session_key is not None:
+                self.session_store.put(self.manager.name, self.session_key, compacted.id)
+
+    def thread_compacted(self, thread, compacted, messages, seed, newest, carried, dropped):
+        if newest:
+            self.last_message_ids[compacted.id] = newest[0].id
+        # Carried messages are pinned through their metadata from here on
+        self.pinned_messages.difference_update(message.id for message in messages)
+        tokens_before = self.thread_tokens.pop(thread.id, 0)
+        self.thread_tokens[compacted.id] = sum(approx_tokens(message["content"]) for message in seed)
+        self.last_message_ids.pop(thread.id, None)
+        self.pubsub.publish(
+            f"thread_compacted_{self.manager.name}",
+            {
+                "old_thread_id": thread.id,
+                "new_thread_id": compacted.id,
+                "tokens_before": tokens_before,
+                "tokens_after": self.thread_tokens[compacted.id],
+                "summarized": len(dropped),
+                "kept": len(carried),
+            },
+        )
+        return compacted
+
+    @staticmethod
+    def matching_assistant(page, assistant_name):
+        for assistant in page.data:
+            if assistant.name == assistant_name:
+                return assistant
+        return None
+
+    def merge_tools(self, existing_tools, new_tool_schema, tools_to_remove=[]):
+        return merge_tools(existing_tools, new_tool_schema, tools_to_remove=tools_to_remove)
+
+    def assistant_update(self, assistant, cached, tool_schema, tools_to_remove=[]):
+        """(fingerprint, update request) for an existing assistant, the request is None when it is up to date."""
+        new_tools = getattr(assistant, "tools", [])
+        # Only merge if a new tool schema has been provided
+        if not isinstance(tool_schema, NotGiven):
+            new_tools = self.merge_tools(new_tools, tool_schema, tools_to_remove=tools_to_remove)
+        instructions = self.manager._instructions()
+        fingerprint = assistant_fingerprint(instructions, assistant.model, new_tools)
+        current = assistant_fingerprint(getattr(assistant, "instructions", None), assistant.model, assistant.tools)
+        if fingerprint in (current, cached.fingerprint if cached else None):
+            return fingerprint, None
+        request = {"assistant_id": assistant.id, "description": str(assistant.description), "instructions": instructions, "model": assistant.model, "tools": new_tools}
+        return fingerprint, request
+
+    def assistant_request(self, assistant_name, tool_schema):
+        return {
+            "name": assistant_name,
+            "instructions": "You are a virtual assistant. Use the provided functions to handle queries.",
+            "model": "gpt-3.5-turbo",
+            "tools": [] if isinstance(tool_schema, NotGiven) else tool_schema,
+        }
+
+    def assistant_created(self, assistant_name, assistant, request):
+        self.assistant_cache.put(assistant_name, assistant, assistant_fingerprint(request["instructions"], assistant.model, assistant.tools))
+        return assistant
+
+
+class OpenAIStrategy(BaseAssistantsStrategy):
+
+    def __init__(
+        self,
+        parent,
+        completion=None,
+        dispatcher=None,
+        assistant_cache=None,
+        client=None,
+        message_queue=None,
+        thread_pool=None,
+        session_store=None,
+        compaction=None,
+        tool_selector=None,
+    ) -> None:
+        super().__init__(parent, dispatcher, assistant_cache, thread_pool, session_store, compaction, tool_selector)
+        # Runs are charged against the tokens per minute budget for the thread they process
+        self.client = client or ClientPool.shared().client(key=parent.name, priority=getattr(parent, "priority", 0), thread_tokens=self.thread_tokens)
+        self.completion = completion or PollingCompletion()
+        self.thread_lock = threading.Lock()
+        self.start_lock = threading.Lock()
+        self.message_queue = message_queue or MessageQueue()
+        if self.message_queue.handler is None:
+            self.message_queue.handler = self.process_messages
+
     def init_chat(self):
-        self.thread = self.create_thread()
-        self.assistant = self.get_assistant(assistant_name=self.manager.name)
+        self.start()
 
-    def add_message_to_thread(self, thread_id, message, role="user"):
-        message = self.client.beta.threads.messages.create(thread_id=thread_id, role=role, content=message)
+    def start(self):
+        """Remote setup: one assistant lookup and at most one write with every tool registered so far."""
+        with self.start_lock:
+            tool_schema, tools_to_remove = self.take_pending_tools()
+            self.assistant = self.get_assistant(assistant_name=self.manager.name, tool_schema=tool_schema, tools_to_remove=tools_to_remove)
+        return self.assistant
+
+    def ensure_started(self):
+        # The conversation thread is opened separately, by ensure_thread
+        if self.assistant is None or self.pending_tools is not None:
+            self.start()
+
+    def add_message_to_thread(self, thread_id, message, role="user", pinned=False):
+        with span("message.add"):
+            added = self.client.beta.threads.messages.create(**self.message_request(thread_id, message, role, pinned))
+        return self.message_added(thread_id, message, added, pinned)
 
     def create_thread(self):
         thread = self.client.beta.threads.create()
         return thread
 
     def get_thread(self):
-        return self.thread
+        return self.ensure_thread()
 
     def set_thread(self, thread):
-        self.thread = thread
+        """Switch to a thread object, or to a session key whose thread is reattached (or created) on first use."""
+        with self.thread_lock:
+            self.switch_thread(thread)
+
+    def ensure_thread(self):
+        with self.thread_lock:
+            if self.thread is None:
+                self.thread = self.open_thread(self.session_key)
+            return self.thread
+
+    def open_thread(self, session_key=None):
+        """The thread stored for `session_key`, or a new one (stored for it when given)."""
+        thread = None
+        if session_key is not None:
+            thread_id = self.session_store.get(self.manager.name, session_key)
+            if thread_id is not None:
+                try:
+                    thread = self.client.beta.threads.retrieve(thread_id)
+                except Exception as e:
+                    if not is_not_found(e):
+                        raise
+                    self.session_store.forget(self.manager.name, session_key)
+        if thread is None:
+            thread = self.thread_pool.acquire() if self.thread_pool is not None else self.create_thread()
+            if session_key is not None:
+                self.session_store.put(self.manager.name, session_key, thread.id)
+        return thread
+
+    def close(self, delete_thread=False):
+        """Let queued messages finish and forget the conversation; with `delete_thread` the remote thread goes too."""
+        self.message_queue.join()
+        with self.thread_lock:
+            thread, self.thread = self.thread, None
+        if delete_thread and thread is not None:
+            try:
+                self.client.beta.threads.delete(thread.id)
+            except Exception as e:
+                if not is_not_found(e):
+                    raise
+            if self.session_key is not None:
+                self.session_store.forget(self.manager.name, self.session_key)
+        self.forget_conversation()
 
     def start_chat(self):
         main_thread = self.create_thread()
@@ -66,179 +395,137 @@ class OpenAIStrategy(ChatStrategy):
         self.add_message_to_thread(main_thread.id, "How can I help you?", role="assistant")
         return self.client.beta.threads.retrieve(main_thread.id)
 
-    def send_message(self, message, direct=False):
-        self.message_queue.append((message, direct))
-        if not self.is_processing:
-            self.process_message_queue()
-
-    def process_message_queue(self):
-        if not self.message_queue:
-            self.is_processing = False
-            return
-
-        message, direct = self.message_queue.pop(0)
-        self.is_processing = True
+    @property
+    def is_processing(self):
+        return self.message_queue.busy
 
-        self.add_message_to_thread(self.thread.id, message)
-        if direct is False:
-            tools = self.assistant.tools
-        else:
-            tools = {}
-        run = self.client.beta.threads.runs.create(thread_id=self.thread.id, assistant_id=self.assistant.id, tools=tools)
-        self.wait_for_completion(self.thread.id, run.id)
+    def send_message(self, message, direct=False):
+        return self.message_queue.put(message, direct)
+
+    def process_messages(self, messages, direct=False):
+        """Runs the thread once for a batch of queued messages; called by the message queue worker only."""
+        self.ensure_started()
+        thread = self.ensure_thread()
+        self.run_turn(thread, messages, direct)
+        self.maybe_compact(thread)
+
+    def run_turn(self, thread, messages, direct=False, channel=None):
+        """Add messages to `thread`, run it and publish the replies on `channel` (the manager's name by default)."""
+        for message in messages:
+            self.add_message_to_thread(thread.id, message)
+        self.run_thread(thread.id, self.run_tools(messages, direct), channel=channel)
+        return self.print_responses(thread_id=thread.id, channel=channel)
+
+    def maybe_compact(self, thread):
+        if not self.compaction_due(thread):
+            return thread
+        return self.compact_thread(thread)
+
+    def compact_thread(self, thread):
+        """Replace the thread by a fresh one with a digest of its older turns, its pinned messages and its latest ones."""
+        messages = self.list_messages(thread.id)
+        seed, carried, dropped = self.compaction_seed(messages)
+        if seed is None:
+            return thread
+        compacted = self.client.beta.threads.create(messages=seed)
+        with self.thread_lock:
+            self.adopt_compacted(thread, compacted)
+        newest = self.client.beta.threads.messages.list(compacted.id, order="desc", limit=1).data
+        return self.thread_compacted(thread, compacted, messages, seed, newest, carried, dropped)
+
+    def list_messages(self, thread_id, limit=100):
+        """Every message of a thread, oldest first."""
+        messages, params = [], {"order": "asc", "limit": limit}
+        while True:
+            page = self.client.beta.threads.messages.list(thread_id, **params)
+            messages.extend(page.data)
+            if not self.next_page(page, params):
+                return messages
+
+    def run_thread(self, thread_id, tools, max_retries=3, retry_delay=1, channel=None):
+        on_event = self.run_event_handler(channel)
+        run = None
+        for attempt in range(1, max_retries + 1):
+            run = self.completion.run(self.client, thread_id, self.assistant.id, tools, self.process_tool_calls, on_event=on_event)
+            if self.run_settled(run, attempt, max_retries):
+                break
+            time.sleep(retry_delay)
+        return run
 
     def add_tool(self, config, tools_to_remove=[]):
-        print("adding tool")
+        if self.assistant is None:
+            # Not started yet: start() pushes the schema in a single write
+            self.defer_tools(config, tools_to_remove)
+            return
+        logger.debug("Updating the tools of %s", self.manager.name)
         self.assistant = self.get_assistant(assistant_name=self.manager.name, tool_schema=config, tools_to_remove=tools_to_remove)
 
     def get_assistant(self, assistant_name="tester_app", tool_schema=NotGiven(), tools_to_remove=[]):
         try:
-            # List all assistants
-            assistants = self.client.beta.assistants.list()
-            for assistant in assistants.data:
-                if assistant.name == assistant_name:
-                    new_tools = getattr(assistant, "tools", [])
-
-                    # Only merge if a new tool schema has been provided
-                    if not isinstance(tool_schema, NotGiven):
-                        new_tools = self.merge_tools(new_tools, tool_schema, tools_to_remove=tools_to_remove)
-
-                    print(f"Found existing assistant: {assistant_name}")
-                    assistant = self.client.beta.assistants.update(
-                        assistant_id=assistant.id,
-                        description=str(assistant.description),
-                        instructions=self.manager._instructions(),
-                        model=assistant.model,
-                        tools=new_tools,
-                    )
-                    return assistant
+            cached = self.assistant_cache.get(assistant_name)
+            assistant = cached.assistant if cached else None
+            if cached and assistant is None:
+                # Known id from the persistent store, one retrieve instead of a full listing
+                try:
+                    assistant = self.client.beta.assistants.retrieve(cached.id)
+                except Exception as e:
+                    if not is_not_found(e):
+                        raise
+                    self.assistant_cache.forget(assistant_name)
+                    cached = None
+            if assistant is None:
+                assistant = self.find_assistant(assistant_name)
+
+            if assistant is not None:
+                fingerprint, update = self.assistant_update(assistant, cached, tool_schema, tools_to_remove)
+                if update is not None:
+                    logger.info("Found existing assistant: %s", assistant_name)
+                    assistant = self.client.beta.assistants.update(**update)
+                self.assistant_cache.put(assistant_name, assistant, fingerprint)
+                return assistant
 
             # If no existing assistant found, create a new one
-            print(f"Creating new assistant: {assistant_name}")
-            new_assistant = self.client.beta.assistants.create(
-                name=assistant_name,
-                instructions="You are a virtual assistant. Use the provided functions to handle queries.",
-                model="gpt-3.5-turbo",
-                tools=tool_schema,
-            )
-            return new_assistant
+            logger.info("Creating new assistant: %s", assistant_name)
+            request = self.assistant_request(assistant_name, tool_schema)
+            return self.assistant_created(assistant_name, self.client.beta.assistants.create(**request), request)
 
         except Exception as e:
-            print(f"An error occurred: {e}")
+            logger.error("An error occurred while syncing assistant %s: %s", assistant_name, e)
             return None
 
-    def merge_tools(self, existing_tools, new_tool_schema, tools_to_remove=[]):
-        # Transform existing tools into a dictionary for easier lookup
-        existing_tools_dict = {tool.function.name: tool for tool in existing_tools}
-        for tool_name in tools_to_remove:
-            if tool_name in existing_tools_dict:
-                del existing_tools_dict[tool_name]
-        # Iterate through new tools and merge or add appropriately
-        for new_tool in new_tool_schema:
-            tool_name = new_tool["function"]["name"]
-            if tool_name in existing_tools_dict:
-                # If marked for removal, skip updating and schedule for deletion
-                if tool_name in tools_to_remove:
-                    continue
-                # Update the existing tool with new tool information
-                existing_tools_dict[tool_name] = new_tool
-            elif tool_name not in tools_to_remove:
-                # Add new tool if it's not marked for removal
-                existing_tools_dict[tool_name] = new_tool
-
-        # Remove the tools as specified by tools_to_remove
-        for tool_name in tools_to_remove:
-            if tool_name in existing_tools_dict:
-                del existing_tools_dict[tool_name]
-
-        # Convert the dictionary back to a list for the final merged tools
-        return list(existing_tools_dict.values())
+    def find_assistant(self, assistant_name):
+        params = {"limit": 100}
+        while True:
+            page = self.client.beta.assistants.list(**params)
+            assistant = self.matching_assistant(page, assistant_name)
+            if assistant is not None or not self.next_page(page, params):
+                return assistant
 
     def process_tool_calls(self, required_action):
-        tool_outputs = []
-
-        for tool_call in required_action.submit_tool_outputs.tool_calls:
-            func_identifier = tool_call.function.name
-            arguments = json.loads(tool_call.function.arguments)
-            method_details = self.manager.registry.methods.get(func_identifier)
-            print(func_identifier)
-            print(arguments)
-            if not method_details:
-                # If not found, try the model-specific methods registry
-                method_details = self.manager.registry.model_methods.get(func_identifier)
-                if not method_details:
-                    output = {"error": f"Method identifier {func_identifier} not found in any registry."}
-                    # print(output)
-                    tool_outputs.append({"tool_call_id": tool_call.id, "output": str(output)})
-                    continue
-
-            manager = method_details.method.__self__
-            method_name = method_details.method.__name__
-            self.pubsub.publish(f"system_function_call", method_name)
-            parameter_models = method_details.annotations
-
-            try:
-                method_args = {}
-                for arg_name, arg_value in arguments.items():
-                    model_class = parameter_models.get(arg_name)
-                    if model_class and issubclass(model_class, BaseModel):
-                        instance = model_class(**arg_value)
-                        method_args[arg_name] = instance
-                        print(f"Instantiated {arg_name}: {instance}")
-                    else:
-                        method_args[arg_name] = arg_value
-
-                # print(f"Method arguments: {method_args}")
-                method = getattr(manager, method_name, None)
-                if method:
-                    result = method(**method_args)
-                    output = {"result": result}
-                else:
-                    output = {"error": f"Method {method_name} not found on the manager {manager.identifier}."}
+        return self.dispatcher.dispatch(self.manager, required_action.submit_tool_outputs.tool_calls)
 
-            except Exception as e:
-                output = {"error": str(e)}
-                print(f"Error processing {func_identifier}: {e}")
-
-            # print(output)
-            tool_outputs.append({"tool_call_id": tool_call.id, "output": str(output)})
-
-        return tool_outputs
-
-    def wait_for_completion(self, thread_id, run_id, max_retries=3, retry_delay=1):
-        retry_count = 0
-        while retry_count < max_retries:
-            run = self.client.beta.threads.runs.retrieve(run_id=run_id, thread_id=thread_id)
-            while run.status != "completed":
-                run = self.client.beta.threads.runs.retrieve(run_id=run_id, thread_id=thread_id)
-                if run.status == "requires_action":
-                    outputs = self.process_tool_calls(run.required_action)
-                    run = self.client.beta.threads.runs.submit_tool_outputs(thread_id=thread_id, run_id=run.id, tool_outputs=outputs)
-                elif run.status in ["in_progress", "queued"]:
-                    time.sleep(1)
-                elif run.status == "failed":
-                    retry_count += 1
-                    if retry_count < max_retries:
-                        print(f"Run failed. Retrying ({retry_count}/{max_retries})...")
-                        time.sleep(retry_delay)
-                        break
-                    else:
-                        print("Max retries reached. Aborting.")
-                        return
-                else:
-                    print(run.status)
-                    break
-
-            if run.status == "completed":
-                break
+    def wait_for_completion(self, thread_id, run_id):
+        run = self.client.beta.threads.runs.retrieve(run_id=run_id, thread_id=thread_id)
+        run = self.completion.wait(self.client, thread_id, run, self.process_tool_calls)
+        if run.status != "completed":
+            logger.warning("Run %s ended %s", run.id, run.status)
 
         self.print_responses(thread_id=thread_id)
-        self.process_message_queue()
 
-    def print_responses(self, thread_id) -> str:
-        messages = self.client.beta.threads.messages.list(thread_id)
-        message = messages.data[0].content[0].text.value
-        self.pubsub.publish(f"print_message_{self.manager.name}", f"**{self.manager.name}**" + ": \n" + message)
+    def print_responses(self, thread_id, limit=20, channel=None) -> str:
+        with span("messages.fetch"):
+            messages = self.new_messages(thread_id, limit=limit)
+        return self.publish_replies(messages, channel)
+
+    def new_messages(self, thread_id, limit=20):
+        """Messages added to the thread since the last call, oldest first."""
+        params, follow = self.new_messages_request(thread_id, limit)
+        messages = []
+        while True:
+            page = self.client.beta.threads.messages.list(thread_id, **params)
+            messages.extend(page.data)
+            if not follow or not self.next_page(page, params):
+                return self.messages_seen(thread_id, messages)
 
 
 class Chat:
@@ -254,10 +541,17 @@ class Chat:
     def init_chat(self):
         self.strategy.init_chat()
 
+    def start(self):
+        return self.strategy.start()
+
+    def close(self, delete_thread=False):
+        self.strategy.close(delete_thread)
+
     def get_thread(self):
         return self.strategy.get_thread()
 
     def set_thread(self, thread):
+        # A thread object, or a session key to reattach a conversation by
         self.strategy.set_thread(thread)
 
     def add_message(self, thread, message):
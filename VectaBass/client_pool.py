@@ -0,0 +1,332 @@
+# client_pool.py
+"""
+One OpenAI client (and so one connection pool) per process, behind a shared rate limiter.
+
+`ClientPool.shared().client(key, priority)` hands every strategy a LimitedClient: a thin proxy over
+the shared client that takes a slot from the pool's RateLimiter before each API call. The limiter
+combines token buckets for requests and tokens per minute with a concurrency cap. Waiting calls are
+served by priority, then round robin between keys (agent names), so one chatty agent queues behind
+the others instead of starving them. A 429 pauses the whole limiter for the server's retry-after
+and the call is retried, instead of every agent retrying on its own. The pooled clients are created
+with the SDK's own retries disabled, the proxy also retries 5xx and connection errors.
+"""
+import asyncio
+import heapq
+import inspect
+import itertools
+import threading
+import time
+from collections import Counter
+from contextlib import asynccontextmanager, contextmanager
+
+from .telemetry import count, span
+
+_PLAIN_TYPES = (str, bytes, int, float, bool, dict, list, tuple, type(None))
+
+
+class TokenBucket:
+    def __init__(self, per_minute, burst=1.0, clock=time.monotonic):
+        self.rate = per_minute / 60.0
+        # burst: seconds worth of capacity that can be spent at once
+        self.capacity = max(1.0, self.rate * burst)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+
+    def delay(self, amount):
+        """Seconds until `amount` can be taken. Amounts above capacity only wait for a full bucket and go into debt."""
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        needed = min(amount, self.capacity)
+        if self.tokens >= needed:
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+    def take(self, amount):
+        self.tokens -= amount
+
+
+class _Waiter:
+    __slots__ = ("key", "tokens", "wake", "granted", "cancelled")
+
+    def __init__(self, key, tokens, wake):
+        self.key = key
+        self.tokens = tokens
+        self.wake = wake
+        self.granted = False
+        self.cancelled = False
+
+
+class RateLimiter:
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None, max_concurrency=None, burst=1.0, clock=time.monotonic):
+        self.clock = clock
+        self.lock = threading.Lock()
+        # (-priority, ticket of the key, sequence) -> waiter; tickets give round robin between keys
+        self.waiters = []
+        self.tickets = Counter()
+        # Ticket of the last granted waiter, a key that was idle starts from here instead of from zero
+        self.floor = 0
+        self.sequence = itertools.count()
+        self.active = 0
+        self.paused_until = 0.0
+        self.timer_at = None
+        self.configure(requests_per_minute, tokens_per_minute, max_concurrency, burst)
+
+    def configure(self, requests_per_minute=None, tokens_per_minute=None, max_concurrency=None, burst=1.0):
+        with self.lock:
+            self.requests = TokenBucket(requests_per_minute, burst, self.clock) if requests_per_minute else None
+            self.tokens = TokenBucket(tokens_per_minute, burst, self.clock) if tokens_per_minute else None
+            self.max_concurrency = max_concurrency
+            self._dispatch()
+
+    @contextmanager
+    def acquire(self, key=None, priority=0, tokens=0):
+        event = threading.Event()
+        self._enqueue(key, priority, tokens, event.set)
+        event.wait()
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def aacquire(self, key=None, priority=0, tokens=0):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter = self._enqueue(key, priority, tokens, lambda: loop.call_soon_threadsafe(_resolve, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self.lock:
+                waiter.cancelled = True
+                granted = waiter.granted
+            if granted:
+                self.release()
+            raise
+        try:
+            yield
+        finally:
+            self.release()
+
+    def release(self):
+        with self.lock:
+            self.active -= 1
+            self._dispatch()
+
+    def penalise(self, seconds):
+        """Hold every request back for `seconds`, e.g. after the server answered 429."""
+        with self.lock:
+            self.paused_until = max(self.paused_until, self.clock() + seconds)
+            self._dispatch()
+
+    def _enqueue(self, key, priority, tokens, wake):
+        waiter = _Waiter(key, tokens, wake)
+        with self.lock:
+            ticket = self.tickets[key] = max(self.tickets[key], self.floor) + 1
+            heapq.heappush(self.waiters, (-priority, ticket, next(self.sequence), waiter))
+            self._dispatch()
+        return waiter
+
+    def _dispatch(self):
+        # Called with the lock held whenever a slot, a token or a waiter may have become available
+        while self.waiters:
+            waiter = self.waiters[0][-1]
+            if waiter.cancelled:
+                heapq.heappop(self.waiters)
+                continue
+            if self.max_concurrency and self.active >= self.max_concurrency:
+                return
+            delay = self.paused_until - self.clock()
+            if self.requests is not None:
+                delay = max(delay, self.requests.delay(1))
+            if self.tokens is not None and waiter.tokens:
+                delay = max(delay, self.tokens.delay(waiter.tokens))
+            if delay > 0:
+                self._schedule(delay)
+                return
+            self.floor = heapq.heappop(self.waiters)[1]
+            if self.requests is not None:
+                self.requests.take(1)
+            if self.tokens is not None:
+                self.tokens.take(waiter.tokens)
+            self.active += 1
+            waiter.granted = True
+            waiter.wake()
+        # Nobody is waiting, keep the tickets from growing without bound
+        self.tickets.clear()
+
+    def _schedule(self, delay):
+        at = self.clock() + delay
+        if self.timer_at is not None and self.timer_at <= at:
+            return
+        self.timer_at = at
+        timer = threading.Timer(delay, self._on_timer)
+        timer.daemon = True
+        timer.start()
+
+    def _on_timer(self):
+        with self.lock:
+            self.timer_at = None
+            self._dispatch()
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+# Endpoints that make the model read the whole thread
+RUN_ENDPOINTS = ("beta.threads.runs.create", "beta.threads.runs.submit_tool_outputs", "beta.threads.runs.stream", "beta.threads.create_and_run")
+
+
+def estimate_tokens(kwargs, endpoint=None, thread_tokens=None):
+    """Rough prompt size of a call, about four characters per token.
+
+    Runs are charged for their thread as well, from `thread_tokens` (thread id -> approximate tokens,
+    as tracked by the strategies).
+    """
+    size = sum(len(str(kwargs[name])) for name in ("content", "instructions") if kwargs.get(name))
+    for message in kwargs.get("messages") or ():
+        if isinstance(message, dict):
+            size += len(str(message.get("content") or ""))
+    for output in kwargs.get("tool_outputs") or ():
+        if isinstance(output, dict):
+            size += len(str(output.get("output") or ""))
+    tokens = size // 4
+    if thread_tokens is not None and endpoint in RUN_ENDPOINTS:
+        tokens += thread_tokens.get(kwargs.get("thread_id"), 0)
+    return tokens
+
+
+def is_retryable(error):
+    status_code = getattr(error, "status_code", None)
+    if status_code is not None:
+        return status_code == 429 or status_code >= 500
+    return type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+def retry_after(error, attempt):
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return min(0.5 * 2**attempt, 30.0)
+
+
+class LimitedClient:
+    """Proxy over an OpenAI client (sync or async) that routes every API call through a RateLimiter.
+
+    Most async SDK endpoints are plain functions under `required_args` style decorators, or return
+    an awaitable paginator, so they do not look like coroutine functions. With `asynchronous`, every
+    resource method is treated as async and its result awaited inside the limiter slot.
+    """
+
+    def __init__(self, target, limiter, key=None, priority=0, max_retries=3, path="", asynchronous=False, thread_tokens=None):
+        self._target = target
+        self._limiter = limiter
+        self._key = key
+        self._priority = priority
+        self._max_retries = max_retries
+        self._asynchronous = asynchronous
+        # thread id -> approximate tokens, read (never written) to charge runs for their thread
+        self._thread_tokens = thread_tokens
+        # Attribute path from the client, e.g. "beta.threads.runs", to label calls by endpoint
+        self._path = path
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        endpoint = f"{self._path}.{name}" if self._path else name
+        if inspect.iscoroutinefunction(inspect.unwrap(attr)) or (self._asynchronous and self._path and callable(attr) and not isinstance(attr, type)):
+            # Client level helpers such as with_options stay synchronous, resource methods are API calls
+            wrapped = self._async_call(attr, endpoint)
+        elif callable(attr) and not isinstance(attr, type):
+            wrapped = self._call(attr, endpoint)
+        elif isinstance(attr, _PLAIN_TYPES):
+            return attr
+        else:
+            wrapped = LimitedClient(attr, self._limiter, self._key, self._priority, self._max_retries, endpoint, self._asynchronous, self._thread_tokens)
+        # Cached on the instance, later lookups skip __getattr__
+        self.__dict__[name] = wrapped
+        return wrapped
+
+    def _call(self, method, endpoint):
+        def call(*args, **kwargs):
+            tokens = estimate_tokens(kwargs, endpoint, self._thread_tokens)
+            for attempt in range(self._max_retries + 1):
+                with self._limiter.acquire(self._key, self._priority, tokens):
+                    count("api.calls", endpoint=endpoint)
+                    try:
+                        with span("api.call", endpoint=endpoint):
+                            return method(*args, **kwargs)
+                    except Exception as e:
+                        if not is_retryable(e) or attempt == self._max_retries:
+                            raise
+                        delay = retry_after(e, attempt)
+                        rate_limited = getattr(e, "status_code", None) == 429
+                        count("api.retries", endpoint=endpoint, rate_limited=rate_limited)
+                if rate_limited:
+                    self._limiter.penalise(delay)
+                else:
+                    time.sleep(delay)
+
+        return call
+
+    def _async_call(self, method, endpoint):
+        async def call(*args, **kwargs):
+            tokens = estimate_tokens(kwargs, endpoint, self._thread_tokens)
+            for attempt in range(self._max_retries + 1):
+                async with self._limiter.aacquire(self._key, self._priority, tokens):
+                    count("api.calls", endpoint=endpoint)
+                    try:
+                        with span("api.call", endpoint=endpoint):
+                            result = method(*args, **kwargs)
+                            # Coroutines, and AsyncPaginator whose await fetches the first page
+                            return await result if inspect.isawaitable(result) else result
+                    except Exception as e:
+                        if not is_retryable(e) or attempt == self._max_retries:
+                            raise
+                        delay = retry_after(e, attempt)
+                        rate_limited = getattr(e, "status_code", None) == 429
+                        count("api.retries", endpoint=endpoint, rate_limited=rate_limited)
+                if rate_limited:
+                    self._limiter.penalise(delay)
+                else:
+                    await asyncio.sleep(delay)
+
+        return call
+
+
+class ClientPool:
+    _instance = None
+
+    def __init__(self, limiter=None, client_factory=None, async_client_factory=None):
+        self.limiter = limiter or RateLimiter()
+        self.client_factory = client_factory
+        self.async_client_factory = async_client_factory
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def client(self, key=None, priority=0, asynchronous=False, thread_tokens=None):
+        return LimitedClient(self.raw_client(asynchronous), self.limiter, key=key, priority=priority, asynchronous=asynchronous, thread_tokens=thread_tokens)
+
+    def raw_client(self, asynchronous=False):
+        with self._lock:
+            if asynchronous not in self._clients:
+                self._clients[asynchronous] = self._create(asynchronous)
+            return self._clients[asynchronous]
+
+    def _create(self, asynchronous):
+        factory = self.async_client_factory if asynchronous else self.client_factory
+        if factory is not None:
+            return factory()
+        from openai import AsyncOpenAI, OpenAI
+
+        # Retries are left to LimitedClient, so 429s queue in the limiter instead of hammering the API
+        return (AsyncOpenAI if asynchronous else OpenAI)(max_retries=0)
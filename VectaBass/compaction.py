@@ -0,0 +1,65 @@
+# compaction.py
+"""
+Keeps long-lived conversations from growing without bound.
+
+The strategies keep a rough token count per thread. Once it passes the policy's `max_tokens`, the
+thread is replaced by a fresh one holding a digest of the older turns, the pinned messages and the
+`keep_recent` latest messages. The digest comes from `summarize(messages, digest_tokens)`; the default
+keeps the most recent of the dropped turns, clipped, until the digest budget is spent. Pass your own
+callable to summarise with a model instead.
+"""
+
+# Messages a new thread can be created with in one call
+MAX_THREAD_MESSAGES = 32
+
+
+def approx_tokens(text):
+    return len(text or "") // 4 + 1
+
+
+def is_pinned(message, pinned_ids=()):
+    metadata = getattr(message, "metadata", None) or {}
+    return message.id in pinned_ids or str(metadata.get("pinned", "")).lower() == "true"
+
+
+def truncating_digest(messages, digest_tokens, text=None):
+    from .chat_strategy import message_text
+
+    text = text or message_text
+    lines, budget = [], digest_tokens * 4
+    for message in reversed(messages):
+        line = f"{message.role}: {text(message)[:300]}"
+        if len(line) > budget:
+            break
+        lines.append(line)
+        budget -= len(line) + 1
+    if not lines:
+        return ""
+    omitted = len(messages) - len(lines)
+    header = "Summary of the earlier conversation" + (f" ({omitted} older messages omitted):" if omitted else ":")
+    return "\n".join([header] + lines[::-1])
+
+
+class CompactionPolicy:
+    def __init__(self, max_tokens=32_000, keep_recent=6, digest_tokens=1_000, summarize=None):
+        self.max_tokens = max_tokens
+        self.keep_recent = keep_recent
+        self.digest_tokens = digest_tokens
+        self.summarize = summarize or truncating_digest
+
+    def due(self, tokens):
+        return tokens > self.max_tokens
+
+    def plan(self, messages, pinned_ids=()):
+        """Split a thread's messages (oldest first) into (digest, messages to carry over, messages dropped)."""
+        recent = messages[-self.keep_recent :] if self.keep_recent else []
+        older = messages[: len(messages) - len(recent)]
+        pinned = [message for message in older if is_pinned(message, pinned_ids)]
+        dropped = [message for message in older if not is_pinned(message, pinned_ids)]
+        carried = pinned + recent
+        if len(carried) > MAX_THREAD_MESSAGES - 1:
+            # Oldest pinned messages go into the digest instead
+            overflow = len(carried) - (MAX_THREAD_MESSAGES - 1)
+            dropped, carried = carried[:overflow] + dropped, carried[overflow:]
+        digest = self.summarize(dropped, self.digest_tokens) if dropped else ""
+        return digest, carried, dropped
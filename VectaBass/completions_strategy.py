@@ -0,0 +1,255 @@
+# completions_strategy.py
+"""
+Stateless alternative to the Assistants API strategies, on top of `chat.completions`.
+
+The conversation lives in a local ConversationHistory instead of a remote thread, so a turn is one
+completion request, plus one per round of tool calls. Tool calls are dispatched in process and fed
+straight back, with no runs to create or poll and no messages to list. The tools sent are the
+Registry's schema as last pushed through `add_tool`.
+
+Pick it per agent with `chat_api="chat_completions"` on the manager (class attribute or constructor
+argument). The history is bounded by `max_tokens`: the oldest messages are dropped first, an assistant
+tool call and its outputs go together, and the user message of the turn in progress is kept.
+"""
+import asyncio
+import logging
+import threading
+import uuid
+from collections import deque
+
+from .chat_strategy import ChatStrategy
+from .client_pool import ClientPool
+from .compaction import approx_tokens
+from .message_queue import MessageQueue
+from .pub_sub_manager import PubSub
+from .tool_dispatch import ToolDispatcher
+from .tool_selection import select_tools
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INSTRUCTIONS = "You are a virtual assistant. Use the provided functions to handle queries."
+# Per message overhead of the chat format, in tokens
+MESSAGE_TOKENS = 4
+
+
+def message_tokens(message):
+    tokens = MESSAGE_TOKENS + approx_tokens(message.get("content"))
+    for tool_call in message.get("tool_calls") or ():
+        tokens += approx_tokens(tool_call["function"]["name"]) + approx_tokens(tool_call["function"]["arguments"])
+    return tokens
+
+
+def assistant_message(reply):
+    message = {"role": "assistant", "content": reply.content}
+    if reply.tool_calls:
+        message["tool_calls"] = [
+            {"id": tool_call.id, "type": "function", "function": {"name": tool_call.function.name, "arguments": tool_call.function.arguments}}
+            for tool_call in reply.tool_calls
+        ]
+    return message
+
+
+class ConversationHistory:
+    """Chat messages of one conversation, oldest first, bounded by an approximate token count."""
+
+    def __init__(self, max_tokens=8_000, max_messages=500):
+        self.id = f"local_{uuid.uuid4().hex[:12]}"
+        self.max_tokens = max_tokens
+        self.max_messages = max_messages
+        # (message, tokens)
+        self.entries = deque()
+        self.tokens = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def append(self, message):
+        tokens = message_tokens(message)
+        self.entries.append((message, tokens))
+        self.tokens += tokens
+        self.trim()
+
+    def trim(self):
+        # Whole units are dropped, oldest first: a message on its own, or an assistant tool call with its outputs.
+        # The newest unit and the latest user message always stay, even on their own above the budget.
+        while self.tokens > self.max_tokens or len(self.entries) > self.max_messages:
+            start = 1 if self.entries and self.entries[0][0]["role"] == "user" and self._latest_user() == 0 else 0
+            end = self._unit_end(start)
+            if end >= len(self.entries):
+                break
+            self._drop(start, end)
+        # Tool outputs whose call is gone would be rejected
+        while len(self.entries) > 1 and self.entries[0][0]["role"] == "tool":
+            self._drop(0, 1)
+
+    def _latest_user(self):
+        for index in range(len(self.entries) - 1, -1, -1):
+            if self.entries[index][0]["role"] == "user":
+                return index
+        return None
+
+    def _unit_end(self, start):
+        end = start + 1
+        if start < len(self.entries) and self.entries[start][0].get("tool_calls"):
+            while end < len(self.entries) and self.entries[end][0]["role"] == "tool":
+                end += 1
+        return end
+
+    def _drop(self, start, end):
+        self.entries.rotate(-start)
+        for _ in range(end - start):
+            _, tokens = self.entries.popleft()
+            self.tokens -= tokens
+        self.entries.rotate(start)
+
+    def messages(self, instructions=None):
+        messages = [message for message, _ in self.entries]
+        if instructions:
+            messages.insert(0, {"role": "system", "content": instructions})
+        return messages
+
+    def clear(self):
+        self.entries.clear()
+        self.tokens = 0
+
+
+class ChatCompletionsStrategy(ChatStrategy):
+    def __init__(
+        self, parent, client=None, dispatcher=None, model="gpt-3.5-turbo", max_tokens=8_000, max_tool_rounds=8, message_queue=None, tool_selector=None
+    ) -> None:
+        self.client = client or ClientPool.shared().client(key=parent.name, priority=getattr(parent, "priority", 0))
+        self.manager = parent
+        self.model = model
+        self.max_tokens = max_tokens
+        self.max_tool_rounds = max_tool_rounds
+        self.dispatcher = dispatcher or ToolDispatcher.shared()
+        self.pubsub = PubSub()
+        self.tools = []
+        self.tool_selector = tool_selector or getattr(parent, "tool_selector", None)
+        self.thread = ConversationHistory(max_tokens)
+        # session key -> history, for set_thread with a key
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.message_queue = message_queue or MessageQueue()
+        if self.message_queue.handler is None:
+            self.message_queue.handler = self.process_messages
+        super().__init__()
+
+    def init_chat(self):
+        self.start()
+
+    def start(self):
+        # Nothing to set up remotely, tools are sent with every request
+        return None
+
+    def add_tool(self, config, tools_to_remove=[]):
+        # The Registry always pushes its whole schema
+        self.tools = list(config)
+
+    def get_thread(self):
+        return self.thread
+
+    def set_thread(self, thread):
+        """Switch to a ConversationHistory, or to the history kept for a session key."""
+        with self.lock:
+            if isinstance(thread, str):
+                thread = self.sessions.setdefault(thread, ConversationHistory(self.max_tokens))
+            self.thread = thread
+
+    def add_message_to_thread(self, thread_id, message, role="user"):
+        self.history(thread_id).append({"role": role, "content": message})
+
+    def history(self, thread_id):
+        if thread_id is None or thread_id == self.thread.id:
+            return self.thread
+        for thread in self.sessions.values():
+            if thread.id == thread_id:
+                return thread
+        raise ValueError(f"Conversation {thread_id} not found.")
+
+    @property
+    def is_processing(self):
+        return self.message_queue.busy
+
+    def send_message(self, message, direct=False):
+        return self.message_queue.put(message, direct)
+
+    def process_messages(self, messages, direct=False):
+        thread = self.thread
+        for message in messages:
+            thread.append({"role": "user", "content": message})
+        reply = self.complete(thread, tools=[] if direct else select_tools(self.tool_selector, messages, self.tools, self.manager.registry))
+        if reply:
+            self.pubsub.publish(f"print_message_{self.manager.name}", f"**{self.manager.name}**" + ": \n" + reply)
+        return reply
+
+    def complete(self, thread, tools):
+        """Request completions until the model answers without tool calls, dispatching those in between."""
+        instructions = self.manager._instructions() or DEFAULT_INSTRUCTIONS
+        for _ in range(self.max_tool_rounds + 1):
+            params = {"model": self.model, "messages": thread.messages(instructions)}
+            if tools:
+                params["tools"] = tools
+            reply = self.client.chat.completions.create(**params).choices[0].message
+            thread.append(assistant_message(reply))
+            if not reply.tool_calls:
+                return reply.content or ""
+            for output in self.dispatcher.dispatch(self.manager, reply.tool_calls):
+                thread.append({"role": "tool", "tool_call_id": output["tool_call_id"], "content": output["output"]})
+        logger.warning("Max tool rounds (%s) reached. Aborting.", self.max_tool_rounds)
+        return ""
+
+    def close(self, delete_thread=False):
+        self.message_queue.join()
+        self.thread.clear()
+        self.sessions.clear()
+
+
+class AsyncChatCompletionsStrategy(ChatCompletionsStrategy):
+    """Coroutine based counterpart of ChatCompletionsStrategy, used through AsyncChat."""
+
+    def __init__(self, parent, client=None, dispatcher=None, model="gpt-3.5-turbo", max_tokens=8_000, max_tool_rounds=8, tool_selector=None) -> None:
+        client = client or ClientPool.shared().client(key=parent.name, priority=getattr(parent, "priority", 0), asynchronous=True)
+        super().__init__(
+            parent, client=client, dispatcher=dispatcher, model=model, max_tokens=max_tokens, max_tool_rounds=max_tool_rounds, tool_selector=tool_selector
+        )
+        self.run_lock = asyncio.Lock()
+
+    async def init_chat(self):
+        return None
+
+    async def start(self):
+        return None
+
+    async def add_message_to_thread(self, thread_id, message, role="user"):
+        super().add_message_to_thread(thread_id, message, role)
+
+    async def send_message(self, message, direct=False):
+        # One completion loop per conversation at a time, in arrival order
+        async with self.run_lock:
+            thread = self.thread
+            thread.append({"role": "user", "content": message})
+            reply = await self.complete(thread, tools=[] if direct else select_tools(self.tool_selector, [message], self.tools, self.manager.registry))
+            if reply:
+                self.pubsub.publish(f"print_message_{self.manager.name}", f"**{self.manager.name}**" + ": \n" + reply)
+            return reply
+
+    async def complete(self, thread, tools):
+        instructions = self.manager._instructions() or DEFAULT_INSTRUCTIONS
+        for _ in range(self.max_tool_rounds + 1):
+            params = {"model": self.model, "messages": thread.messages(instructions)}
+            if tools:
+                params["tools"] = tools
+            reply = (await self.client.chat.completions.create(**params)).choices[0].message
+            thread.append(assistant_message(reply))
+            if not reply.tool_calls:
+                return reply.content or ""
+            for output in await self.dispatcher.adispatch(self.manager, reply.tool_calls):
+                thread.append({"role": "tool", "tool_call_id": output["tool_call_id"], "content": output["output"]})
+        logger.warning("Max tool rounds (%s) reached. Aborting.", self.max_tool_rounds)
+        return ""
+
+    async def close(self, delete_thread=False):
+        async with self.run_lock:
+            self.thread.clear()
+            self.sessions.clear()
@@ -0,0 +1,553 @@
+# fake_openai.py
+"""
+In-process stand-in for the OpenAI Assistants API, for tests and benchmarks.
+
+FakeBackend holds assistants, threads, messages and runs in memory. Runs take `run_duration`
+seconds to resolve, every API call can be delayed by `api_latency` and can fail with
+`api_error_rate`, calls above `rate_limit` per second are answered with a 429, and runs
+themselves fail with `run_failure_rate`. What a run answers is
+decided by a responder: a callable (messages, tool_names, tool_outputs) returning either the
+reply text or a list of (tool name, arguments) pairs, which puts the run in `requires_action`.
+
+The backend also answers `chat.completions.create` from the same responder, taking `run_duration`
+seconds per completion, for the stateless ChatCompletionsStrategy. Batch jobs (`files` and
+`batches`) run every request of their input file through it, `batch_duration` seconds after they
+were created, and write the answers to an output file in the provider's JSONL format.
+
+FakeOpenAI and FakeAsyncOpenAI expose the backend with the client surface the strategies use.
+"""
+import asyncio
+import itertools
+import json
+import random
+import threading
+import time
+from collections import Counter, deque
+from types import SimpleNamespace
+
+from openai.types.beta import FunctionTool
+
+
+class FakeAPIError(Exception):
+    def __init__(self, message, status_code=500):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def echo_responder(messages, tool_names, tool_outputs):
+    """Replies with the last user message."""
+    for message in reversed(messages):
+        if message.role == "user":
+            return f"echo: {message.content[0].text.value}"
+    return "How can I help you?"
+
+
+class ToolCallResponder:
+    """Asks for the given tool calls once per run, then replies with the tool outputs.
+
+    Tools are given by name suffix, e.g. ("say_hello", {...}) matches "MyAgent_xyz_say_hello".
+    """
+
+    def __init__(self, tool_calls):
+        self.tool_calls = tool_calls
+
+    def __call__(self, messages, tool_names, tool_outputs):
+        if tool_outputs is not None or not tool_names:
+            return "; ".join(output["output"] for output in tool_outputs or [])
+        calls = []
+        for suffix, arguments in self.tool_calls:
+            name = next((name for name in tool_names if name.endswith(suffix)), suffix)
+            calls.append((name, arguments))
+        return calls
+
+
+def text_content(value):
+    return [SimpleNamespace(type="text", text=SimpleNamespace(value=value, annotations=[]))]
+
+
+def tool_names(tools):
+    names = []
+    for tool in tools or []:
+        function = tool.get("function") if isinstance(tool, dict) else getattr(tool, "function", None)
+        if function is not None:
+            names.append(function["name"] if isinstance(function, dict) else function.name)
+    return names
+
+
+def plain(value):
+    """JSON data for a response object, as the API would have sent it."""
+    if isinstance(value, SimpleNamespace):
+        return {key: plain(item) for key, item in vars(value).items() if not key.startswith("_")}
+    if isinstance(value, (list, tuple)):
+        return [plain(item) for item in value]
+    return value
+
+
+def snapshot(obj):
+    """Copy of a stored object, so callers cannot observe later state changes through it."""
+    return SimpleNamespace(**{key: value for key, value in vars(obj).items() if not key.startswith("_")})
+
+
+class FakeBackend:
+    def __init__(
+        self, run_duration=0.0, api_latency=0.0, run_failure_rate=0.0, api_error_rate=0.0, responder=None, seed=0, rate_limit=None, batch_duration=0.0
+    ):
+        self.run_duration = run_duration
+        self.batch_duration = batch_duration
+        self.api_latency = api_latency
+        self.run_failure_rate = run_failure_rate
+        self.api_error_rate = api_error_rate
+        self.responder = responder or echo_responder
+        self.random = random.Random(seed)
+        self.lock = threading.RLock()
+        self.ids = itertools.count(1)
+        self.calls = Counter()
+        self.rate_limit = rate_limit
+        self.recent_calls = deque()
+        self.assistants = {}
+        self.threads = {}
+        self.messages = {}
+        self.runs = {}
+        self.active_runs = {}
+        self.files = {}
+        self.batches = {}
+
+    def new_id(self, prefix):
+        return f"{prefix}_{next(self.ids):06d}"
+
+    def before_call(self, name):
+        with self.lock:
+            self.calls[name] += 1
+            if self.rate_limit:
+                now = time.monotonic()
+                while self.recent_calls and self.recent_calls[0] <= now - 1.0:
+                    self.recent_calls.popleft()
+                if len(self.recent_calls) >= self.rate_limit:
+                    self.calls["rate_limited"] += 1
+                    raise FakeAPIError(f"Rate limit reached for {name}", status_code=429)
+                self.recent_calls.append(now)
+            if self.api_error_rate and self.random.random() < self.api_error_rate:
+                raise FakeAPIError(f"Simulated failure of {name}")
+
+    # Assistants
+
+    def create_assistant(self, name=None, instructions=None, model="gpt-3.5-turbo", tools=None, description=None, **kwargs):
+        with self.lock:
+            assistant = SimpleNamespace(
+                id=self.new_id("asst"),
+                object="assistant",
+                name=name,
+                description=description,
+                instructions=instructions,
+                model=model,
+                tools=self._tools(tools),
+                created_at=int(time.time()),
+            )
+            self.assistants[assistant.id] = assistant
+            return snapshot(assistant)
+
+    def retrieve_assistant(self, assistant_id):
+        with self.lock:
+            return snapshot(self._get(self.assistants, assistant_id))
+
+    def update_assistant(self, assistant_id, **fields):
+        with self.lock:
+            assistant = self._get(self.assistants, assistant_id)
+            for key, value in fields.items():
+                setattr(assistant, key, self._tools(value) if key == "tools" else value)
+            return snapshot(assistant)
+
+    def list_assistants(self, limit=20, after=None, order="desc", **kwargs):
+        with self.lock:
+            items = list(self.assistants.values())
+        if order == "desc":
+            items.reverse()
+        return self._page(items, limit, after)
+
+    def delete_assistant(self, assistant_id):
+        with self.lock:
+            self.assistants.pop(assistant_id, None)
+            return SimpleNamespace(id=assistant_id, deleted=True)
+
+    # Threads and messages
+
+    def create_thread(self, messages=None, **kwargs):
+        with self.lock:
+            thread = SimpleNamespace(id=self.new_id("thread"), object="thread", created_at=int(time.time()), metadata=kwargs.get("metadata") or {})
+            self.threads[thread.id] = thread
+            self.messages[thread.id] = []
+            for message in messages or []:
+                self.create_message(thread.id, role=message["role"], content=message["content"], metadata=message.get("metadata"))
+            return snapshot(thread)
+
+    def retrieve_thread(self, thread_id):
+        with self.lock:
+            return snapshot(self._get(self.threads, thread_id))
+
+    def delete_thread(self, thread_id):
+        with self.lock:
+            self.threads.pop(thread_id, None)
+            self.messages.pop(thread_id, None)
+            return SimpleNamespace(id=thread_id, deleted=True)
+
+    def create_message(self, thread_id, role, content, run_id=None, **kwargs):
+        with self.lock:
+            messages = self._get(self.messages, thread_id)
+            self._ensure_idle(thread_id)
+            message = SimpleNamespace(
+                id=self.new_id("msg"),
+                object="thread.message",
+                thread_id=thread_id,
+                role=role,
+                content=text_content(content) if isinstance(content, str) else content,
+                run_id=run_id,
+                metadata=kwargs.get("metadata") or {},
+                created_at=int(time.time()),
+            )
+            messages.append(message)
+            return snapshot(message)
+
+    def list_messages(self, thread_id, limit=20, order="desc", after=None, before=None, run_id=None, **kwargs):
+        with self.lock:
+            items = list(self._get(self.messages, thread_id))
+        if run_id is not None:
+            items = [item for item in items if item.run_id == run_id]
+        if order == "desc":
+            items.reverse()
+        if before is not None:
+            items = items[: [item.id for item in items].index(before)]
+        return self._page(items, limit, after)
+
+    # Runs
+
+    def create_run(self, thread_id, assistant_id, tools=None, stream=False, **kwargs):
+        with self.lock:
+            self._get(self.threads, thread_id)
+            self._ensure_idle(thread_id)
+            assistant = self._get(self.assistants, assistant_id)
+            if tools is None:
+                tools = assistant.tools
+            run = SimpleNamespace(
+                id=self.new_id("run"),
+                object="thread.run",
+                thread_id=thread_id,
+                assistant_id=assistant_id,
+                status="queued",
+                tools=tools,
+                required_action=None,
+                last_error=None,
+                created_at=int(time.time()),
+                _ready_at=time.monotonic() + self.run_duration,
+                _tool_outputs=None,
+            )
+            self.runs[run.id] = run
+            self.active_runs[thread_id] = run.id
+            if stream:
+                return FakeRunStream(self, run.id)
+            return snapshot(run)
+
+    def retrieve_run(self, run_id=None, thread_id=None):
+        with self.lock:
+            run = self._get(self.runs, run_id)
+            self._advance(run)
+            return snapshot(run)
+
+    def submit_tool_outputs(self, run_id=None, thread_id=None, tool_outputs=(), stream=False, **kwargs):
+        with self.lock:
+            run = self._get(self.runs, run_id)
+            if run.status != "requires_action":
+                raise FakeAPIError(f"Run {run_id} is not waiting for tool outputs.", status_code=400)
+            expected = {call.id for call in run.required_action.submit_tool_outputs.tool_calls}
+            if {output["tool_call_id"] for output in tool_outputs} != expected:
+                raise FakeAPIError(f"Tool outputs for {run_id} do not match the requested tool calls.", status_code=400)
+            run._tool_outputs = list(tool_outputs)
+            run.required_action = None
+            run.status = "in_progress"
+            run._ready_at = time.monotonic() + self.run_duration
+            if stream:
+                return FakeRunStream(self, run.id)
+            return snapshot(run)
+
+    def cancel_run(self, run_id=None, thread_id=None):
+        with self.lock:
+            run = self._get(self.runs, run_id)
+            run.status = "cancelled"
+            return snapshot(run)
+
+    def _advance(self, run, force=False):
+        if run.status not in ("queued", "in_progress"):
+            return
+        if not force and time.monotonic() < run._ready_at:
+            run.status = "in_progress"
+            return
+        if self.run_failure_rate and self.random.random() < self.run_failure_rate:
+            run.status = "failed"
+            run.last_error = SimpleNamespace(code="server_error", message="Simulated run failure")
+            return
+
+        response = self.responder(self.messages[run.thread_id], tool_names(run.tools), run._tool_outputs)
+        if isinstance(response, str):
+            self.messages[run.thread_id].append(
+                SimpleNamespace(
+                    id=self.new_id("msg"),
+                    object="thread.message",
+                    thread_id=run.thread_id,
+                    role="assistant",
+                    content=text_content(response),
+                    run_id=run.id,
+                    created_at=int(time.time()),
+                )
+            )
+            run.status = "completed"
+        else:
+            tool_calls = [
+                SimpleNamespace(id=self.new_id("call"), type="function", function=SimpleNamespace(name=name, arguments=json.dumps(arguments)))
+                for name, arguments in response
+            ]
+            run.status = "requires_action"
+            run.required_action = SimpleNamespace(type="submit_tool_outputs", submit_tool_outputs=SimpleNamespace(tool_calls=tool_calls))
+
+    # Chat completions
+
+    def create_chat_completion(self, model=None, messages=(), tools=None, **kwargs):
+        with self.lock:
+            if self.run_failure_rate and self.random.random() < self.run_failure_rate:
+                raise FakeAPIError("Simulated completion failure")
+            history = [SimpleNamespace(role=message["role"], content=text_content(message.get("content") or "")) for message in messages]
+            tool_outputs = []
+            for message in reversed(messages):
+                if message["role"] != "tool":
+                    break
+                tool_outputs.insert(0, {"tool_call_id": message["tool_call_id"], "output": message["content"]})
+            response = self.responder(history, tool_names(tools), tool_outputs or None)
+            if isinstance(response, str):
+                reply = SimpleNamespace(role="assistant", content=response, tool_calls=None)
+            else:
+                tool_calls = [
+                    SimpleNamespace(id=self.new_id("call"), type="function", function=SimpleNamespace(name=name, arguments=json.dumps(arguments)))
+                    for name, arguments in response
+                ]
+                reply = SimpleNamespace(role="assistant", content=None, tool_calls=tool_calls)
+            prompt_tokens = sum(len(str(message.get("content") or "")) for message in messages) // 4
+            completion_tokens = len(reply.content or "") // 4
+            return SimpleNamespace(
+                id=self.new_id("chatcmpl"),
+                object="chat.completion",
+                model=model,
+                choices=[SimpleNamespace(index=0, message=reply, finish_reason="stop" if reply.tool_calls is None else "tool_calls")],
+                usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, total_tokens=prompt_tokens + completion_tokens),
+            )
+
+    # Files and batches
+
+    def create_file(self, file=None, purpose="batch", **kwargs):
+        name, data = file if isinstance(file, tuple) else (getattr(file, "name", "upload.jsonl"), file)
+        if hasattr(data, "read"):
+            data = data.read()
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        with self.lock:
+            record = SimpleNamespace(id=self.new_id("file"), object="file", filename=name, purpose=purpose, bytes=len(data), created_at=int(time.time()))
+            self.files[record.id] = (record, data)
+            return snapshot(record)
+
+    def file_content(self, file_id):
+        with self.lock:
+            _, data = self._get(self.files, file_id)
+            return SimpleNamespace(content=data, text=data.decode("utf-8"))
+
+    def delete_file(self, file_id):
+        with self.lock:
+            self.files.pop(file_id, None)
+            return SimpleNamespace(id=file_id, deleted=True)
+
+    def create_batch(self, input_file_id=None, endpoint="/v1/chat/completions", completion_window="24h", metadata=None, **kwargs):
+        with self.lock:
+            self._get(self.files, input_file_id)
+            batch = SimpleNamespace(
+                id=self.new_id("batch"),
+                object="batch",
+                endpoint=endpoint,
+                input_file_id=input_file_id,
+                completion_window=completion_window,
+                status="validating",
+                output_file_id=None,
+                error_file_id=None,
+                request_counts=SimpleNamespace(total=0, completed=0, failed=0),
+                metadata=metadata or {},
+                created_at=int(time.time()),
+                _ready_at=time.monotonic() + self.batch_duration,
+            )
+            self.batches[batch.id] = batch
+            return snapshot(batch)
+
+    def retrieve_batch(self, batch_id):
+        with self.lock:
+            batch = self._get(self.batches, batch_id)
+            if batch.status in ("validating", "in_progress"):
+                if time.monotonic() < batch._ready_at:
+                    batch.status = "in_progress"
+                else:
+                    self._process_batch(batch)
+            return snapshot(batch)
+
+    def cancel_batch(self, batch_id):
+        with self.lock:
+            batch = self._get(self.batches, batch_id)
+            if batch.status in ("validating", "in_progress"):
+                batch.status = "cancelled"
+            return snapshot(batch)
+
+    def _process_batch(self, batch):
+        _, data = self.files[batch.input_file_id]
+        outputs, errors = [], []
+        for line in data.decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            try:
+                body = plain(self.create_chat_completion(**request["body"]))
+            except FakeAPIError as e:
+                errors.append({"id": self.new_id("batch_req"), "custom_id": request["custom_id"], "response": None, "error": {"code": "server_error", "message": str(e)}})
+                continue
+            outputs.append({"id": self.new_id("batch_req"), "custom_id": request["custom_id"], "response": {"status_code": 200, "body": body}, "error": None})
+        # Like the real service, output lines are not necessarily in input order
+        self.random.shuffle(outputs)
+        batch.output_file_id = self._write_file(f"{batch.id}_output.jsonl", outputs) if outputs else None
+        batch.error_file_id = self._write_file(f"{batch.id}_errors.jsonl", errors) if errors else None
+        batch.request_counts = SimpleNamespace(total=len(outputs) + len(errors), completed=len(outputs), failed=len(errors))
+        batch.status = "completed"
+
+    def _write_file(self, name, lines):
+        data = "".join(json.dumps(line) + "\n" for line in lines).encode("utf-8")
+        record = SimpleNamespace(id=self.new_id("file"), object="file", filename=name, purpose="batch_output", bytes=len(data), created_at=int(time.time()))
+        self.files[record.id] = (record, data)
+        return record.id
+
+    def _ensure_idle(self, thread_id):
+        run_id = self.active_runs.get(thread_id)
+        if run_id is not None and self.runs[run_id].status in ("queued", "in_progress", "requires_action"):
+            raise FakeAPIError(f"Thread {thread_id} already has an active run {run_id}.", status_code=400)
+
+    def _tools(self, tools):
+        if not isinstance(tools, (list, tuple)):
+            return []
+        return [FunctionTool.model_validate(tool) if isinstance(tool, dict) else tool for tool in tools]
+
+    def _get(self, table, key):
+        if key not in table:
+            raise FakeAPIError(f"No such object: {key}", status_code=404)
+        return table[key]
+
+    def _page(self, items, limit, after):
+        if after is not None:
+            items = items[[item.id for item in items].index(after) + 1 :]
+        data = [snapshot(item) for item in items[:limit]]
+        return SimpleNamespace(data=data, has_more=len(items) > limit, first_id=data[0].id if data else None, last_id=data[-1].id if data else None)
+
+
+class FakeRunStream:
+    """Event stream for a run, iterable both synchronously and asynchronously."""
+
+    def __init__(self, backend, run_id):
+        self.backend = backend
+        self.run_id = run_id
+
+    def _events(self):
+        backend = self.backend
+        with backend.lock:
+            run = backend.runs[self.run_id]
+            first = ("thread.run.created" if run._tool_outputs is None else "thread.run.in_progress", snapshot(run))
+            wait = max(0.0, run._ready_at - time.monotonic())
+        yield first
+        yield None, wait
+
+        events = []
+        with backend.lock:
+            known = {message.id for message in backend.messages[run.thread_id]}
+            run.status = "in_progress"
+            events.append(("thread.run.in_progress", snapshot(run)))
+            backend._advance(run, force=True)
+            for message in backend.messages[run.thread_id]:
+                if message.id not in known:
+                    delta = SimpleNamespace(content=[SimpleNamespace(index=0, type="text", text=SimpleNamespace(value=message.content[0].text.value))])
+                    events.append(("thread.message.delta", SimpleNamespace(id=message.id, delta=delta)))
+                    events.append(("thread.message.completed", snapshot(message)))
+            events.append((f"thread.run.{run.status}", snapshot(run)))
+        yield from events
+
+    def __iter__(self):
+        for name, data in self._events():
+            if name is None:
+                time.sleep(data)
+            else:
+                yield SimpleNamespace(event=name, data=data)
+
+    async def __aiter__(self):
+        for name, data in self._events():
+            if name is None:
+                await asyncio.sleep(data)
+            else:
+                yield SimpleNamespace(event=name, data=data)
+
+    def close(self):
+        pass
+
+
+class FakeOpenAI:
+    def __init__(self, backend=None):
+        self.backend = backend or FakeBackend()
+        backend = self.backend
+        messages = self._resource("threads.messages", create=backend.create_message, list=backend.list_messages)
+        runs = self._resource(
+            "threads.runs",
+            create=backend.create_run,
+            retrieve=backend.retrieve_run,
+            submit_tool_outputs=backend.submit_tool_outputs,
+            cancel=backend.cancel_run,
+        )
+        threads = self._resource("threads", create=backend.create_thread, retrieve=backend.retrieve_thread, delete=backend.delete_thread)
+        threads.messages = messages
+        threads.runs = runs
+        assistants = self._resource(
+            "assistants",
+            create=backend.create_assistant,
+            retrieve=backend.retrieve_assistant,
+            update=backend.update_assistant,
+            list=backend.list_assistants,
+            delete=backend.delete_assistant,
+        )
+        self.beta = SimpleNamespace(assistants=assistants, threads=threads)
+        # A completion is one round trip that also takes the model's time
+        completions = SimpleNamespace(create=self._wrap("chat.completions.create", backend.create_chat_completion, generates=True))
+        self.chat = SimpleNamespace(completions=completions)
+        self.files = self._resource("files", create=backend.create_file, content=backend.file_content, delete=backend.delete_file)
+        self.batches = self._resource("batches", create=backend.create_batch, retrieve=backend.retrieve_batch, cancel=backend.cancel_batch)
+
+    def _resource(self, prefix, **methods):
+        return SimpleNamespace(**{name: self._wrap(f"{prefix}.{name}", method) for name, method in methods.items()})
+
+    def _latency(self, generates):
+        return self.backend.api_latency + (self.backend.run_duration if generates else 0.0)
+
+    def _wrap(self, name, method, generates=False):
+        def call(*args, **kwargs):
+            self.backend.before_call(name)
+            latency = self._latency(generates)
+            if latency:
+                time.sleep(latency)
+            return method(*args, **kwargs)
+
+        return call
+
+
+class FakeAsyncOpenAI(FakeOpenAI):
+    def _wrap(self, name, method, generates=False):
+        async def call(*args, **kwargs):
+            self.backend.before_call(name)
+            latency = self._latency(generates)
+            if latency:
+                await asyncio.sleep(latency)
+            return method(*args, **kwargs)
+
+        return call
@@ -0,0 +1,126 @@
+# message_queue.py
+import logging
+import threading
+import time
+from collections import deque
+
+from .telemetry import observe
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("block", "drop_oldest", "drop_newest", "reject")
+
+
+class QueueFull(Exception):
+    pass
+
+
+class MessageQueue:
+    """Per-conversation queue drained by a single worker, so a thread never has two runs in flight.
+
+    The worker is whichever caller finds the queue idle (or a short-lived background thread when
+    `background=True`); it loops until the queue is empty instead of recursing once per message.
+    When `maxsize` is reached, `overflow` decides what happens to a new message:
+
+    - "block": wait up to `put_timeout` for room, then raise QueueFull
+    - "drop_oldest": discard the oldest queued message
+    - "drop_newest": discard the new message, `put` returns False
+    - "reject": raise QueueFull straight away
+
+    With `coalesce=True` every queued message with the same `direct` flag is handed to the handler
+    in one batch, so a burst becomes one run instead of one run per message. The handler is called
+    as `handler(messages, direct)`; a strategy given a queue without one installs its own.
+    """
+
+    def __init__(self, maxsize=None, overflow="block", coalesce=False, background=False, put_timeout=None, handler=None):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}, got {overflow!r}")
+        self.handler = handler
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.coalesce = coalesce
+        self.background = background
+        self.put_timeout = put_timeout
+        self.items = deque()
+        # When each queued message arrived, for the `queue.wait` histogram
+        self.arrivals = deque()
+        self.condition = threading.Condition()
+        # Set while a worker owns the queue; holds its thread ident once it is draining
+        self.worker = None
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def busy(self):
+        return self.worker is not None
+
+    def put(self, message, direct=False):
+        """Queue a message and drain the queue if no worker is active. Returns False if the message was dropped."""
+        with self.condition:
+            if self.maxsize and len(self.items) >= self.maxsize and not self._make_room():
+                return False
+            self.items.append((message, direct))
+            self.arrivals.append(time.perf_counter())
+            if self.worker is not None:
+                return True
+            self.worker = True
+
+        if self.background:
+            threading.Thread(target=self._drain, name="message-queue-worker", daemon=True).start()
+        else:
+            self._drain()
+        return True
+
+    def join(self, timeout=None):
+        """Wait until every queued message has been handled. Returns False on timeout."""
+        with self.condition:
+            return self.condition.wait_for(lambda: self.worker is None and not self.items, timeout)
+
+    def _make_room(self):
+        if self.overflow == "drop_oldest":
+            self.items.popleft()
+            self._arrived()
+            self.dropped += 1
+            return True
+        if self.overflow == "drop_newest":
+            self.dropped += 1
+            return False
+        # A worker putting from inside its own handler can never see the queue shrink
+        if self.overflow == "block" and self.worker != threading.get_ident():
+            if self.condition.wait_for(lambda: len(self.items) < self.maxsize, self.put_timeout):
+                return True
+        raise QueueFull(f"Message queue is full ({self.maxsize} messages)")
+
+    def _take(self):
+        message, direct = self.items.popleft()
+        arrived = self._arrived()
+        if arrived is not None:
+            observe("queue.wait", time.perf_counter() - arrived)
+        messages = [message]
+        while self.coalesce and self.items and self.items[0][1] == direct:
+            messages.append(self.items.popleft()[0])
+            self._arrived()
+        return messages, direct
+
+    def _arrived(self):
+        # Items put straight on the deque have no arrival time
+        return self.arrivals.popleft() if len(self.arrivals) > len(self.items) else None
+
+    def _drain(self):
+        with self.condition:
+            self.worker = threading.get_ident()
+        while True:
+            with self.condition:
+                if not self.items:
+                    self.worker = None
+                    self.condition.notify_all()
+                    return
+                messages, direct = self._take()
+                # Wake producers blocked on a full queue
+                self.condition.notify_all()
+            try:
+                self.handler(messages, direct)
+            except Exception as e:
+                logger.error("An error occurred while processing messages: %s", e)
@@ -41,3 +41,10 @@ class ModelValidator:
         """Check if a method has annotations that are subclasses of BaseModel."""
         annotations = get_type_hints(method)
         return any(ModelValidator.is_base_model_subclass(type_) for type_ in annotations.values())
+
+    @staticmethod
+    def base_model_annotations(method):
+        """One pass over a method's type hints: whether one is exactly BaseModel, and the BaseModel subclasses used."""
+        annotations = get_type_hints(method)
+        subclasses = [type_ for type_ in annotations.values() if ModelValidator.is_base_model_subclass(type_)]
+        return any(ModelValidator.is_base_model(type_) for type_ in annotations.values()), subclasses
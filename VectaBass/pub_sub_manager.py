@@ -1,3 +1,141 @@
+# pub_sub_manager.py
+"""
+Topic based publish/subscribe used between strategies, agents and the tool dispatcher.
+
+Each subscription picks how it is delivered to:
+
+- "sync": the callback runs inline on the publisher's thread (the default, and the original behaviour)
+- "thread": events go on the subscription's own bounded queue, drained in order on a shared thread pool
+- "async": events go on the subscription's queue, drained by a task on the event loop it was created on;
+  the callback may be a coroutine function
+
+Queued subscriptions never block the publisher. When a queue is full, `overflow` either drops the
+oldest event, drops the new event, or rejects it with QueueFull. With `batch_size` above 1 the
+callback receives lists of up to that many events.
+
+With `weak=True` the subscription only holds a weak reference to its callback (a WeakMethod for bound
+methods), so subscribing does not keep the subscriber alive; once it is collected the subscription is
+dropped from its topic.
+
+A topic ending in "*" subscribes to every topic with that prefix, e.g. "print_message_*". The
+subscribers of a topic are resolved once and cached until the subscriptions change, so a publish
+costs one dict lookup plus one call or queue append per subscriber. The cache keeps the latest
+`max_resolved` topics, so per session topics in a long running server do not pile up.
+"""
+import asyncio
+import inspect
+import logging
+import threading
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .message_queue import QueueFull
+
+logger = logging.getLogger(__name__)
+
+DELIVERY_MODES = ("sync", "thread", "async")
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "reject")
+
+
+class Subscription:
+    def __init__(self, pubsub, topic, callback, mode="sync", maxsize=1000, overflow="drop_oldest", batch_size=1, loop=None, weak=False):
+        if mode not in DELIVERY_MODES:
+            raise ValueError(f"mode must be one of {DELIVERY_MODES}, got {mode!r}")
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}, got {overflow!r}")
+        self.pubsub = pubsub
+        self.topic = topic
+        if weak:
+            self._callback = None
+            self._ref = (weakref.WeakMethod if inspect.ismethod(callback) else weakref.ref)(callback, self._expired)
+        else:
+            self._callback = callback
+            self._ref = None
+        self.mode = mode
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.batch_size = batch_size
+        self.loop = loop
+        if mode == "async" and loop is None:
+            self.loop = asyncio.get_running_loop()
+        self.queue = deque()
+        self.condition = threading.Condition()
+        self.scheduled = False
+        self.dropped = 0
+
+    @property
+    def callback(self):
+        return self._callback if self._ref is None else self._ref()
+
+    def _expired(self, ref):
+        # Called by the garbage collector, possibly while this thread holds the PubSub lock, so only queue it
+        self.pubsub.expired.append(self)
+
+    def deliver(self, data):
+        if self.mode == "sync":
+            callback = self.callback
+            if callback is not None:
+                callback([data] if self.batch_size > 1 else data)
+            return
+        with self.condition:
+            if self.maxsize and len(self.queue) >= self.maxsize:
+                if self.overflow == "reject":
+                    raise QueueFull(f"Subscriber queue for {self.topic} is full ({self.maxsize} events)")
+                self.dropped += 1
+                if self.overflow == "drop_newest":
+                    return
+                self.queue.popleft()
+            self.queue.append(data)
+            if self.scheduled:
+                return
+            self.scheduled = True
+        if self.mode == "thread":
+            self.pubsub.executor().submit(self._drain)
+        else:
+            self.loop.call_soon_threadsafe(self._start_task)
+
+    def join(self, timeout=None):
+        """Wait until every queued event has been delivered. Returns False on timeout."""
+        with self.condition:
+            return self.condition.wait_for(lambda: not self.scheduled, timeout)
+
+    def _next_batch(self):
+        with self.condition:
+            if not self.queue:
+                self.scheduled = False
+                self.condition.notify_all()
+                return None
+            if self.batch_size > 1:
+                return [self.queue.popleft() for _ in range(min(self.batch_size, len(self.queue)))]
+            return self.queue.popleft()
+
+    def _drain(self):
+        while (batch := self._next_batch()) is not None:
+            callback = self.callback
+            if callback is None:
+                continue
+            try:
+                callback(batch)
+            except Exception as e:
+                logger.error("An error occurred in a subscriber of %s: %s", self.topic, e)
+
+    def _start_task(self):
+        self.loop.create_task(self._adrain())
+
+    async def _adrain(self):
+        while (batch := self._next_batch()) is not None:
+            callback = self.callback
+            if callback is None:
+                continue
+            try:
+                result = callback(batch)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.error("An error occurred in a subscriber of %s: %s", self.topic, e)
+
+
 class PubSub:
     _instance = None
 
@@ -6,18 +144,88 @@ class PubSub:
             cls._instance = super(PubSub, cls).__new__(cls)
             # Initialize any variables here
             cls._instance.subscribers = {}
+            cls._instance.patterns = {}
+            cls._instance.resolved = {}
+            cls._instance.max_resolved = 4096
+            cls._instance.lock = threading.Lock()
+            # Weak subscriptions whose subscriber was collected, removed on the next change or lookup
+            cls._instance.expired = deque()
+            cls._instance.max_workers = 4
+            cls._instance._executor = None
         return cls._instance
 
-    def subscribe(self, event_type, callback):
-        if event_type not in self.subscribers:
-            self.subscribers[event_type] = []
-        self.subscribers[event_type].append(callback)
+    def subscribe(self, event_type, callback, mode="sync", maxsize=1000, overflow="drop_oldest", batch_size=1, loop=None, weak=False):
+        subscription = Subscription(
+            self, event_type, callback, mode=mode, maxsize=maxsize, overflow=overflow, batch_size=batch_size, loop=loop, weak=weak
+        )
+        with self.lock:
+            self._purge()
+            if event_type.endswith("*"):
+                self.patterns.setdefault(event_type[:-1], []).append(subscription)
+            else:
+                self.subscribers.setdefault(event_type, []).append(subscription)
+            self.resolved = {}
+        return subscription
 
     def unsubscribe(self, event_type, callback):
-        if event_type in self.subscribers:
-            self.subscribers[event_type].remove(callback)
+        with self.lock:
+            self._purge()
+            self._remove(event_type, lambda subscription: subscription.callback != callback)
+
+    def purge(self):
+        """Drop the weak subscriptions whose subscriber was collected. Changes and lookups do it too."""
+        with self.lock:
+            self._purge()
+
+    def _remove(self, event_type, keep):
+        # Called with the lock held
+        index, key = (self.patterns, event_type[:-1]) if event_type.endswith("*") else (self.subscribers, event_type)
+        subscriptions = [subscription for subscription in index.get(key, []) if keep(subscription)]
+        if subscriptions:
+            index[key] = subscriptions
+        else:
+            index.pop(key, None)
+        self.resolved = {}
+
+    def _purge(self):
+        # Called with the lock held
+        while self.expired:
+            dead = self.expired.popleft()
+            self._remove(dead.topic, lambda subscription: subscription is not dead)
+            # Break the subscription -> weakref -> _expired cycle so it is freed right away
+            dead._ref = None
 
     def publish(self, event_type, data):
-        if event_type in self.subscribers:
-            for callback in self.subscribers[event_type]:
-                callback(data)
+        subscriptions = self.resolved.get(event_type)
+        if subscriptions is None:
+            subscriptions = self._resolve(event_type)
+        for subscription in subscriptions:
+            subscription.deliver(data)
+
+    def flush(self, timeout=None):
+        """Wait for every queued subscription to catch up. Returns False if one is still busy after `timeout`."""
+        with self.lock:
+            subscriptions = [subscription for index in (self.subscribers, self.patterns) for group in index.values() for subscription in group]
+        return all(subscription.join(timeout) for subscription in subscriptions if subscription.mode != "sync")
+
+    def executor(self):
+        if self._executor is None:
+            with self.lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pubsub")
+        return self._executor
+
+    def _resolve(self, event_type):
+        with self.lock:
+            self._purge()
+            subscriptions = list(self.subscribers.get(event_type, []))
+            if self.patterns:
+                # One lookup per prefix length instead of one test per pattern
+                for end in range(len(event_type) + 1):
+                    subscriptions.extend(self.patterns.get(event_type[:end], []))
+            subscriptions = tuple(subscriptions)
+            self.resolved[event_type] = subscriptions
+            if len(self.resolved) > self.max_resolved:
+                # Oldest first, dicts keep insertion order
+                del self.resolved[next(iter(self.resolved))]
+        return subscriptions
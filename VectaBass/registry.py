@@ -8,102 +8,350 @@ if it doesn’t require any special handling or dynamic model substitution.
 
 Use a parameter of type BaseModel, which should be registered under model_methods because 
 it indicates a need for potential model substitution or more dynamic handling.
+
+Everything about a method that does not depend on the instance (type hints, classification, dispatch
+options, argument binder, tool cache, schema) is compiled once into a MethodTemplate, and a class's
+exposed methods once into a RegistryTemplate. Registering a manager then only binds its methods and
+prefixes their names. Templates are built on the first instance of a class, so annotations may refer
+to names defined after it; a class patched later can call `RegistryTemplate.invalidate(cls)`.
 """
 import inspect
+import logging
+import threading
+import weakref
+from contextlib import contextmanager
+from types import MappingProxyType, MethodType
 
-from pydantic import BaseModel, Field
+from .argument_binder import ArgumentBinder
 from .model_utils import ModelValidator
+from .tool_cache import get_tool_cache
+from .tool_dispatch import DispatchOptions, get_dispatch_options
+
+logger = logging.getLogger(__name__)
+
+
+class RegistryEntry:
+    __slots__ = ("method", "annotations", "options", "binder", "cache")
+
+    def __init__(self, method, annotations=None, options=None, binder=None, cache=None):
+        self.method = method
+        self.annotations = annotations if annotations is not None else {}
+        self.options = options or DispatchOptions()
+        self.binder = binder
+        self.cache = cache
+
+
+class MethodTemplate:
+    """What the Registry needs to know about a function, independent of the instance it is bound to."""
+
+    __slots__ = ("function", "annotations", "takes_model", "models", "options", "binder", "cache", "schema")
+
+    # function -> MethodTemplate
+    _compiled = weakref.WeakKeyDictionary()
+
+    def __init__(self, method):
+        from .schema_generator import generate_method_schema
+
+        # `method` is bound (to anything) so the signature, and so the schema, leave out self or cls.
+        # Only the function is kept: a template must not keep the class it was compiled for alive.
+        self.function = getattr(method, "__func__", method)
+        self.annotations = ModelValidator.get_annotations(method)
+        self.takes_model, self.models = ModelValidator.base_model_annotations(method)
+        self.options = get_dispatch_options(method)
+        self.binder = ArgumentBinder.for_method(method, self.annotations)
+        self.cache = get_tool_cache(method)
+        self.schema = generate_method_schema(None, RegistryEntry(method, self.annotations))["function"]
+
+    @classmethod
+    def for_method(cls, method):
+        func = getattr(method, "__func__", method)
+        try:
+            template = cls._compiled.get(func)
+        except TypeError:
+            return cls(method)
+        if template is None:
+            template = cls._compiled[func] = cls(method)
+        return template
+
+    def entry(self, method):
+        return RegistryEntry(method=method, annotations=self.annotations, options=self.options, binder=self.binder, cache=self.cache)
+
+    def tool_schema(self, identifier):
+        return {"type": "function", "function": {**self.schema, "name": identifier}}
+
+
+class RegistryTemplate:
+    """The methods a class exposes as tools, compiled once per class."""
+
+    # class -> RegistryTemplate
+    _templates = weakref.WeakKeyDictionary()
+
+    def __init__(self, cls):
+        reserved = getattr(cls, "_reserved_methods", ())
+        # (name, template, bound to the class rather than the instance)
+        self.methods = []
+        for name in dir(cls):
+            if name.startswith("_") or name in reserved:
+                continue
+            attr = inspect.getattr_static(cls, name)
+            if isinstance(attr, classmethod):
+                self.methods.append((name, MethodTemplate.for_method(MethodType(attr.__func__, cls)), True))
+            elif inspect.isfunction(attr):
+                self.methods.append((name, MethodTemplate.for_method(MethodType(attr, cls)), False))
+
+    @classmethod
+    def for_class(cls, owner):
+        template = cls._templates.get(owner)
+        if template is None:
+            template = cls._templates[owner] = cls(owner)
+        return template
+
+    @classmethod
+    def invalidate(cls, owner):
+        cls._templates.pop(owner, None)
+
+    def bind(self, instance):
+        """(name, bound method, method template) for every exposed method of `instance`."""
+        owner = type(instance)
+        for name, template, class_bound in self.methods:
+            yield name, MethodType(template.function, owner if class_bound else instance), template
 
 
-class RegistryEntry(BaseModel):
-    method: callable
-    annotations: dict = Field(default_factory=dict)
+class RegistrySnapshot:
+    """Read only view of a registry's entries, replaced as a whole once a change (or a batch of changes) is complete."""
 
-    class Config:
-        arbitrary_types_allowed = True
+    __slots__ = ("version", "methods", "model_methods")
+
+    def __init__(self, version=0, methods=None, model_methods=None):
+        self.version = version
+        self.methods = MappingProxyType(dict(methods or {}))
+        self.model_methods = MappingProxyType(dict(model_methods or {}))
+
+    def lookup(self, identifier):
+        return self.methods.get(identifier) or self.model_methods.get(identifier)
 
 
 class ManagerRegistry:
-    managers = {}
+    # Weak, so a manager nobody else references is collected instead of living as long as the process
+    managers = weakref.WeakValueDictionary()
 
     @classmethod
     def add_manager(cls, manager):
         cls.managers[manager.name] = manager
 
+    @classmethod
+    def remove_manager(cls, manager):
+        if cls.managers.get(manager.name) is manager:
+            del cls.managers[manager.name]
+
 
 class Registry:
+    """Tools of one manager.
+
+    `methods` and `model_methods` are the working tables, changed under `lock`. Readers (schema
+    generation, tool dispatch) go through `snapshot`, which is republished when a change or the
+    outermost batch completes, so they never see a batch half applied. Linked methods are indexed by
+    model, every entry by its owner and by the models it takes, so unlinking touches only the entries
+    concerned and removes them for good.
+    """
+
     def __init__(self, parent):
         self.parent = parent
         self.methods = {}
         self.models = {}
         self.model_methods = {}
+        # model name -> identifiers of the methods linked to it (a dict used as an ordered set)
+        self.model_links = {}
+        # identifier -> names of the models it takes
+        self.method_models = {}
+        # owner name -> identifiers it registered, and back
+        self.owner_methods = {}
+        self.method_owners = {}
+        self.schema_cache = {}
+        self.snapshot = RegistrySnapshot()
+        self.lock = threading.RLock()
+        self._batch_depth = 0
+        self._dirty = False
+        self._pending_removals = {}
         self._register_parent_methods()
 
-    def _update_manager(self):
-        self.parent.assistant_manager.chat.add_tool(self.generate_json_schema(), [])
+    @contextmanager
+    def batch(self):
+        """Defer tool schema pushes until the outermost batch exits, then push once."""
+        with self.lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self.flush()
+
+    def flush(self):
+        with self.lock:
+            if not self._dirty:
+                return
+            tools_to_remove = list(self._pending_removals)
+            self._dirty = False
+            self._pending_removals = {}
+            self.snapshot = RegistrySnapshot(self.snapshot.version + 1, self.methods, self.model_methods)
+            tool_schema = self.generate_json_schema()
+        self.parent.assistant_manager.chat.add_tool(tool_schema, tools_to_remove)
+
+    @property
+    def version(self):
+        return self.snapshot.version
+
+    def _update_manager(self, tools_to_remove=[]):
+        self._dirty = True
+        self._pending_removals.update(dict.fromkeys(tools_to_remove))
+        if self._batch_depth == 0:
+            self.flush()
+
+    def _mark_added(self, identifier):
+        # A tool removed and then registered again inside a batch must survive the flush
+        self._pending_removals.pop(identifier, None)
 
     def _register_parent_methods(self):
-        methods = inspect.getmembers(self.parent, predicate=inspect.ismethod)
-        for name, method in methods:
-            if not name.startswith("_"):
-                self.register_method(self.parent.name, name, method)
-        self._update_manager()
-
-    def register_method(self, parent_name, method_name, method):
-        annotations = ModelValidator.get_annotations(method)
-        has_base_model = ModelValidator.has_base_model_annotations(method)
-        has_base_model_subclass = ModelValidator.has_base_model_subclass_annotations(method)
-
-        entry = RegistryEntry(method=method, annotations=annotations)
-
-        if has_base_model:
-            self.model_methods[f"{parent_name}_{method_name}"] = entry
-        elif has_base_model_subclass:
-            self.methods[f"{parent_name}_{method_name}"] = entry
-            # Register each unique subclass found in annotations as a model
-            for type_ in annotations.values():
-                if ModelValidator.is_base_model_subclass(type_):
+        template = RegistryTemplate.for_class(type(self.parent))
+        with self.batch():
+            for name, method, method_template in template.bind(self.parent):
+                self.register_method(self.parent.name, name, method, method_template)
+            self._update_manager()
+
+    def register_method(self, parent_name, method_name, method, template=None):
+        template = template or MethodTemplate.for_method(method)
+        entry = template.entry(method)
+
+        identifier = f"{parent_name}_{method_name}"
+        with self.lock:
+            if template.takes_model:
+                self._add(identifier, entry, self.model_methods, parent_name)
+            elif template.models:
+                self._add(identifier, entry, self.methods, parent_name, [model.__name__ for model in template.models])
+                # Register each unique subclass found in annotations as a model
+                for type_ in template.models:
                     if type_.__name__ not in self.models:
                         self.register_model(type_.__name__, type_)
-        else:
-            self.methods[f"{parent_name}_{method_name}"] = entry
+            else:
+                self._add(identifier, entry, self.methods, parent_name)
+            # The schema only differs from the template's by its name
+            self.schema_cache[identifier] = (entry, template.tool_schema(identifier))
+            self._update_manager()
+
+    def _add(self, identifier, entry, table, owner, models=()):
+        # Called with the lock held
+        self._discard(identifier)
+        table[identifier] = entry
+        self.owner_methods.setdefault(owner, {})[identifier] = None
+        self.method_owners[identifier] = owner
+        if models:
+            self.method_models[identifier] = set(models)
+        self._mark_added(identifier)
+
+    def _discard(self, identifier):
+        # Called with the lock held; drops an entry from the tables and every index
+        found = self.methods.pop(identifier, None) or self.model_methods.pop(identifier, None)
+        owner = self.method_owners.pop(identifier, None)
+        if owner is not None:
+            owned = self.owner_methods[owner]
+            owned.pop(identifier, None)
+            if not owned:
+                del self.owner_methods[owner]
+        for model_name in self.method_models.pop(identifier, ()):
+            linked = self.model_links.get(model_name)
+            if linked is not None:
+                linked.pop(identifier, None)
+        return found is not None
+
+    def lookup(self, identifier):
+        return self.snapshot.lookup(identifier)
+
+    def methods_for_model(self, model_name):
+        return list(self.model_links.get(model_name, ()))
+
+    def models_for_method(self, identifier):
+        return set(self.method_models.get(identifier, ()))
 
     def register_model(self, model_name, model):
         if model_name not in self.models:
             self.models[model_name] = model
-            print(f"Model {model_name} registered.")
+            logger.debug("Model %s registered.", model_name)
 
     def link_model_to_methods(self, model_name, methods):
         model = self.models.get(model_name)
         if model:
-            for method in methods:
-                method_name = f"{method.__qualname__}_{model_name}_"
-                annotations = ModelValidator.get_annotations(method)
-                updated_annotations = {key: model if ModelValidator.is_base_model(value) else value for key, value in annotations.items()}
-                entry = RegistryEntry(method=method, annotations=updated_annotations)
-                self.methods[method_name] = entry
+            with self.lock:
+                for method in methods:
+                    method_name = f"{method.__qualname__}_{model_name}_"
+                    annotations = ModelValidator.get_annotations(method)
+                    updated_annotations = {key: model if ModelValidator.is_base_model(value) else value for key, value in annotations.items()}
+                    entry = RegistryEntry(
+                        method=method,
+                        annotations=updated_annotations,
+                        options=get_dispatch_options(method),
+                        binder=ArgumentBinder.for_method(method, updated_annotations),
+                        cache=get_tool_cache(method),
+                    )
+                    owner = getattr(getattr(method, "__self__", None), "name", None) or self.parent.name
+                    self._add(method_name, entry, self.methods, owner, [model_name])
+                    self.model_links.setdefault(model_name, {})[method_name] = None
                 self._update_manager()
         else:
             raise ValueError(f"Model {model_name} not found in the registry.")
 
+    def unlink_model_from_methods(self, model_name, methods):
+        """Remove the tools linking `model_name` to `methods`, keeping the model and its other links."""
+        with self.lock:
+            tools_to_remove = [identifier for identifier in (f"{method.__qualname__}_{model_name}_" for method in methods) if self._discard(identifier)]
+            if tools_to_remove:
+                self._update_manager(tools_to_remove)
+        return tools_to_remove
+
+    def unregister_method(self, identifier):
+        with self.lock:
+            removed = self._discard(identifier)
+            if removed:
+                self._update_manager([identifier])
+        return removed
+
+    def unregister_owner(self, owner):
+        """Remove every entry registered by (or linked to a method of) `owner`."""
+        with self.lock:
+            tools_to_remove = list(self.owner_methods.get(owner, ()))
+            for identifier in tools_to_remove:
+                self._discard(identifier)
+            if tools_to_remove:
+                self._update_manager(tools_to_remove)
+        return tools_to_remove
+
     def unregister_model(self, model_name):
-        if model_name in self.models:
-            del self.models[model_name]
-            tools_to_remove = self.unregister_model_specific_methods(model_name)
-            self.parent.assistant_manager.chat.add_tool(self.generate_json_schema(), tools_to_remove)
+        with self.lock:
+            if model_name in self.models:
+                del self.models[model_name]
+                tools_to_remove = self.unregister_model_specific_methods(model_name)
+                self._update_manager(tools_to_remove)
 
     def unregister_model_specific_methods(self, model_name):
-        tools_to_remove = []
-        for key, entry in self.methods.items():
-            print(key)
-            if key.endswith(f"_{model_name}_"):
-                tool_name = key.replace(f"{self.parent.name}_", "")
-                tools_to_remove.append(tool_name)
+        with self.lock:
+            tools_to_remove = list(self.model_links.pop(model_name, ()))
+            for identifier in tools_to_remove:
+                self._discard(identifier)
         if not tools_to_remove:
-            print("No specific methods found to unregister.")
+            logger.debug("No specific methods found to unregister for %s.", model_name)
         return tools_to_remove
 
+    def clear(self):
+        """Drop every entry and index without pushing anything, for a manager that is closing."""
+        with self.lock:
+            for table in (self.methods, self.models, self.model_methods, self.model_links, self.method_models, self.owner_methods, self.method_owners):
+                table.clear()
+            self.schema_cache.clear()
+            self._dirty = False
+            self._pending_removals = {}
+            self.snapshot = RegistrySnapshot(self.snapshot.version + 1)
+
     def generate_json_schema(self):
         from .schema_generator import generate_tool_schema
 
-        return generate_tool_schema(self)
+        return generate_tool_schema(self, self.snapshot.methods)
@@ -0,0 +1,184 @@
+# run_completion.py
+import asyncio
+import logging
+import random
+import time
+from abc import ABC, abstractmethod
+
+from .telemetry import span
+
+logger = logging.getLogger(__name__)
+
+PENDING_STATUSES = {"queued", "in_progress", "cancelling"}
+TERMINAL_STATUSES = {"completed", "failed", "cancelled", "expired", "incomplete"}
+
+
+class Backoff:
+    """Adaptive polling intervals: short at first, growing geometrically with jitter up to a cap."""
+
+    def __init__(self, initial=0.05, factor=1.8, maximum=2.0, jitter=0.2):
+        self.initial = initial
+        self.factor = factor
+        self.maximum = maximum
+        self.jitter = jitter
+
+    def delays(self):
+        delay = self.initial
+        while True:
+            spread = delay * self.jitter
+            yield max(0.0, delay + random.uniform(-spread, spread))
+            delay = min(delay * self.factor, self.maximum)
+
+
+class CompletionEngine(ABC):
+
+    @abstractmethod
+    def run(self, client, thread_id, assistant_id, tools, on_action, on_event=None):
+        """Create a run on the thread and drive it to a terminal state, returning the final run."""
+
+    @abstractmethod
+    def wait(self, client, thread_id, run, on_action):
+        """Drive an already created run to a terminal state, returning the final run."""
+
+
+class PollingCompletion(CompletionEngine):
+    def __init__(self, backoff=None, timeout=600.0, sleep=time.sleep, clock=time.monotonic):
+        self.backoff = backoff or Backoff()
+        self.timeout = timeout
+        self.sleep = sleep
+        self.clock = clock
+
+    def run(self, client, thread_id, assistant_id, tools, on_action, on_event=None):
+        with span("run.create"):
+            run = client.beta.threads.runs.create(thread_id=thread_id, assistant_id=assistant_id, tools=tools)
+        return self.wait(client, thread_id, run, on_action)
+
+    def wait(self, client, thread_id, run, on_action):
+        deadline = self.clock() + self.timeout
+        delays = self.backoff.delays()
+        while True:
+            if run.status == "requires_action":
+                outputs = on_action(run.required_action)
+                with span("run.submit_tool_outputs"):
+                    run = client.beta.threads.runs.submit_tool_outputs(thread_id=thread_id, run_id=run.id, tool_outputs=outputs)
+                # Tool outputs usually resolve quickly, so start the backoff over
+                delays = self.backoff.delays()
+                continue
+            if run.status not in PENDING_STATUSES:
+                return run
+
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                logger.warning("Run %s timed out after %ss. Cancelling.", run.id, self.timeout)
+                return client.beta.threads.runs.cancel(thread_id=thread_id, run_id=run.id)
+            self.sleep(min(next(delays), remaining))
+            with span("run.poll"):
+                run = client.beta.threads.runs.retrieve(run_id=run.id, thread_id=thread_id)
+
+
+class StreamingCompletion(CompletionEngine):
+    """Consumes run events as they arrive instead of polling for status changes.
+
+    If the stream ends before the run reaches a terminal state, the run is handed to the polling fallback.
+    """
+
+    def __init__(self, fallback=None):
+        self.fallback = fallback or PollingCompletion()
+
+    def run(self, client, thread_id, assistant_id, tools, on_action, on_event=None):
+        with span("run.create"):
+            stream = client.beta.threads.runs.create(thread_id=thread_id, assistant_id=assistant_id, tools=tools, stream=True)
+        while True:
+            run = self._consume(stream, on_event)
+            if run is None:
+                return None
+            if run.status in PENDING_STATUSES:
+                # The stream dropped mid-run, finish the job by polling
+                return self.fallback.wait(client, thread_id, run, on_action)
+            if run.status != "requires_action":
+                return run
+            outputs = on_action(run.required_action)
+            with span("run.submit_tool_outputs"):
+                stream = client.beta.threads.runs.submit_tool_outputs(thread_id=thread_id, run_id=run.id, tool_outputs=outputs, stream=True)
+
+    def wait(self, client, thread_id, run, on_action):
+        return self.fallback.wait(client, thread_id, run, on_action)
+
+    def _consume(self, stream, on_event):
+        run = None
+        for event in stream:
+            if on_event is not None:
+                on_event(event)
+            if event.event.startswith("thread.run.") and not event.event.startswith("thread.run.step."):
+                run = event.data
+        return run
+
+
+class AsyncPollingCompletion(CompletionEngine):
+    """Polling engine for async clients; `on_action` is a coroutine function."""
+
+    def __init__(self, backoff=None, timeout=600.0, sleep=asyncio.sleep, clock=time.monotonic):
+        self.backoff = backoff or Backoff()
+        self.timeout = timeout
+        self.sleep = sleep
+        self.clock = clock
+
+    async def run(self, client, thread_id, assistant_id, tools, on_action, on_event=None):
+        with span("run.create"):
+            run = await client.beta.threads.runs.create(thread_id=thread_id, assistant_id=assistant_id, tools=tools)
+        return await self.wait(client, thread_id, run, on_action)
+
+    async def wait(self, client, thread_id, run, on_action):
+        deadline = self.clock() + self.timeout
+        delays = self.backoff.delays()
+        while True:
+            if run.status == "requires_action":
+                outputs = await on_action(run.required_action)
+                with span("run.submit_tool_outputs"):
+                    run = await client.beta.threads.runs.submit_tool_outputs(thread_id=thread_id, run_id=run.id, tool_outputs=outputs)
+                delays = self.backoff.delays()
+                continue
+            if run.status not in PENDING_STATUSES:
+                return run
+
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                logger.warning("Run %s timed out after %ss. Cancelling.", run.id, self.timeout)
+                return await client.beta.threads.runs.cancel(thread_id=thread_id, run_id=run.id)
+            await self.sleep(min(next(delays), remaining))
+            with span("run.poll"):
+                run = await client.beta.threads.runs.retrieve(run_id=run.id, thread_id=thread_id)
+
+
+class AsyncStreamingCompletion(CompletionEngine):
+    """Streaming engine for async clients, falling back to async polling if the stream drops."""
+
+    def __init__(self, fallback=None):
+        self.fallback = fallback or AsyncPollingCompletion()
+
+    async def run(self, client, thread_id, assistant_id, tools, on_action, on_event=None):
+        with span("run.create"):
+            stream = await client.beta.threads.runs.create(thread_id=thread_id, assistant_id=assistant_id, tools=tools, stream=True)
+        while True:
+            run = await self._consume(stream, on_event)
+            if run is None:
+                return None
+            if run.status in PENDING_STATUSES:
+                return await self.fallback.wait(client, thread_id, run, on_action)
+            if run.status != "requires_action":
+                return run
+            outputs = await on_action(run.required_action)
+            with span("run.submit_tool_outputs"):
+                stream = await client.beta.threads.runs.submit_tool_outputs(thread_id=thread_id, run_id=run.id, tool_outputs=outputs, stream=True)
+
+    async def wait(self, client, thread_id, run, on_action):
+        return await self.fallback.wait(client, thread_id, run, on_action)
+
+    async def _consume(self, stream, on_event):
+        run = None
+        async for event in stream:
+            if on_event is not None:
+                on_event(event)
+            if event.event.startswith("thread.run.") and not event.event.startswith("thread.run.step."):
+                run = event.data
+        return run
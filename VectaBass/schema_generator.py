@@ -1,56 +1,125 @@
 # schema_generator.py
+"""
+Tool schemas are memoised at two levels:
+
+- model schemas are cached per model class and shared by every method and nested field using them;
+- method schemas are cached in the registry's `schema_cache` and reused while the RegistryEntry object
+  stays the same, so regenerating a registry's tool schema only rebuilds the entries that were replaced.
+
+Models that reference themselves (directly or through other models) are emitted once under
+`$defs` and referenced with `$ref` instead of being expanded inline. Cached schemas are shared,
+treat them as read only.
+"""
 from enum import Enum
 from typing import Type, get_args, get_origin
+import weakref
 from pydantic import BaseModel, Field
 import inspect
 
+# model class -> (id of model_fields, schema, defs needed by schema)
+_model_cache = weakref.WeakKeyDictionary()
+
+
+class _SchemaBuilder:
+    def __init__(self):
+        self.defs = {}
+        self.stack = []
+        # Lowest stack position reachable through a back reference, per model being generated
+        self.lows = []
+
+    def type_schema(self, param_type):
+        origin = get_origin(param_type)
+        if origin is not None:
+            args = get_args(param_type)
+            if origin == list:
+                return {"type": "array", "items": self.type_schema(args[0])}
+            elif origin == dict:
+                value_schema = self.type_schema(args[1])
+                return {"type": "object", "additionalProperties": value_schema}
+            # Handle other generic types as needed
+            return {"type": "object"}  # Fallback for unmapped generic types
+
+        if isinstance(param_type, type):
+            if issubclass(param_type, BaseModel):
+                return self.model_schema(param_type)
+            elif issubclass(param_type, Enum):
+                return {"type": "string", "enum": [e.value for e in param_type]}
+            elif param_type == str:
+                return {"type": "string"}
+            elif param_type == int:
+                return {"type": "integer"}
+            elif param_type == float:
+                return {"type": "number"}
+            elif param_type == bool:
+                return {"type": "boolean"}
+            elif param_type == list:
+                return {"type": "array", "items": {"type": "string"}}
+            elif param_type == dict:
+                return {"type": "object", "additionalProperties": {"type": "string"}}
+            # Add more type mappings here as needed
+
+        return {"type": "object"}  # Fallback for unmapped types
+
+    def model_schema(self, model):
+        ref = {"$ref": f"#/$defs/{model.__name__}"}
+        if model in self.stack:
+            # Back reference: every model from there to the top of the stack is in the cycle
+            self.lows[-1] = min(self.lows[-1], self.stack.index(model))
+            return ref
+
+        cached = _model_cache.get(model)
+        if cached is not None and cached[0] == id(model.model_fields):
+            self.defs.update(cached[2])
+            return cached[1]
+
+        outer_defs = self.defs
+        self.defs = {}
+        position = len(self.stack)
+        self.stack.append(model)
+        self.lows.append(position + 1)
+        body = self.object_schema(model)
+        self.stack.pop()
+        low = self.lows.pop()
+
+        in_cycle = low <= position
+        if in_cycle:
+            self.defs[model.__name__] = body
+        schema = ref if in_cycle else body
+        defs = self.defs
+        self.defs = outer_defs
+        self.defs.update(defs)
+
+        if low < position:
+            # The cycle closes further down the stack, so our $defs are not complete yet
+            self.lows[-1] = min(self.lows[-1], low)
+        else:
+            _model_cache[model] = (id(model.model_fields), schema, defs)
+        return schema
+
+    def object_schema(self, model):
+        properties = {}
+        required = []
+
+        for field_name, field_info in model.model_fields.items():
+
+            field_type = field_info.annotation
+            properties[field_name] = self.type_schema(field_type)
+            if field_info.is_required():
+                required.append(field_name)
+
+        return {"type": "object", "properties": properties, "required": required}
+
 
 def python_type_to_json_schema(param_type):
-    origin = get_origin(param_type)
-    if origin is not None:
-        args = get_args(param_type)
-        if origin == list:
-            return {"type": "array", "items": python_type_to_json_schema(args[0])}
-        elif origin == dict:
-            value_schema = python_type_to_json_schema(args[1])
-            return {"type": "object", "additionalProperties": value_schema}
-        # Handle other generic types as needed
-        return {"type": "object"}  # Fallback for unmapped generic types
-
-    if isinstance(param_type, type):
-        if issubclass(param_type, BaseModel):
-            return generate_model_schema(param_type)
-        elif issubclass(param_type, Enum):
-            return {"type": "string", "enum": [e.value for e in param_type]}
-        elif param_type == str:
-            return {"type": "string"}
-        elif param_type == int:
-            return {"type": "integer"}
-        elif param_type == float:
-            return {"type": "number"}
-        elif param_type == bool:
-            return {"type": "boolean"}
-        elif param_type == list:
-            return {"type": "array", "items": {"type": "string"}}
-        elif param_type == dict:
-            return {"type": "object", "additionalProperties": {"type": "string"}}
-        # Add more type mappings here as needed
-
-    return {"type": "object"}  # Fallback for unmapped types
+    builder = _SchemaBuilder()
+    schema = builder.type_schema(param_type)
+    if builder.defs:
+        return {**schema, "$defs": builder.defs}
+    return schema
 
 
 def generate_model_schema(model: Type[BaseModel]):
-    properties = {}
-    required = []
-
-    for field_name, field_info in model.model_fields.items():
-
-        field_type = field_info.annotation
-        properties[field_name] = python_type_to_json_schema(field_type)
-        if field_info.is_required():
-            required.append(field_name)
-
-    return {"type": "object", "properties": properties, "required": required}
+    return python_type_to_json_schema(model)
 
 
 def generate_method_schema(method_identifier, registry_entry):
@@ -65,25 +134,42 @@ def generate_method_schema(method_identifier, registry_entry):
             "parameters": {"type": "object", "properties": {}, "required": []},
         },
     }
+    builder = _SchemaBuilder()
     sig = inspect.signature(method)
     for name, param in sig.parameters.items():
         param_type = annotations.get(name, param.annotation)
         if param_type == param.empty:
             param_type = type(None)
 
-        param_schema = python_type_to_json_schema(param_type)
+        param_schema = builder.type_schema(param_type)
         method_schema["function"]["parameters"]["properties"][name] = param_schema
         if param.default == param.empty:
             method_schema["function"]["parameters"]["required"].append(name)
 
+    if builder.defs:
+        method_schema["function"]["parameters"]["$defs"] = builder.defs
     return method_schema
 
 
-def generate_tool_schema(registry):
+def generate_tool_schema(registry, methods=None):
+    # `methods` defaults to the registry's working table, Registry passes its published snapshot
+    methods = registry.methods if methods is None else methods
     tool_schema = []
-
-    for method_identifier, registry_entry in registry.methods.items():
-        method_schema = generate_method_schema(method_identifier, registry_entry)
-        tool_schema.append(method_schema)
+    # {method identifier: (registry entry, method schema)}, owned by the registry so it dies with it
+    cache = getattr(registry, "schema_cache", None)
+    if cache is None:
+        cache = {}
+
+    for method_identifier, registry_entry in methods.items():
+        cached = cache.get(method_identifier)
+        if cached is None or cached[0] is not registry_entry:
+            cached = (registry_entry, generate_method_schema(method_identifier, registry_entry))
+            cache[method_identifier] = cached
+        tool_schema.append(cached[1])
+
+    # Forget entries that were removed from the registry
+    if len(cache) > len(methods):
+        for method_identifier in [key for key in cache if key not in methods]:
+            del cache[method_identifier]
 
     return tool_schema
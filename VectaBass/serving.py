@@ -0,0 +1,224 @@
+# serving.py
+"""
+Serve many concurrent conversations with a single manager, e.g. behind a web frontend.
+
+The manager's assistant, registry and tool dispatch are shared; each session key only gets a
+thread, reattached through the SessionStore, and its own queue so a session never has two runs in
+flight while different sessions run side by side. Replies and deltas are published on per-session
+topics, `print_message_<channel>` and `message_delta_<channel>` with `channel(session_key)`.
+
+Session state is local and bounded: past `max_sessions` the least recently used idle sessions are
+evicted, and so are sessions idle for more than `idle_timeout` seconds. Eviction keeps the remote
+thread and the stored mapping, so a returning user carries on where they left off.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+
+from .async_chat_strategy import AsyncOpenAIStrategy
+from .chat_strategy import OpenAIStrategy, is_not_found
+from .message_queue import MessageQueue
+
+
+class Session:
+    __slots__ = ("key", "thread", "queue", "last_used")
+
+    def __init__(self, key, queue):
+        self.key = key
+        self.thread = None
+        # MessageQueue for SessionServer, asyncio.Lock for AsyncSessionServer
+        self.queue = queue
+        self.last_used = 0.0
+
+
+class SessionServer:
+    """Session multiplexed mode of a synchronous manager using the Assistants API.
+
+    `send_message(session_key, message)` queues like Chat.send_message: the caller finding the
+    session idle runs the turn, callers for a busy session return straight away. `queue_options`
+    are passed to every session's MessageQueue (maxsize, overflow, coalesce, background).
+    """
+
+    strategy_type = OpenAIStrategy
+
+    def __init__(self, manager, max_sessions=1_000, idle_timeout=900.0, queue_options=None, clock=time.monotonic):
+        self.strategy = manager.assistant_manager.chat.strategy
+        if not isinstance(self.strategy, self.strategy_type):
+            raise ValueError(f"{type(self).__name__} needs a manager with a {self.strategy_type.__name__}, {manager.name} has {type(self.strategy).__name__}")
+        self.manager = manager
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.queue_options = queue_options or {}
+        self.clock = clock
+        # session key -> Session, least recently used first
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def __contains__(self, session_key):
+        return session_key in self.sessions
+
+    def channel(self, session_key):
+        return f"{self.manager.name}_{session_key}"
+
+    def topic(self, session_key):
+        # Where the replies of a session are published
+        return f"print_message_{self.channel(session_key)}"
+
+    def session(self, session_key):
+        with self.lock:
+            session = self.sessions.get(session_key)
+            if session is None:
+                session = self.sessions[session_key] = self.new_session(session_key)
+            else:
+                self.sessions.move_to_end(session_key)
+            session.last_used = self.clock()
+            self._evict(keep=session_key)
+            return session
+
+    def new_session(self, session_key):
+        session = Session(session_key, MessageQueue(**self.queue_options))
+        session.queue.handler = partial(self.process_messages, session)
+        return session
+
+    def send_message(self, session_key, message, direct=False):
+        return self.session(session_key).queue.put(message, direct)
+
+    def process_messages(self, session, messages, direct=False):
+        # Called by the session's queue worker only
+        self.strategy.ensure_started()
+        if session.thread is None:
+            session.thread = self.strategy.open_thread(session.key)
+        thread = session.thread
+        self.strategy.run_turn(thread, messages, direct, channel=self.channel(session.key))
+        self._compacted(session, thread, self.strategy.maybe_compact(thread))
+        session.last_used = self.clock()
+
+    def _compacted(self, session, thread, compacted):
+        if compacted is not thread:
+            session.thread = compacted
+            self.strategy.session_store.put(self.manager.name, session.key, compacted.id)
+
+    def evict_idle(self):
+        """Drop idle sessions past their timeout or the size limit; returns how many were dropped."""
+        with self.lock:
+            return self._evict()
+
+    def _evict(self, keep=None):
+        # Called with the lock held; oldest first, stopping at the first session worth keeping
+        now, evicted = self.clock(), 0
+        for session_key, session in list(self.sessions.items()):
+            over = len(self.sessions) > self.max_sessions
+            idle = self.idle_timeout is not None and now - session.last_used > self.idle_timeout
+            if not (over or idle):
+                break
+            if session_key == keep or self._busy(session):
+                continue
+            self._forget(session)
+            evicted += 1
+        self.evicted += evicted
+        return evicted
+
+    def _busy(self, session):
+        return session.queue.busy or len(session.queue) > 0
+
+    def _forget(self, session):
+        del self.sessions[session.key]
+        if session.thread is not None:
+            self.strategy.last_message_ids.pop(session.thread.id, None)
+            self.strategy.thread_tokens.pop(session.thread.id, None)
+
+    def close_session(self, session_key, delete_thread=False):
+        """Let the session's queued messages finish and drop it; with `delete_thread` the conversation is gone for good."""
+        session = self.sessions.get(session_key)
+        if session is not None:
+            session.queue.join()
+        with self.lock:
+            if self.sessions.get(session_key) is session and session is not None:
+                self._forget(session)
+        if delete_thread:
+            self._delete_thread(session_key, session.thread.id if session and session.thread else None)
+
+    def _delete_thread(self, session_key, thread_id):
+        thread_id = thread_id or self.strategy.session_store.get(self.manager.name, session_key)
+        if thread_id is not None:
+            try:
+                self.strategy.client.beta.threads.delete(thread_id)
+            except Exception as e:
+                if not is_not_found(e):
+                    raise
+        self.strategy.session_store.forget(self.manager.name, session_key)
+
+    def close(self, delete_threads=False):
+        for session_key in list(self.sessions):
+            self.close_session(session_key, delete_threads)
+
+
+class AsyncSessionServer(SessionServer):
+    """Coroutine based counterpart of SessionServer, for an asynchronous manager.
+
+    `await send_message(session_key, message)` waits for the session's turn (in arrival order) and
+    returns the reply text.
+    """
+
+    strategy_type = AsyncOpenAIStrategy
+
+    def __init__(self, manager, max_sessions=1_000, idle_timeout=900.0, clock=time.monotonic):
+        super().__init__(manager, max_sessions=max_sessions, idle_timeout=idle_timeout, clock=clock)
+        self.start_lock = asyncio.Lock()
+
+    def new_session(self, session_key):
+        # asyncio.Lock wakes waiters in FIFO order, so a session's messages keep their order
+        return Session(session_key, asyncio.Lock())
+
+    async def send_message(self, session_key, message, direct=False):
+        session = self.session(session_key)
+        async with session.queue:
+            return await self.process_messages(session, [message], direct)
+
+    async def process_messages(self, session, messages, direct=False):
+        strategy = self.strategy
+        async with self.start_lock:
+            if strategy.assistant is None or strategy.pending_tools is not None:
+                await strategy.sync_assistant()
+        if session.thread is None:
+            session.thread = await strategy.open_thread(session.key)
+        thread = session.thread
+        reply = await strategy.run_turn(thread, messages, direct, channel=self.channel(session.key))
+        self._compacted(session, thread, await strategy.maybe_compact(thread))
+        session.last_used = self.clock()
+        return reply
+
+    def _busy(self, session):
+        return session.queue.locked()
+
+    async def close_session(self, session_key, delete_thread=False):
+        session = self.sessions.get(session_key)
+        if session is not None:
+            # Waits for the turn in progress and those queued before us
+            async with session.queue:
+                pass
+        with self.lock:
+            if self.sessions.get(session_key) is session and session is not None:
+                self._forget(session)
+        if delete_thread:
+            await self._delete_thread(session_key, session.thread.id if session and session.thread else None)
+
+    async def _delete_thread(self, session_key, thread_id):
+        thread_id = thread_id or self.strategy.session_store.get(self.manager.name, session_key)
+        if thread_id is not None:
+            try:
+                await self.strategy.client.beta.threads.delete(thread_id)
+            except Exception as e:
+                if not is_not_found(e):
+                    raise
+        self.strategy.session_store.forget(self.manager.name, session_key)
+
+    async def close(self, delete_threads=False):
+        for session_key in list(self.sessions):
+            await self.close_session(session_key, delete_threads)
@@ -0,0 +1,38 @@
+# sessions.py
+import threading
+
+from .stores import MemoryStore
+
+
+class SessionStore:
+    """Maps (agent name, session key) to a thread id, so a conversation can be reattached with Chat.set_thread(key).
+
+    Pass a JSONStore or SQLiteStore to keep sessions across restarts or share them between processes.
+    """
+
+    _shared = None
+
+    def __init__(self, store=None):
+        self.store = store or MemoryStore()
+        self.lock = threading.Lock()
+
+    @classmethod
+    def shared(cls):
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def get(self, agent_name, session_key):
+        return self.store.get(self._key(agent_name, session_key))
+
+    def put(self, agent_name, session_key, thread_id):
+        key = self._key(agent_name, session_key)
+        with self.lock:
+            if self.store.get(key) != thread_id:
+                self.store.set(key, thread_id)
+
+    def forget(self, agent_name, session_key):
+        self.store.delete(self._key(agent_name, session_key))
+
+    def _key(self, agent_name, session_key):
+        return f"{agent_name}:{session_key}"
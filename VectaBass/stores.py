@@ -0,0 +1,91 @@
+# stores.py
+"""
+Small key/value stores used to persist lookups (assistant ids, sessions, ...) across processes.
+Values must be JSON serialisable.
+"""
+import json
+import os
+import sqlite3
+import threading
+
+
+class MemoryStore:
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            return self.data.get(key, default)
+
+    def set(self, key, value):
+        with self.lock:
+            self.data[key] = value
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def keys(self):
+        with self.lock:
+            return list(self.data)
+
+
+class JSONStore(MemoryStore):
+    """Keeps everything in memory and rewrites the file atomically on every change."""
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.data = json.load(f)
+
+    def set(self, key, value):
+        with self.lock:
+            self.data[key] = value
+            self._flush()
+
+    def delete(self, key):
+        with self.lock:
+            if self.data.pop(key, None) is not None:
+                self._flush()
+
+    def _flush(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f)
+        os.replace(tmp_path, self.path)
+
+
+class SQLiteStore:
+    """Shared store for multi-process deployments."""
+
+    def __init__(self, path, table="kv"):
+        self.path = path
+        self.table = table
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    def get(self, key, default=None):
+        with self.lock:
+            row = self.connection.execute(f"SELECT value FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, key, value):
+        with self.lock:
+            self.connection.execute(f"INSERT OR REPLACE INTO {self.table} (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def delete(self, key):
+        with self.lock:
+            self.connection.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def keys(self):
+        with self.lock:
+            return [row[0] for row in self.connection.execute(f"SELECT key FROM {self.table}")]
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,287 @@
+# telemetry.py
+"""
+Timers, counters and latency histograms for every phase of an agent turn.
+
+`Telemetry.shared()` is the process-wide recorder, and the module level `span`, `count` and
+`observe` go through it. A span times a block and adds its duration to the histogram of the same
+name. Installed sinks also get every finished span as a dict with its name, labels, start, duration
+and error. Labels end up in the metric keys, so keep them low cardinality.
+
+Recorded by the library:
+
+- spans: `message.add`, `run.create`, `run.poll`, `run.submit_tool_outputs`, `messages.fetch`,
+  `queue.wait`, `tool.execute` (labelled with the tool's `Class.method`) and `api.call` (per endpoint)
+- counters: `api.calls`, `api.retries`, `run.retries`, `tool.errors`, `tool_cache.hits`,
+  `tool_cache.misses`, `assistant_cache.hits` and `assistant_cache.misses`
+
+`flush()` hands the current metrics to every sink. Available sinks are MemorySink, JSONLinesSink
+(spans and metric snapshots as JSON lines) and PrometheusSink (text exposition format); any object
+with `record(span)` and `flush(metrics)` will do. `enabled = False` turns every call into a no-op.
+"""
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds, the last bucket is +Inf
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "count", "sum")
+
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        # [(upper bound, observations at or below it)], as Prometheus wants them
+        buckets, total = [], 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            total += count
+            buckets.append((bound, total))
+        return buckets
+
+
+class Span:
+    __slots__ = ("telemetry", "name", "labels", "start", "started")
+
+    def __init__(self, telemetry, name, labels):
+        self.telemetry = telemetry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.time()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        duration = time.perf_counter() - self.started
+        self.telemetry.observe(self.name, duration, **self.labels)
+        if self.telemetry.sinks:
+            error = None if exc_type is None else f"{exc_type.__name__}: {exc}"
+            self.telemetry.emit({"name": self.name, "labels": self.labels, "start": self.start, "duration": duration, "error": error})
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Telemetry:
+    _shared = None
+
+    def __init__(self, sinks=(), buckets=DEFAULT_BUCKETS, enabled=True):
+        self.sinks = list(sinks)
+        self.buckets = buckets
+        self.enabled = enabled
+        # (name, sorted label items) -> value or Histogram
+        self.counters = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def shared(cls):
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+        return sink
+
+    def remove_sink(self, sink):
+        if sink in self.sinks:
+            self.sinks.remove(sink)
+
+    def span(self, name, **labels):
+        if not self.enabled:
+            return _NO_SPAN
+        return Span(self, name, labels)
+
+    def count(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def emit(self, span):
+        for sink in list(self.sinks):
+            try:
+                sink.record(span)
+            except Exception as e:
+                # A broken sink must never break a turn
+                logger.error("Telemetry sink %r failed: %s", sink, e)
+
+    def metrics(self):
+        """Snapshot of every counter and histogram, as plain data."""
+        with self.lock:
+            counters = [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in self.counters.items()]
+            histograms = [
+                {"name": name, "labels": dict(labels), "count": histogram.count, "sum": histogram.sum, "buckets": histogram.cumulative()}
+                for (name, labels), histogram in self.histograms.items()
+            ]
+        return {"time": time.time(), "counters": counters, "histograms": histograms}
+
+    def counter(self, name, **labels):
+        return self.counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def histogram(self, name, **labels):
+        return self.histograms.get((name, tuple(sorted(labels.items()))))
+
+    def flush(self):
+        metrics = self.metrics()
+        for sink in list(self.sinks):
+            sink.flush(metrics)
+        return metrics
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+def span(name, **labels):
+    return Telemetry.shared().span(name, **labels)
+
+
+def count(name, value=1, **labels):
+    Telemetry.shared().count(name, value, **labels)
+
+
+def observe(name, seconds, **labels):
+    Telemetry.shared().observe(name, seconds, **labels)
+
+
+def metric_name(name, prefix="vectabass"):
+    return f"{prefix}_{name}".replace(".", "_").replace("-", "_")
+
+
+def label_text(labels, extra=None):
+    items = list(labels.items()) + ([extra] if extra else [])
+    if not items:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in items)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(items, escaped)) + "}"
+
+
+def prometheus_text(metrics, prefix="vectabass"):
+    """Metrics from `Telemetry.metrics()` in the Prometheus text exposition format."""
+    lines, declared = [], set()
+    for counter in sorted(metrics["counters"], key=lambda counter: counter["name"]):
+        name = metric_name(counter["name"], prefix) + "_total"
+        if name not in declared:
+            declared.add(name)
+            lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name}{label_text(counter['labels'])} {counter['value']}")
+    for histogram in sorted(metrics["histograms"], key=lambda histogram: histogram["name"]):
+        name = metric_name(histogram["name"], prefix) + "_seconds"
+        if name not in declared:
+            declared.add(name)
+            lines.append(f"# TYPE {name} histogram")
+        for bound, total in histogram["buckets"]:
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f"{name}_bucket{label_text(histogram['labels'], ('le', le))} {total}")
+        lines.append(f"{name}_sum{label_text(histogram['labels'])} {histogram['sum']}")
+        lines.append(f"{name}_count{label_text(histogram['labels'])} {histogram['count']}")
+    return "\n".join(lines) + "\n"
+
+
+class MemorySink:
+    """Keeps the latest spans (up to `max_spans`) and metrics in memory, e.g. for tests or a debug page."""
+
+    def __init__(self, max_spans=10_000):
+        self.spans = deque(maxlen=max_spans)
+        self.metrics = None
+
+    def record(self, span):
+        self.spans.append(span)
+
+    def flush(self, metrics):
+        self.metrics = metrics
+
+    def named(self, name):
+        return [span for span in self.spans if span["name"] == name]
+
+
+class JSONLinesSink:
+    """Appends every span, and every flushed metrics snapshot, to a JSON lines file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = open(path, "a", encoding="utf-8")
+
+    def record(self, span):
+        self._write({"type": "span", **span})
+
+    def flush(self, metrics):
+        self._write({"type": "metrics", **metrics})
+        with self.lock:
+            self.file.flush()
+
+    def _write(self, record):
+        line = json.dumps(record, default=str) + "\n"
+        with self.lock:
+            self.file.write(line)
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+class PrometheusSink:
+    """Renders flushed metrics in the Prometheus text format, to `text` and, given a path, to a file.
+
+    Point a node exporter's textfile collector at the file, or serve `text` from a /metrics route.
+    """
+
+    def __init__(self, path=None, prefix="vectabass"):
+        self.path = path
+        self.prefix = prefix
+        self.text = ""
+
+    def record(self, span):
+        # Spans only matter through their histograms
+        pass
+
+    def flush(self, metrics):
+        self.text = prometheus_text(metrics, self.prefix)
+        if self.path:
+            partial = f"{self.path}.tmp"
+            with open(partial, "w", encoding="utf-8") as f:
+                f.write(self.text)
+            os.replace(partial, self.path)
@@ -0,0 +1,87 @@
+from enum import Enum
+from typing import Dict, List, Optional
+import unittest
+import warnings
+from pydantic import BaseModel
+
+from VectaBass.argument_binder import ArgumentBinder
+
+
+class Color(str, Enum):
+    RED = "red"
+    BLUE = "blue"
+
+
+class Item(BaseModel):
+    name: str
+    color: Color
+
+
+class Basket(BaseModel):
+    items: List[Item]
+
+
+class Shop:
+    def stock(self, items: List[Item], by_shelf: Dict[str, Item], nested: Dict[str, List[Basket]], color: Color, note: Optional[str] = None):
+        return items
+
+    def anything(self, payload: BaseModel, **extra):
+        return payload
+
+    def plain(self, value, limit: int = 10):
+        return value
+
+    def reserved(self, model_config: str, _cursor: int = 0, json: bool = False, copy: int = 1, schema: str = "", dict: str = "", validate: bool = True):
+        return model_config
+
+
+class TestArgumentBinder(unittest.TestCase):
+    def test_generic_and_nested_models(self):
+        binder = ArgumentBinder.for_method(Shop().stock)
+        args = binder.bind(
+            '{"items": [{"name": "a", "color": "red"}], "by_shelf": {"top": {"name": "b", "color": "blue"}},'
+            ' "nested": {"x": [{"items": [{"name": "c", "color": "red"}]}]}, "color": "blue"}'
+        )
+        self.assertIsInstance(args["items"][0], Item)
+        self.assertIsInstance(args["by_shelf"]["top"], Item)
+        self.assertIsInstance(args["nested"]["x"][0], Basket)
+        self.assertIsInstance(args["nested"]["x"][0].items[0], Item)
+        self.assertIs(args["color"], Color.BLUE)
+
+    def test_only_sent_arguments_are_bound(self):
+        binder = ArgumentBinder.for_method(Shop().plain)
+        self.assertEqual(binder.bind('{"value": [1, 2]}'), {"value": [1, 2]})
+        self.assertEqual(binder.bind({"value": "x", "limit": "5"}), {"value": "x", "limit": 5})
+
+    def test_invalid_and_unexpected_arguments_raise(self):
+        binder = ArgumentBinder.for_method(Shop().plain)
+        with self.assertRaises(ValueError):
+            binder.bind('{"value": 1, "limit": "many"}')
+        with self.assertRaises(ValueError):
+            binder.bind('{"value": 1, "unknown": 2}')
+        with self.assertRaises(ValueError):
+            binder.bind("{}")
+
+    def test_linked_model_override_and_var_keyword(self):
+        binder = ArgumentBinder.for_method(Shop().anything, {"payload": Item})
+        args = binder.bind('{"payload": {"name": "a", "color": "red"}, "flag": true}')
+        self.assertIsInstance(args["payload"], Item)
+        self.assertTrue(args["flag"])
+
+    def test_names_reserved_by_models_bind_as_is(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            binder = ArgumentBinder.for_method(Shop().reserved)
+        arguments = {"model_config": "a", "_cursor": 3, "json": True, "copy": 2, "schema": "s", "dict": "d", "validate": False}
+        self.assertEqual(binder.bind(arguments), arguments)
+        self.assertEqual(binder.bind('{"model_config": "a", "_cursor": "4"}'), {"model_config": "a", "_cursor": 4})
+        with self.assertRaises(ValueError):
+            binder.bind('{"_cursor": 1}')
+
+    def test_binders_are_shared_between_instances(self):
+        self.assertIs(ArgumentBinder.for_method(Shop().stock), ArgumentBinder.for_method(Shop().stock))
+        self.assertIsNot(ArgumentBinder.for_method(Shop().anything), ArgumentBinder.for_method(Shop().anything, {"payload": Item}))
+
+
+if __name__ == "__main__":
+    unittest.main()
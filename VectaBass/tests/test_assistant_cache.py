@@ -0,0 +1,123 @@
+import os
+import tempfile
+from types import SimpleNamespace
+import unittest
+from openai.types.beta import FunctionTool
+
+from VectaBass.assistant_cache import AssistantCache, assistant_fingerprint
+from VectaBass.chat_strategy import OpenAIStrategy
+from VectaBass.stores import JSONStore, SQLiteStore
+
+
+class FakeAssistants:
+    """Paginated assistants resource that counts every call."""
+
+    def __init__(self, count=250):
+        self.items = [self._make(f"asst_{i}", f"other_{i}") for i in range(count)]
+        self.calls = []
+
+    def _make(self, assistant_id, name, instructions="", model="gpt-3.5-turbo", tools=()):
+        return SimpleNamespace(id=assistant_id, name=name, description=None, instructions=instructions, model=model, tools=self._tools(tools))
+
+    def _tools(self, tools):
+        return [FunctionTool.model_validate(t) if isinstance(t, dict) else t for t in tools]
+
+    def list(self, limit=20, after=None):
+        self.calls.append("list")
+        start = 0 if after is None else next(i for i, item in enumerate(self.items) if item.id == after) + 1
+        page = self.items[start : start + limit]
+        return SimpleNamespace(data=page, has_more=start + limit < len(self.items))
+
+    def retrieve(self, assistant_id):
+        self.calls.append("retrieve")
+        return next(item for item in self.items if item.id == assistant_id)
+
+    def update(self, assistant_id, description, instructions, model, tools):
+        self.calls.append("update")
+        item = self.retrieve(assistant_id)
+        self.calls.pop()
+        item.instructions, item.model, item.tools = instructions, model, self._tools(tools)
+        return item
+
+    def create(self, name, instructions, model, tools):
+        self.calls.append("create")
+        item = self._make(f"asst_{len(self.items)}", name, instructions, model, tools)
+        self.items.append(item)
+        return item
+
+
+class Manager:
+    name = "target"
+
+    def _instructions(self):
+        return "be helpful"
+
+
+def tool(name):
+    return {"type": "function", "function": {"name": name, "description": "", "parameters": {"type": "object", "properties": {}, "required": []}}}
+
+
+class TestAssistantCache(unittest.TestCase):
+    def setUp(self):
+        self.assistants = FakeAssistants()
+        self.assistants.items.append(self.assistants._make("asst_target", "target"))
+        self.client = SimpleNamespace(beta=SimpleNamespace(assistants=self.assistants))
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def strategy(self, cache):
+        strategy = OpenAIStrategy.__new__(OpenAIStrategy)
+        strategy.client = self.client
+        strategy.manager = Manager()
+        strategy.assistant_cache = cache
+        return strategy
+
+    def test_paginated_lookup_then_no_op_updates_are_skipped(self):
+        strategy = self.strategy(AssistantCache())
+        assistant = strategy.get_assistant("target", tool_schema=[tool("a")])
+        self.assertEqual(assistant.id, "asst_target")
+        self.assertEqual(self.assistants.calls, ["list", "list", "list", "update"])
+
+        self.assistants.calls.clear()
+        strategy.get_assistant("target", tool_schema=[tool("a")])
+        strategy.get_assistant("target")
+        self.assertEqual(self.assistants.calls, [])
+
+        strategy.get_assistant("target", tool_schema=[tool("a"), tool("b")])
+        self.assertEqual(self.assistants.calls, ["update"])
+        self.assertEqual([t.function.name for t in assistant.tools], ["a", "b"])
+
+    def test_persistent_store_needs_a_single_retrieve(self):
+        path = os.path.join(self.tmp.name, "assistants.json")
+        self.strategy(AssistantCache(JSONStore(path))).get_assistant("target", tool_schema=[tool("a")])
+
+        self.assistants.calls.clear()
+        self.strategy(AssistantCache(JSONStore(path))).get_assistant("target", tool_schema=[tool("a")])
+        self.assertEqual(self.assistants.calls, ["retrieve"])
+
+    def test_missing_assistant_is_created_and_cached(self):
+        strategy = self.strategy(AssistantCache())
+        strategy.manager.name = "new_one"
+        strategy.get_assistant("new_one", tool_schema=[tool("a")])
+        self.assertEqual(self.assistants.calls[-1], "create")
+        self.assistants.calls.clear()
+        strategy.get_assistant("new_one", tool_schema=[tool("a")])
+        self.assertEqual(self.assistants.calls, ["update"])
+
+    def test_fingerprint_ignores_tool_order(self):
+        self.assertEqual(assistant_fingerprint("x", "m", [tool("a"), tool("b")]), assistant_fingerprint("x", "m", [tool("b"), tool("a")]))
+        self.assertNotEqual(assistant_fingerprint("x", "m", [tool("a")]), assistant_fingerprint("y", "m", [tool("a")]))
+
+    def test_sqlite_store_round_trip(self):
+        store = SQLiteStore(os.path.join(self.tmp.name, "assistants.db"))
+        store.set("target", {"id": "asst_target", "fingerprint": "abc"})
+        self.assertEqual(store.get("target"), {"id": "asst_target", "fingerprint": "abc"})
+        store.delete("target")
+        self.assertIsNone(store.get("target"))
+        store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
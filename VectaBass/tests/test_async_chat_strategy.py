@@ -0,0 +1,129 @@
+import asyncio
+import itertools
+import json
+import os
+from types import SimpleNamespace
+import unittest
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from VectaBass.agents.base_manager import BaseManager
+from VectaBass.pub_sub_manager import PubSub
+from VectaBass.run_completion import AsyncPollingCompletion, Backoff
+
+
+class FakeAsyncClient:
+    """Minimal async Assistants client: every run sleeps `latency` and optionally asks for one tool call."""
+
+    def __init__(self, latency=0.05, tool_call=None):
+        self.latency = latency
+        self.tool_call = tool_call
+        self.ids = itertools.count()
+        self.runs = {}
+        self.messages = {}
+        self.submitted = []
+        threads = SimpleNamespace(create=self.create_thread, messages=SimpleNamespace(create=self.create_message, list=self.list_messages))
+        threads.runs = SimpleNamespace(create=self.create_run, retrieve=self.retrieve_run, submit_tool_outputs=self.submit_tool_outputs)
+        assistants = SimpleNamespace(list=self.list_assistants, create=self.create_assistant, update=self.create_assistant)
+        self.beta = SimpleNamespace(threads=threads, assistants=assistants)
+
+    def new_id(self, prefix):
+        return f"{prefix}_{next(self.ids)}"
+
+    async def create_thread(self):
+        thread = SimpleNamespace(id=self.new_id("thread"))
+        self.messages[thread.id] = []
+        return thread
+
+    async def create_message(self, thread_id, role, content):
+        message = SimpleNamespace(id=self.new_id("msg"), role=role, content=[SimpleNamespace(text=SimpleNamespace(value=content))])
+        self.messages[thread_id].append(message)
+        return message
+
+    async def list_messages(self, thread_id, order="desc", after=None, limit=20):
+        messages = self.messages[thread_id] if order == "asc" else self.messages[thread_id][::-1]
+        if after is not None:
+            messages = messages[[message.id for message in messages].index(after) + 1 :]
+        return SimpleNamespace(data=messages[:limit], has_more=len(messages) > limit)
+
+    async def list_assistants(self, **params):
+        return SimpleNamespace(data=[], has_more=False)
+
+    async def create_assistant(self, **kwargs):
+        return SimpleNamespace(id=self.new_id("asst"), model=kwargs.get("model"), tools=kwargs.get("tools"))
+
+    async def create_run(self, thread_id, assistant_id, tools):
+        run = SimpleNamespace(id=self.new_id("run"), thread_id=thread_id, status="queued", ready_at=asyncio.get_running_loop().time() + self.latency, asked=False)
+        self.runs[run.id] = run
+        return run
+
+    async def retrieve_run(self, run_id, thread_id):
+        run = self.runs[run_id]
+        if asyncio.get_running_loop().time() < run.ready_at:
+            run.status = "in_progress"
+        elif self.tool_call and not run.asked:
+            run.asked = True
+            run.status = "requires_action"
+            tool_call = SimpleNamespace(id="call_1", function=SimpleNamespace(name=self.tool_call[0], arguments=json.dumps(self.tool_call[1])))
+            run.required_action = SimpleNamespace(submit_tool_outputs=SimpleNamespace(tool_calls=[tool_call]))
+        else:
+            run.status = "completed"
+            await self.create_message(thread_id, "assistant", f"reply to {thread_id}")
+        return run
+
+    async def submit_tool_outputs(self, thread_id, run_id, tool_outputs):
+        self.submitted.extend(tool_outputs)
+        run = self.runs[run_id]
+        run.status = "in_progress"
+        return run
+
+
+class EchoManager(BaseManager):
+    async def echo(self, text: str):
+        await asyncio.sleep(0)
+        return text.upper()
+
+
+def make_manager(client):
+    manager = EchoManager("echo", asynchronous=True)
+    strategy = manager.assistant_manager.chat.strategy
+    strategy.client = client
+    strategy.completion = AsyncPollingCompletion(Backoff(initial=0.01, maximum=0.02, jitter=0))
+    return manager
+
+
+class TestAsyncOpenAIStrategy(unittest.TestCase):
+    def test_construction_does_no_network_work(self):
+        manager = make_manager(FakeAsyncClient())
+        strategy = manager.assistant_manager.chat.strategy
+        self.assertIsNone(strategy.thread)
+        self.assertIsNone(strategy.assistant)
+        self.assertIsNotNone(strategy.pending_tools)
+
+    def test_many_agents_share_one_event_loop(self):
+        client = FakeAsyncClient(latency=0.2)
+        managers = [make_manager(client) for _ in range(20)]
+        replies = []
+        for manager in managers:
+            PubSub().subscribe(f"print_message_{manager.name}", replies.append)
+
+        async def main():
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            await asyncio.gather(*(manager.assistant_manager.send_message("hello") for manager in managers))
+            return loop.time() - started
+
+        elapsed = asyncio.run(main())
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual(len(replies), 20)
+
+    def test_async_tool_methods_are_awaited(self):
+        client = FakeAsyncClient(latency=0)
+        manager = make_manager(client)
+        client.tool_call = (f"{manager.name}_echo", {"text": "hi"})
+        asyncio.run(manager.assistant_manager.send_message("call echo"))
+        self.assertEqual(client.submitted, [{"tool_call_id": "call_1", "output": '{"result":"HI"}'}])
+
+
+if __name__ == "__main__":
+    unittest.main()
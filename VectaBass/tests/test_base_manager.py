@@ -0,0 +1,201 @@
+import asyncio
+import gc
+import os
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+import unittest
+import weakref
+
+from VectaBass.agents.base_manager import BaseManager, aboot_many, boot_many
+from VectaBass.assistant_cache import AssistantCache
+from VectaBass.fake_openai import FakeAsyncOpenAI, FakeBackend, FakeOpenAI
+from VectaBass.pub_sub_manager import PubSub
+from VectaBass.registry import ManagerRegistry
+from VectaBass.sessions import SessionStore
+from VectaBass.stores import JSONStore
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class Worker(BaseManager):
+    def lookup(self, key: str):
+        return key
+
+    def count(self, value: int = 1):
+        return value
+
+
+def writes(backend):
+    return backend.calls["assistants.create"] + backend.calls["assistants.update"]
+
+
+class TestLifecycle(unittest.TestCase):
+    def test_construction_is_local(self):
+        backend = FakeBackend()
+        Worker("worker", client=FakeOpenAI(backend))
+        self.assertEqual(sum(backend.calls.values()), 0)
+
+    def test_start_writes_the_settled_schema_once(self):
+        backend = FakeBackend()
+        manager = Worker("worker", client=FakeOpenAI(backend)).start()
+        self.assertEqual(writes(backend), 1)
+        tools = {tool.function.name for tool in manager.assistant_manager.chat.strategy.assistant.tools}
+        self.assertEqual(tools, {f"{manager.name}_lookup", f"{manager.name}_count"})
+
+    def test_existing_assistant_is_updated_once(self):
+        backend = FakeBackend()
+        client = FakeOpenAI(backend)
+        client.beta.assistants.create(name="worker_existing", instructions="", tools=[])
+        backend.calls.clear()
+        Worker("worker", identifier="existing", client=client).start()
+        self.assertEqual((backend.calls["assistants.create"], backend.calls["assistants.update"]), (0, 1))
+
+    def test_first_message_starts_the_manager(self):
+        backend = FakeBackend()
+        manager = Worker("worker", client=FakeOpenAI(backend))
+        manager.assistant_manager.send_message("hi")
+        self.assertEqual(writes(backend), 1)
+
+    def test_boot_many(self):
+        backend = FakeBackend(api_latency=0.002)
+        client = FakeOpenAI(backend)
+        managers = boot_many([Worker("worker", client=client) for _ in range(50)])
+        self.assertEqual(writes(backend), 50)
+        self.assertTrue(all(manager.assistant_manager.chat.strategy.assistant is not None for manager in managers))
+
+    def test_boot_many_calls_overridden_start(self):
+        class Warmed(Worker):
+            def start(self):
+                self.warmed = True
+                return super().start()
+
+        managers = boot_many([Warmed("warmed", client=FakeOpenAI(FakeBackend())) for _ in range(3)])
+        self.assertTrue(all(getattr(manager, "warmed", False) for manager in managers))
+
+    def test_aboot_many_mixes_sync_and_async_managers(self):
+        backend = FakeBackend()
+        managers = [Worker("worker", asynchronous=True, client=FakeAsyncOpenAI(backend)) for _ in range(20)]
+        managers += [Worker("worker", client=FakeOpenAI(backend)) for _ in range(5)]
+        asyncio.run(aboot_many(managers))
+        self.assertEqual(writes(backend), 25)
+        with self.assertRaises(RuntimeError):
+            managers[0].start()
+
+
+class TestTeardown(unittest.TestCase):
+    def setUp(self):
+        self.backend = FakeBackend()
+        self.client = FakeOpenAI(self.backend)
+
+    def test_close_releases_the_manager(self):
+        manager = Worker("worker", client=self.client)
+        topic = f"print_message_{manager.name}"
+        self.assertIn(topic, PubSub().subscribers)
+        manager.close()
+        self.assertNotIn(topic, PubSub().subscribers)
+        self.assertNotIn(manager.name, ManagerRegistry.managers)
+        self.assertEqual(manager.registry.methods, {})
+        self.assertIsNone(manager.registry.lookup(f"{manager.name}_lookup"))
+        # Nothing remote to clean up
+        self.assertEqual(sum(self.backend.calls.values()), 0)
+
+    def test_context_manager_deletes_the_thread(self):
+        sessions = SessionStore()
+        with Worker("worker", client=self.client) as manager:
+            strategy = manager.assistant_manager.chat.strategy
+            strategy.session_store = sessions
+            manager.assistant_manager.chat.set_thread("customer-7")
+            thread_id = strategy.get_thread().id
+            manager.close(delete_thread=True)
+        self.assertTrue(manager.closed)
+        self.assertNotIn(thread_id, self.backend.threads)
+        self.assertIsNone(sessions.get(manager.name, "customer-7"))
+
+    def test_async_context_manager(self):
+        async def main():
+            async with Worker("worker", asynchronous=True, client=FakeAsyncOpenAI(self.backend)) as manager:
+                self.assertIn(manager.name, ManagerRegistry.managers)
+            return manager
+
+        manager = asyncio.run(main())
+        self.assertTrue(manager.closed)
+        self.assertNotIn(manager.name, ManagerRegistry.managers)
+
+    def test_forgotten_agents_are_reclaimed(self):
+        subscribers = len(PubSub().subscribers)
+        alive = []
+
+        shared = AssistantCache._shared
+        cache = AssistantCache._shared = AssistantCache()
+        self.addCleanup(setattr, AssistantCache, "_shared", shared)
+
+        def churn(count):
+            for _ in range(count):
+                weakref.finalize(Worker("leak", client=self.client).start(), alive.pop)
+                alive.append(None)
+                # Or the fake backend would list every assistant made so far on each start
+                self.backend.assistants.clear()
+            gc.collect()
+            PubSub().purge()
+            # Stored ids outlive their managers on purpose, only what is held in memory is measured
+            self.assertEqual(len(cache.store.keys()), count)
+            cache.store.data.clear()
+
+        churn(10_000)
+        self.assertEqual(alive, [])
+
+        # Memory stays flat once the interpreter's own caches are warm
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            churn(1000)
+            grown = tracemalloc.get_traced_memory()[0] - before
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(alive, [])
+        self.assertLess(grown, 64 * 1024)
+        self.assertFalse(any(name.startswith("leak_") for name in ManagerRegistry.managers))
+        self.assertLessEqual(len(PubSub().subscribers), subscribers)
+        self.assertEqual(cache.entries, {})
+
+    def test_closed_agents_leave_no_live_assistant(self):
+        cache = AssistantCache.shared()
+        cached = len(cache.entries)
+        for _ in range(50):
+            with Worker("closed", client=self.client).start() as manager:
+                self.assertIn(manager.name, cache.entries)
+            self.assertNotIn(manager.name, cache.entries)
+            self.assertIsNotNone(cache.store.get(manager.name))
+        self.assertLessEqual(len(cache.entries), cached)
+
+    def test_stored_assistant_id_survives_close_and_collection(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "assistants.json")
+            shared = AssistantCache._shared
+            AssistantCache._shared = AssistantCache(JSONStore(path))
+            try:
+                closed = Worker("static", identifier="CLOSED", client=self.client).start()
+                closed.close()
+                Worker("static", identifier="DROPPED", client=self.client).start()
+                gc.collect()
+            finally:
+                AssistantCache._shared = shared
+            stored = AssistantCache(JSONStore(path))
+            self.assertIsNotNone(stored.get("static_CLOSED"))
+            self.assertIsNotNone(stored.get("static_DROPPED"))
+
+
+class TestImports(unittest.TestCase):
+    def test_import_has_no_side_effects(self):
+        with tempfile.TemporaryDirectory() as directory:
+            code = "import sys, VectaBass.agents.base_manager; print('openai' in sys.modules)"
+            env = {**os.environ, "PYTHONPATH": REPO_ROOT}
+            result = subprocess.run([sys.executable, "-c", code], cwd=directory, env=env, capture_output=True, text=True, check=True)
+            self.assertEqual(result.stdout.strip(), "False")
+            self.assertEqual(os.listdir(directory), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
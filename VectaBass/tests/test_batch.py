@@ -0,0 +1,80 @@
+import json
+import os
+import tempfile
+import unittest
+
+from VectaBass.agents.base_manager import BaseManager
+from VectaBass.batch import BatchRunner
+from VectaBass.fake_openai import FakeBackend, FakeOpenAI, ToolCallResponder
+from VectaBass.run_completion import Backoff
+
+
+class Interrupted(Exception):
+    pass
+
+
+class Catalogue(BaseManager):
+    def lookup(self, key: str):
+        return key.upper()
+
+
+def interrupt(delay):
+    raise Interrupted()
+
+
+class TestBatchRunner(unittest.TestCase):
+    def setUp(self):
+        self.backend = FakeBackend(responder=ToolCallResponder([("lookup", {"key": "a"})]))
+        self.client = FakeOpenAI(self.backend)
+        self.manager = Catalogue("catalogue", client=self.client)
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def runner(self, **kwargs):
+        kwargs.setdefault("backoff", Backoff(initial=0.01, maximum=0.01))
+        return BatchRunner(self.manager, client=self.client, requests_per_batch=4, **kwargs)
+
+    def test_tool_calls_are_resolved_and_results_kept_in_input_order(self):
+        results = list(self.runner().run([f"prompt {index}" for index in range(10)]))
+        self.assertEqual([result["custom_id"] for result in results], [str(index) for index in range(10)])
+        self.assertTrue(all(result["reply"].endswith('{"result":"A"}') and result["error"] is None for result in results))
+        # One batch per 4 prompts, then one follow-up batch per 4 prompts after the tool round
+        self.assertEqual(self.backend.calls["batches.create"], 6)
+        # and no request, thread or run per prompt
+        self.assertEqual(self.backend.calls["chat.completions.create"] + self.backend.calls["threads.create"] + self.backend.calls["threads.runs.create"], 0)
+
+    def test_results_as_completed_and_jsonl_files(self):
+        source = os.path.join(self.directory.name, "prompts.jsonl")
+        with open(source, "w") as f:
+            for key in "xyz":
+                f.write(json.dumps({"custom_id": key, "prompt": f"look {key} up"}) + "\n")
+        results = list(self.runner().run(source, ordered=False))
+        self.assertEqual(sorted(result["custom_id"] for result in results), ["x", "y", "z"])
+
+        output = os.path.join(self.directory.name, "results.jsonl")
+        self.assertEqual(self.runner().run_to_file(source, output), 3)
+        with open(output) as f:
+            self.assertEqual([json.loads(line)["custom_id"] for line in f], ["x", "y", "z"])
+
+    def test_interrupted_run_resumes_from_the_checkpoint(self):
+        self.backend.batch_duration = 0.05
+        checkpoint = os.path.join(self.directory.name, "checkpoint.jsonl")
+        prompts = [f"prompt {index}" for index in range(6)]
+        with self.assertRaises(Interrupted):
+            list(self.runner(checkpoint=checkpoint, sleep=interrupt).run(prompts))
+        self.assertEqual(self.backend.calls["batches.create"], 2)
+
+        results = list(self.runner(checkpoint=checkpoint).run(prompts))
+        self.assertEqual(len(results), 6)
+        self.assertTrue(all(result["error"] is None for result in results))
+        # The batches in flight were picked up again rather than submitted twice
+        self.assertEqual(self.backend.calls["batches.create"], 4)
+
+        # Everything is in the checkpoint now, nothing left to submit
+        again = list(self.runner(checkpoint=checkpoint).run(prompts))
+        self.assertEqual(again, results)
+        self.assertEqual(self.backend.calls["batches.create"], 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
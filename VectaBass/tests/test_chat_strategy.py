@@ -0,0 +1,111 @@
+import time
+import unittest
+from types import SimpleNamespace
+
+from VectaBass.agents.base_manager import BaseManager
+from VectaBass.fake_openai import FakeBackend, FakeOpenAI, text_content
+from VectaBass.pub_sub_manager import PubSub
+from VectaBass.run_completion import Backoff, PollingCompletion
+from VectaBass.sessions import SessionStore
+from VectaBass.thread_pool import WarmThreadPool
+
+
+class Echo(BaseManager):
+    pass
+
+
+class TestPrintResponses(unittest.TestCase):
+    def setUp(self):
+        self.backend = FakeBackend()
+        self.client = FakeOpenAI(self.backend)
+        self.manager = Echo("echo", client=self.client)
+        self.strategy = self.manager.assistant_manager.chat.strategy
+        self.strategy.completion = PollingCompletion(Backoff(initial=0.001, maximum=0.005, jitter=0))
+        self.replies = []
+        PubSub().subscribe(f"print_message_{self.manager.name}", self.replies.append)
+
+    def test_only_new_assistant_messages_are_published(self):
+        self.strategy.send_message("first")
+        self.strategy.send_message("second")
+        self.assertEqual([reply.split("\n", 1)[1] for reply in self.replies], ["echo: first", "echo: second"])
+
+    def test_every_new_message_and_text_part_is_published(self):
+        thread_id = self.strategy.get_thread().id
+        self.strategy.send_message("hi")
+        parts = text_content("part one") + [SimpleNamespace(type="image_file", image_file=None)] + text_content("part two")
+        self.client.beta.threads.messages.create(thread_id=thread_id, role="assistant", content=parts)
+        self.client.beta.threads.messages.create(thread_id=thread_id, role="assistant", content="another message")
+        self.backend.calls.clear()
+
+        text = self.strategy.print_responses(thread_id, limit=1)
+        self.assertEqual(text, "part one\npart two\nanother message")
+        self.assertEqual(len(self.replies), 3)
+        # One page per message with limit=1, stopping once has_more is False
+        self.assertEqual(self.backend.calls["threads.messages.list"], 2)
+        self.assertEqual(self.strategy.print_responses(thread_id), "")
+
+    def test_unknown_thread_reads_the_newest_message_only(self):
+        thread = self.client.beta.threads.create()
+        for content in ("old", "new"):
+            self.client.beta.threads.messages.create(thread_id=thread.id, role="assistant", content=content)
+        self.assertEqual(self.strategy.print_responses(thread.id), "new")
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+class TestConversationThreads(unittest.TestCase):
+    def setUp(self):
+        self.backend = FakeBackend()
+        self.client = FakeOpenAI(self.backend)
+
+    def manager(self, **strategy_options):
+        manager = Echo("echo", identifier="static", client=self.client)
+        strategy = manager.assistant_manager.chat.strategy
+        strategy.completion = PollingCompletion(Backoff(initial=0.001, maximum=0.005, jitter=0))
+        for name, value in strategy_options.items():
+            setattr(strategy, name, value)
+        return manager, strategy
+
+    def test_thread_is_created_by_the_first_message(self):
+        manager, strategy = self.manager()
+        self.assertEqual(self.backend.calls["threads.create"], 0)
+        manager.assistant_manager.send_message("hi")
+        self.assertEqual(self.backend.calls["threads.create"], 1)
+        self.assertIsNotNone(strategy.thread)
+
+    def test_session_key_reattaches_the_thread(self):
+        sessions = SessionStore()
+        manager, strategy = self.manager(session_store=sessions)
+        manager.assistant_manager.chat.set_thread("customer-42")
+        manager.assistant_manager.send_message("hi")
+        thread_id = strategy.thread.id
+
+        other, other_strategy = self.manager(session_store=sessions)
+        other.assistant_manager.chat.set_thread("customer-42")
+        self.assertEqual(other_strategy.get_thread().id, thread_id)
+        self.assertEqual(self.backend.calls["threads.create"], 1)
+
+        # A thread deleted remotely is replaced and the session remapped
+        self.client.beta.threads.delete(thread_id)
+        third, third_strategy = self.manager(session_store=sessions)
+        third.assistant_manager.chat.set_thread("customer-42")
+        self.assertNotEqual(third_strategy.get_thread().id, thread_id)
+        self.assertEqual(sessions.get(third.name, "customer-42"), third_strategy.thread.id)
+
+    def test_warm_pool_hands_out_precreated_threads(self):
+        pool = WarmThreadPool(client=self.client, size=2, prefill=False)
+        pool.refill()
+        precreated = {thread.id for thread in pool.threads}
+        manager, strategy = self.manager(thread_pool=pool)
+        self.backend.calls.clear()
+        self.assertIn(strategy.get_thread().id, precreated)
+        # Topped up in the background
+        for _ in range(100):
+            if len(pool) == 2 and not pool.refilling:
+                break
+            time.sleep(0.01)
+        self.assertEqual(len(pool), 2)
+        pool.close(delete=True)
+        self.assertEqual(len(pool), 0)
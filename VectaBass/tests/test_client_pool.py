@@ -0,0 +1,190 @@
+import asyncio
+import functools
+import threading
+import time
+import unittest
+import unittest.mock
+
+from VectaBass.agents.base_manager import BaseManager
+from VectaBass.client_pool import ClientPool, LimitedClient, RateLimiter, TokenBucket
+from VectaBass.fake_openai import FakeAPIError, FakeAsyncOpenAI, FakeBackend, FakeOpenAI
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_token_bucket(self):
+        clock = FakeClock()
+        bucket = TokenBucket(60, burst=2.0, clock=clock)
+        self.assertEqual(bucket.delay(2), 0)
+        bucket.take(2)
+        self.assertAlmostEqual(bucket.delay(1), 1.0)
+        clock.now = 1.0
+        self.assertEqual(bucket.delay(1), 0)
+        # Larger than capacity: waits for a full bucket, then goes into debt
+        self.assertAlmostEqual(bucket.delay(10), 1.0)
+
+    def test_priority_then_round_robin_between_keys(self):
+        limiter = RateLimiter(max_concurrency=1)
+        order = []
+        limiter._enqueue("chatty", 0, 0, lambda: order.append("chatty"))
+        for _ in range(3):
+            limiter._enqueue("chatty", 0, 0, lambda: order.append("chatty"))
+        limiter._enqueue("quiet", 0, 0, lambda: order.append("quiet"))
+        limiter._enqueue("vip", 5, 0, lambda: order.append("vip"))
+        for _ in range(5):
+            limiter.release()
+        self.assertEqual(order, ["chatty", "vip", "chatty", "quiet", "chatty", "chatty"])
+        self.assertEqual(limiter.active, 1)
+
+    def test_concurrency_cap(self):
+        limiter = RateLimiter(max_concurrency=2)
+        state = {"active": 0, "peak": 0}
+        lock = threading.Lock()
+
+        def work():
+            with limiter.acquire("agent"):
+                with lock:
+                    state["active"] += 1
+                    state["peak"] = max(state["peak"], state["active"])
+                time.sleep(0.005)
+                with lock:
+                    state["active"] -= 1
+
+        threads = [threading.Thread(target=work) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(state["peak"], 2)
+        self.assertEqual(limiter.active, 0)
+
+    def test_requests_per_minute_spaces_calls(self):
+        limiter = RateLimiter(requests_per_minute=6000, burst=0.01)
+        start = time.monotonic()
+        for _ in range(11):
+            with limiter.acquire():
+                pass
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+
+class TestLimitedClient(unittest.TestCase):
+    def test_rate_limited_calls_are_retried_after_a_pause(self):
+        attempts = []
+
+        def create(**kwargs):
+            attempts.append(time.monotonic())
+            if len(attempts) < 3:
+                raise FakeAPIError("slow down", status_code=429)
+            return "ok"
+
+        limiter = RateLimiter()
+        client = LimitedClient(type("Client", (), {"create": staticmethod(create)})(), limiter)
+        with unittest.mock.patch("VectaBass.client_pool.retry_after", return_value=0.02):
+            self.assertEqual(client.create(content="hi"), "ok")
+        self.assertEqual(len(attempts), 3)
+        self.assertGreaterEqual(attempts[2] - attempts[1], 0.015)
+
+    def test_other_errors_are_raised(self):
+        client = LimitedClient(FakeOpenAI(), RateLimiter())
+        with self.assertRaises(FakeAPIError):
+            client.beta.threads.retrieve("thread_missing")
+
+    def test_limiter_turns_a_burst_into_a_queue(self):
+        backend = FakeBackend(rate_limit=100)
+        limiter = RateLimiter(requests_per_minute=80 * 60, max_concurrency=4)
+        client = LimitedClient(FakeOpenAI(backend), limiter, key="agent")
+        threads = [threading.Thread(target=client.beta.threads.create) for _ in range(40)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(backend.calls["threads.create"], 40)
+        self.assertEqual(backend.calls["rate_limited"], 0)
+
+    def test_async_client(self):
+        backend = FakeBackend(api_latency=0.005)
+        limiter = RateLimiter(max_concurrency=3)
+        client = LimitedClient(FakeAsyncOpenAI(backend), limiter)
+
+        async def main():
+            return await asyncio.gather(*(client.beta.threads.create() for _ in range(10)))
+
+        self.assertEqual(len({thread.id for thread in asyncio.run(main())}), 10)
+        self.assertEqual(limiter.active, 0)
+
+    def test_runs_are_charged_for_their_thread(self):
+        runs = type("Runs", (), {"create": staticmethod(lambda **kwargs: "run"), "retrieve": staticmethod(lambda **kwargs: "run")})()
+        target = type("Client", (), {"beta": type("Beta", (), {"threads": type("Threads", (), {"runs": runs})()})()})()
+        limiter = RateLimiter(tokens_per_minute=60_000, clock=FakeClock())
+        client = LimitedClient(target, limiter, thread_tokens={"thread_1": 800})
+        client.beta.threads.runs.retrieve(thread_id="thread_1", run_id="run")
+        self.assertEqual(limiter.tokens.tokens, limiter.tokens.capacity)
+        client.beta.threads.runs.create(thread_id="thread_1", assistant_id="asst")
+        self.assertEqual(limiter.tokens.tokens, limiter.tokens.capacity - 800)
+
+    def test_decorated_async_endpoints_are_limited_and_retried(self):
+        state = {"active": 0, "peak": 0, "failures": 1}
+
+        def required_args(method):
+            # Like the SDK's decorators: a plain function returning the coroutine
+            @functools.wraps(method)
+            def wrapper(*args, **kwargs):
+                return method(*args, **kwargs)
+
+            return wrapper
+
+        class Runs:
+            @required_args
+            async def create(self, thread_id):
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+                await asyncio.sleep(0.005)
+                state["active"] -= 1
+                if state["failures"]:
+                    state["failures"] -= 1
+                    raise FakeAPIError("slow down", status_code=429)
+                return thread_id
+
+        limiter = RateLimiter(max_concurrency=1)
+        target = type("Client", (), {"beta": type("Beta", (), {"runs": Runs()})()})()
+        client = LimitedClient(target, limiter, asynchronous=True)
+        self.assertFalse(asyncio.iscoroutinefunction(Runs().create))
+
+        async def main():
+            return await asyncio.gather(*(client.beta.runs.create(thread_id=f"thread_{i}") for i in range(5)))
+
+        with unittest.mock.patch("VectaBass.client_pool.retry_after", return_value=0.01):
+            self.assertEqual(asyncio.run(main()), [f"thread_{i}" for i in range(5)])
+        self.assertEqual(state["peak"], 1)
+        self.assertEqual(limiter.active, 0)
+
+
+class Plain(BaseManager):
+    pass
+
+
+class TestClientPool(unittest.TestCase):
+    def test_strategies_share_one_client(self):
+        shared = ClientPool._instance
+        pool = ClientPool._instance = ClientPool(client_factory=FakeOpenAI)
+        try:
+            first, second = Plain("first"), Plain("second")
+        finally:
+            ClientPool._instance = shared
+        first_client = first.assistant_manager.chat.strategy.client
+        second_client = second.assistant_manager.chat.strategy.client
+        self.assertIsInstance(first_client, LimitedClient)
+        self.assertIs(first_client._target, second_client._target)
+        self.assertIs(first_client._limiter, pool.limiter)
+        self.assertEqual(first_client._key, first.name)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+from types import SimpleNamespace
+
+from VectaBass.agents.base_manager import BaseManager
+from VectaBass.chat_strategy import message_text
+from VectaBass.compaction import CompactionPolicy, truncating_digest
+from VectaBass.fake_openai import FakeBackend, FakeOpenAI, text_content
+from VectaBass.pub_sub_manager import PubSub
+from VectaBass.run_completion import Backoff, PollingCompletion
+from VectaBass.sessions import SessionStore
+
+
+class Echo(BaseManager):
+    pass
+
+
+def message(id, role, text, **metadata):
+    return SimpleNamespace(id=id, role=role, content=text_content(text), metadata=metadata)
+
+
+class TestCompactionPolicy(unittest.TestCase):
+    def test_plan_keeps_recent_and_pinned_messages(self):
+        messages = [message(f"m{index}", "user", f"turn {index}") for index in range(10)]
+        messages[2].metadata = {"pinned": "true"}
+        digest, carried, dropped = CompactionPolicy(keep_recent=3).plan(messages, pinned_ids={"m4"})
+        self.assertEqual([m.id for m in carried], ["m2", "m4", "m7", "m8", "m9"])
+        self.assertEqual([m.id for m in dropped], ["m0", "m1", "m3", "m5", "m6"])
+        self.assertIn("user: turn 6", digest)
+
+    def test_digest_keeps_the_latest_turns_within_budget(self):
+        messages = [message(f"m{index}", "user", "x" * 100 + str(index)) for index in range(10)]
+        digest = truncating_digest(messages, digest_tokens=60)
+        self.assertLessEqual(len(digest), 60 * 4 + 80)
+        self.assertIn("x9", digest)
+        self.assertNotIn("x0", digest)
+        self.assertIn("older messages omitted", digest)
+
+    def test_custom_summarizer(self):
+        policy = CompactionPolicy(keep_recent=1, summarize=lambda messages, budget: f"{len(messages)} turns")
+        digest, carried, dropped = policy.plan([message("a", "user", "1"), message("b", "user", "2")])
+        self.assertEqual(digest, "1 turns")
+
+
+class TestThreadCompaction(unittest.TestCase):
+    def setUp(self):
+        self.backend = FakeBackend()
+        self.client = FakeOpenAI(self.backend)
+        self.manager = Echo("echo", client=self.client)
+        self.strategy = self.manager.assistant_manager.chat.strategy
+        self.strategy.completion = PollingCompletion(Backoff(initial=0.001, maximum=0.005, jitter=0))
+        self.strategy.compaction = CompactionPolicy(max_tokens=200, keep_recent=2, digest_tokens=50)
+        self.events = []
+        PubSub().subscribe(f"thread_compacted_{self.manager.name}", self.events.append)
+
+    def tearDown(self):
+        PubSub().unsubscribe(f"thread_compacted_{self.manager.name}", self.events.append)
+
+    def test_long_thread_is_replaced_by_a_digest(self):
+        self.strategy.set_thread("customer-1")
+        first = self.strategy.get_thread()
+        self.strategy.add_message_to_thread(first.id, "Remember the order number 1234", pinned=True)
+        for index in range(8):
+            self.strategy.send_message(f"message {index} " + "lorem ipsum " * 10)
+
+        self.assertTrue(self.events)
+        event = self.events[0]
+        self.assertEqual(event["old_thread_id"], first.id)
+        self.assertLess(event["tokens_after"], event["tokens_before"])
+        thread = self.strategy.get_thread()
+        self.assertNotEqual(thread.id, first.id)
+        self.assertEqual(SessionStore.shared().get(self.manager.name, "customer-1"), thread.id)
+        self.assertLessEqual(self.strategy.thread_tokens[thread.id], 200 + 100)
+
+        texts = [message_text(m) for m in self.strategy.list_messages(thread.id)]
+        self.assertTrue(any("order number 1234" in text for text in texts))
+        self.assertTrue(texts[-1].startswith("echo: message 7"))
+        # The conversation carries on in the new thread
+        self.strategy.send_message("after")
+        self.assertEqual(message_text(self.strategy.list_messages(self.strategy.get_thread().id)[-1]), "echo: after")
+
+    def test_disabled_by_default(self):
+        self.strategy.compaction = None
+        for index in range(8):
+            self.strategy.send_message("lorem ipsum " * 20)
+        self.assertEqual(self.events, [])
+        self.assertEqual(self.backend.calls["threads.create"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import asyncio
+import unittest
+
+from VectaBass.agents.base_manager import BaseManager
+from VectaBass.completions_strategy import ChatCompletionsStrategy, ConversationHistory
+from VectaBass.fake_openai import FakeAsyncOpenAI, FakeBackend, FakeOpenAI, ToolCallResponder
+from VectaBass.pub_sub_manager import PubSub
+
+
+class Lookup(BaseManager):
+    chat_api = "chat_completions"
+
+    def lookup(self, key: str):
+        return key.upper()
+
+
+class TestConversationHistory(unittest.TestCase):
+    def test_oldest_messages_are_dropped_past_the_budget(self):
+        history = ConversationHistory(max_tokens=100)
+        for index in range(20):
+            history.append({"role": "user", "content": f"message {index} " + "x" * 60})
+        self.assertLessEqual(history.tokens, 100)
+        self.assertEqual(history.messages()[-1]["content"][:10], "message 19")
+        self.assertEqual(history.messages("be brief")[0], {"role": "system", "content": "be brief"})
+
+    def test_tool_outputs_never_outlive_their_call(self):
+        history = ConversationHistory(max_tokens=60)
+        call = {"id": "call_1", "type": "function", "function": {"name": "lookup", "arguments": "{}"}}
+        history.append({"role": "assistant", "content": None, "tool_calls": [call]})
+        history.append({"role": "tool", "tool_call_id": "call_1", "content": "y" * 100})
+        history.append({"role": "tool", "tool_call_id": "call_2", "content": "y" * 100})
+        history.append({"role": "assistant", "content": "done"})
+        self.assertEqual([message["role"] for message in history.messages()], ["assistant"])
+
+    def test_tool_round_larger_than_the_budget_stays_whole(self):
+        history = ConversationHistory()
+        history.append({"role": "user", "content": "earlier question"})
+        history.append({"role": "assistant", "content": "earlier answer"})
+        history.append({"role": "user", "content": "look these up"})
+        calls = [{"id": f"call_{index}", "type": "function", "function": {"name": "lookup", "arguments": "{}"}} for index in range(3)]
+        history.append({"role": "assistant", "content": None, "tool_calls": calls})
+        for call in calls:
+            history.append({"role": "tool", "tool_call_id": call["id"], "content": "y" * 16_000})
+        roles = [message["role"] for message in history.messages("be brief")]
+        self.assertEqual(roles, ["system", "user", "assistant", "tool", "tool", "tool"])
+        self.assertEqual(history.messages()[0]["content"], "look these up")
+        # Once answered, the round goes whole
+        history.append({"role": "assistant", "content": "done"})
+        self.assertEqual(history.messages(), [{"role": "user", "content": "look these up"}, {"role": "assistant", "content": "done"}])
+
+
+class TestChatCompletionsStrategy(unittest.TestCase):
+    def setUp(self):
+        self.backend = FakeBackend(responder=ToolCallResponder([("lookup", {"key": "a"}), ("lookup", {"key": "b"})]))
+        self.manager = Lookup("lookup", client=FakeOpenAI(self.backend))
+        self.strategy = self.manager.assistant_manager.chat.strategy
+        self.replies = []
+        PubSub().subscribe(f"print_message_{self.manager.name}", self.replies.append)
+
+    def test_turn_resolves_tool_calls_without_threads_or_runs(self):
+        self.assertIsInstance(self.strategy, ChatCompletionsStrategy)
+        self.manager.start()
+        self.manager.assistant_manager.send_message("look a and b up")
+        self.assertEqual(dict(self.backend.calls), {"chat.completions.create": 2})
+        self.assertTrue(self.replies[-1].endswith('{"result":"A"}; {"result":"B"}'))
+        roles = [message["role"] for message in self.strategy.get_thread().messages()]
+        self.assertEqual(roles, ["user", "assistant", "tool", "tool", "assistant"])
+
+    def test_tools_come_from_the_registry(self):
+        self.assertEqual([tool["function"]["name"] for tool in self.strategy.tools], [f"{self.manager.name}_lookup"])
+
+    def test_session_keys_keep_separate_histories(self):
+        chat = self.manager.assistant_manager.chat
+        chat.set_thread("alice")
+        chat.send_message("hi", direct=True)
+        chat.set_thread("bob")
+        self.assertEqual(len(chat.get_thread()), 0)
+        chat.set_thread("alice")
+        self.assertEqual(len(chat.get_thread()), 2)
+
+    def test_asynchronous_agent(self):
+        manager = Lookup("lookup", asynchronous=True, client=FakeAsyncOpenAI(self.backend))
+
+        async def main():
+            await manager.astart()
+            return await manager.assistant_manager.send_message("look a and b up")
+
+        self.assertEqual(asyncio.run(main()), '{"result":"A"}; {"result":"B"}')
+        asyncio.run(manager.aclose())
+
+
+if __name__ == "__main__":
+    unittest.main()
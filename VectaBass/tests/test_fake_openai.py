@@ -0,0 +1,96 @@
+import asyncio
+import unittest
+
+from VectaBass.agents.base_manager import BaseManager
+from VectaBass.fake_openai import FakeAPIError, FakeAsyncOpenAI, FakeBackend, FakeOpenAI, ToolCallResponder
+from VectaBass.pub_sub_manager import PubSub
+from VectaBass.run_completion import Backoff, PollingCompletion, StreamingCompletion
+
+
+class Greeter(BaseManager):
+    def say_hello_to_someone(self, name: str):
+        return f"Hello {name}"
+
+
+def collect(manager):
+    replies = []
+    PubSub().subscribe(f"print_message_{manager.name}", replies.append)
+    return replies
+
+
+def fast(strategy):
+    strategy.completion = PollingCompletion(Backoff(initial=0.001, maximum=0.005, jitter=0))
+    return strategy
+
+
+class TestFakeBackend(unittest.TestCase):
+    def test_plain_turn(self):
+        backend = FakeBackend()
+        manager = Greeter("greeter", client=FakeOpenAI(backend))
+        fast(manager.assistant_manager.chat.strategy)
+        replies = collect(manager)
+        manager.assistant_manager.send_message("hi there")
+        self.assertEqual(replies, [f"**{manager.name}**: \necho: hi there"])
+        self.assertEqual(backend.calls["threads.runs.create"], 1)
+
+    def test_tool_call_turn(self):
+        backend = FakeBackend(responder=ToolCallResponder([("say_hello_to_someone", {"name": "Ada"})]))
+        manager = Greeter("greeter", client=FakeOpenAI(backend))
+        fast(manager.assistant_manager.chat.strategy)
+        replies = collect(manager)
+        manager.assistant_manager.send_message("greet Ada")
+        self.assertIn("Hello Ada", replies[0])
+        self.assertEqual(backend.calls["threads.runs.submit_tool_outputs"], 1)
+
+    def test_streaming_turn(self):
+        backend = FakeBackend(run_duration=0.01, responder=ToolCallResponder([("say_hello_to_someone", {"name": "Bo"})]))
+        manager = Greeter("greeter", client=FakeOpenAI(backend))
+        manager.assistant_manager.chat.strategy.completion = StreamingCompletion()
+        deltas = []
+        PubSub().subscribe(f"message_delta_{manager.name}", deltas.append)
+        manager.assistant_manager.send_message("greet Bo")
+        self.assertEqual(backend.calls["threads.runs.retrieve"], 0)
+        self.assertIn("Hello Bo", deltas[0])
+
+    def test_failed_runs_are_retried(self):
+        backend = FakeBackend(run_failure_rate=1.0)
+        manager = Greeter("greeter", client=FakeOpenAI(backend)).start()
+        strategy = fast(manager.assistant_manager.chat.strategy)
+        run = strategy.run_thread(strategy.get_thread().id, [], retry_delay=0)
+        self.assertEqual(run.status, "failed")
+        self.assertEqual(backend.calls["threads.runs.create"], 3)
+
+    def test_active_run_blocks_new_messages(self):
+        client = FakeOpenAI(FakeBackend(run_duration=10))
+        thread = client.beta.threads.create()
+        assistant = client.beta.assistants.create(name="a")
+        client.beta.threads.runs.create(thread_id=thread.id, assistant_id=assistant.id)
+        with self.assertRaises(FakeAPIError):
+            client.beta.threads.messages.create(thread_id=thread.id, role="user", content="too soon")
+
+    def test_assistant_listing_is_paginated(self):
+        client = FakeOpenAI()
+        for i in range(5):
+            client.beta.assistants.create(name=f"a{i}")
+        first = client.beta.assistants.list(limit=2)
+        second = client.beta.assistants.list(limit=2, after=first.data[-1].id)
+        self.assertTrue(first.has_more)
+        self.assertEqual([a.name for a in first.data + second.data], ["a4", "a3", "a2", "a1"])
+
+    def test_async_turn(self):
+        backend = FakeBackend(run_duration=0.01, responder=ToolCallResponder([("say_hello_to_someone", {"name": "Cy"})]))
+        managers = [Greeter("greeter", asynchronous=True, client=FakeAsyncOpenAI(backend)) for _ in range(10)]
+        replies = []
+        for manager in managers:
+            PubSub().subscribe(f"print_message_{manager.name}", replies.append)
+
+        async def main():
+            await asyncio.gather(*(manager.assistant_manager.send_message("greet Cy") for manager in managers))
+
+        asyncio.run(main())
+        self.assertEqual(len(replies), 10)
+        self.assertTrue(all("Hello Cy" in reply for reply in replies))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import sys
+import threading
+import time
+import unittest
+
+from VectaBass.agents.base_manager import BaseManager
+from VectaBass.fake_openai import FakeBackend, FakeOpenAI
+from VectaBass.message_queue import MessageQueue, QueueFull
+from VectaBass.run_completion import Backoff, PollingCompletion
+
+
+class Recorder:
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.batches = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, messages, direct):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        self.batches.append((messages, direct))
+        with self.lock:
+            self.active -= 1
+
+
+class TestMessageQueue(unittest.TestCase):
+    def test_backlog_is_drained_without_recursion(self):
+        recorder = Recorder()
+        queue = MessageQueue(handler=None)
+
+        def handler(messages, direct):
+            recorder(messages, direct)
+            if messages[0] == 0:
+                # Queued while the worker is busy, drained by the same loop afterwards
+                for i in range(1, sys.getrecursionlimit() * 2):
+                    queue.put(i)
+
+        queue.handler = handler
+        queue.put(0)
+        self.assertEqual([batch[0][0] for batch in recorder.batches], list(range(sys.getrecursionlimit() * 2)))
+        self.assertFalse(queue.busy)
+
+    def test_one_worker_across_threads(self):
+        recorder = Recorder(delay=0.002)
+        queue = MessageQueue(handler=recorder)
+        threads = [threading.Thread(target=queue.put, args=(i,)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertTrue(queue.join(timeout=5))
+        self.assertEqual(recorder.max_active, 1)
+        self.assertEqual(sorted(batch[0][0] for batch in recorder.batches), list(range(20)))
+
+    def test_coalescing_keeps_direct_messages_apart(self):
+        recorder = Recorder()
+        queue = MessageQueue(coalesce=True, handler=recorder)
+        with queue.condition:
+            queue.worker = True
+            for message, direct in [("a", False), ("b", False), ("c", True), ("d", False)]:
+                queue.items.append((message, direct))
+        queue._drain()
+        self.assertEqual(recorder.batches, [(["a", "b"], False), (["c"], True), (["d"], False)])
+
+    def test_drop_policies(self):
+        for overflow, expected, accepted in [("drop_oldest", ["b", "c"], True), ("drop_newest", ["a", "b"], False)]:
+            queue = MessageQueue(maxsize=2, overflow=overflow, handler=Recorder())
+            queue.worker = True
+            queue.put("a")
+            queue.put("b")
+            self.assertEqual(queue.put("c"), accepted)
+            self.assertEqual([message for message, _ in queue.items], expected)
+            self.assertEqual(queue.dropped, 1)
+
+    def test_reject_and_block_timeout(self):
+        for overflow in ("reject", "block"):
+            queue = MessageQueue(maxsize=1, overflow=overflow, put_timeout=0.01, handler=Recorder())
+            queue.worker = True
+            queue.put("a")
+            with self.assertRaises(QueueFull):
+                queue.put("b")
+
+    def test_block_applies_backpressure(self):
+        recorder = Recorder(delay=0.005)
+        queue = MessageQueue(maxsize=2, background=True, handler=recorder)
+        for i in range(10):
+            queue.put(i)
+            self.assertLessEqual(len(queue), 2)
+        self.assertTrue(queue.join(timeout=5))
+        self.assertEqual([batch[0][0] for batch in recorder.batches], list(range(10)))
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            MessageQueue(overflow="spill")
+
+
+class Echo(BaseManager):
+    pass
+
+
+class TestStrategyQueue(unittest.TestCase):
+    def test_burst_is_coalesced_into_one_run(self):
+        backend = FakeBackend(run_duration=0.01)
+        manager = Echo("echo", client=FakeOpenAI(backend))
+        strategy = manager.assistant_manager.chat.strategy
+        strategy.completion = PollingCompletion(Backoff(initial=0.001, maximum=0.005, jitter=0))
+        strategy.message_queue.coalesce = True
+        strategy.message_queue.background = True
+        for i in range(5):
+            strategy.send_message(f"message {i}")
+        self.assertTrue(strategy.message_queue.join(timeout=5))
+        self.assertEqual(backend.calls["threads.messages.create"], 5)
+        self.assertLessEqual(backend.calls["threads.runs.create"], 2)
+        self.assertFalse(strategy.is_processing)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import asyncio
+import threading
+import time
+import unittest
+import uuid
+
+from VectaBass.message_queue import QueueFull
+from VectaBass.pub_sub_manager import PubSub
+
+
+def topic(prefix="topic"):
+    return f"{prefix}_{uuid.uuid4().hex}"
+
+
+class TestPubSub(unittest.TestCase):
+    def setUp(self):
+        self.pubsub = PubSub()
+
+    def test_sync_delivery_and_unsubscribe(self):
+        name, received = topic(), []
+        self.pubsub.subscribe(name, received.append)
+        self.pubsub.publish(name, 1)
+        self.pubsub.unsubscribe(name, received.append)
+        self.pubsub.publish(name, 2)
+        self.assertEqual(received, [1])
+
+    def test_slow_thread_subscriber_does_not_block_publisher(self):
+        name, received, release = topic(), [], threading.Event()
+
+        def slow(data):
+            release.wait(5)
+            received.append(data)
+
+        subscription = self.pubsub.subscribe(name, slow, mode="thread")
+        start = time.perf_counter()
+        for i in range(100):
+            self.pubsub.publish(name, i)
+        self.assertLess(time.perf_counter() - start, 0.5)
+        release.set()
+        self.assertTrue(subscription.join(timeout=5))
+        self.assertEqual(received, list(range(100)))
+
+    def test_overflow_policies(self):
+        for overflow, expected in [("drop_oldest", [0, 3, 4]), ("drop_newest", [0, 1, 2])]:
+            name, received, release = topic(), [], threading.Event()
+
+            def slow(data, received=received, release=release):
+                release.wait(5)
+                received.append(data)
+
+            subscription = self.pubsub.subscribe(name, slow, mode="thread", maxsize=2, overflow=overflow)
+            self.pubsub.publish(name, 0)
+            time.sleep(0.05)  # 0 is taken by the worker, the rest queue up behind it
+            for i in range(1, 5):
+                self.pubsub.publish(name, i)
+            release.set()
+            subscription.join(timeout=5)
+            self.assertEqual(received, expected)
+            self.assertEqual(subscription.dropped, 2)
+
+        name = topic()
+        self.pubsub.subscribe(name, lambda data: time.sleep(0.05), mode="thread", maxsize=1, overflow="reject")
+        with self.assertRaises(QueueFull):
+            for i in range(5):
+                self.pubsub.publish(name, i)
+
+    def test_batched_delivery(self):
+        name, batches, release = topic(), [], threading.Event()
+
+        def collect(batch):
+            release.wait(5)
+            batches.append(batch)
+
+        subscription = self.pubsub.subscribe(name, collect, mode="thread", batch_size=10)
+        for i in range(25):
+            self.pubsub.publish(name, i)
+        release.set()
+        subscription.join(timeout=5)
+        self.assertEqual([item for batch in batches for item in batch], list(range(25)))
+        self.assertTrue(all(len(batch) <= 10 for batch in batches))
+        self.assertLess(len(batches), 25)
+
+    def test_prefix_subscription(self):
+        prefix, received = topic("agent"), []
+        self.pubsub.subscribe(f"{prefix}*", received.append)
+        self.pubsub.publish(f"{prefix}_a", "a")
+        self.pubsub.publish(f"{prefix}_b", "b")
+        self.pubsub.publish(topic("other"), "c")
+        self.assertEqual(received, ["a", "b"])
+        self.pubsub.unsubscribe(f"{prefix}*", received.append)
+        self.pubsub.publish(f"{prefix}_a", "d")
+        self.assertEqual(received, ["a", "b"])
+
+    def test_resolved_topics_are_bounded(self):
+        prefix, received = topic("session"), []
+        self.pubsub.subscribe(f"{prefix}*", received.append)
+        self.addCleanup(self.pubsub.unsubscribe, f"{prefix}*", received.append)
+        for index in range(self.pubsub.max_resolved + 500):
+            self.pubsub.publish(f"{prefix}_{index}", index)
+        self.assertEqual(len(received), self.pubsub.max_resolved + 500)
+        self.assertLessEqual(len(self.pubsub.resolved), self.pubsub.max_resolved)
+
+    def test_async_delivery(self):
+        name = topic()
+
+        async def main():
+            received = []
+
+            async def handler(data):
+                await asyncio.sleep(0)
+                received.append(data)
+
+            subscription = self.pubsub.subscribe(name, handler, mode="async")
+            # Published from another thread, delivered on this loop
+            publisher = threading.Thread(target=lambda: [self.pubsub.publish(name, i) for i in range(10)])
+            publisher.start()
+            publisher.join()
+            while subscription.scheduled:
+                await asyncio.sleep(0.001)
+            return received
+
+        self.assertEqual(asyncio.run(main()), list(range(10)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,206 @@
+from types import SimpleNamespace
+import unittest
+from pydantic import BaseModel
+
+from unittest import mock
+
+from VectaBass.model_utils import ModelValidator
+from VectaBass.registry import Registry, RegistryEntry, RegistryTemplate
+
+
+class User(BaseModel):
+    name: str
+
+
+class Order(BaseModel):
+    total: float
+
+
+class RecordingChat:
+    def __init__(self):
+        self.pushes = []
+
+    def add_tool(self, config, tools_to_remove):
+        self.pushes.append(([tool["function"]["name"] for tool in config], list(tools_to_remove)))
+
+
+class Shop:
+    name = "shop"
+    identifier = "shop"
+
+    def __init__(self):
+        self.chat = RecordingChat()
+        self.assistant_manager = SimpleNamespace(chat=self.chat)
+        self.registry = Registry(self)
+
+    def add_user(self, user: User):
+        return user.name
+
+    def describe(self, item: BaseModel):
+        return item
+
+
+def query(item: BaseModel):
+    return item
+
+
+def export(item: BaseModel):
+    return item
+
+
+class TestRegistryBatching(unittest.TestCase):
+    def setUp(self):
+        self.shop = Shop()
+        self.registry = self.shop.registry
+        self.registry.register_model("Order", Order)
+        self.shop.chat.pushes.clear()
+
+    def test_registration_pushes_once(self):
+        self.assertEqual(len(Shop().chat.pushes), 1)
+
+    def test_link_pushes_once_per_call_outside_a_batch(self):
+        self.registry.link_model_to_methods("User", [query, export])
+        self.assertEqual(len(self.shop.chat.pushes), 1)
+
+    def test_batch_coalesces_mutations_into_one_push(self):
+        with self.registry.batch():
+            self.registry.link_model_to_methods("User", [query])
+            self.registry.link_model_to_methods("Order", [query, export])
+            self.registry.register_method("shop", "extra", self.shop.add_user)
+            self.assertEqual(self.shop.chat.pushes, [])
+        self.assertEqual(len(self.shop.chat.pushes), 1)
+        names, removed = self.shop.chat.pushes[0]
+        self.assertIn("query_Order_", names)
+        self.assertIn("shop_extra", names)
+        self.assertEqual(removed, [])
+
+    def test_nested_batches_flush_at_the_outermost_exit(self):
+        with self.registry.batch():
+            with self.registry.batch():
+                self.registry.link_model_to_methods("User", [query])
+            self.assertEqual(self.shop.chat.pushes, [])
+        self.assertEqual(len(self.shop.chat.pushes), 1)
+
+    def test_unregister_inside_batch_carries_removals(self):
+        self.registry.link_model_to_methods("Order", [query])
+        self.shop.chat.pushes.clear()
+        with self.registry.batch():
+            self.registry.unregister_model("Order")
+            self.registry.link_model_to_methods("User", [export])
+        self.assertEqual(self.shop.chat.pushes[0][1], ["query_Order_"])
+
+    def test_relinking_inside_batch_cancels_removal(self):
+        self.registry.link_model_to_methods("Order", [query])
+        self.shop.chat.pushes.clear()
+        with self.registry.batch():
+            self.registry.unregister_model("Order")
+            self.registry.register_model("Order", Order)
+            self.registry.link_model_to_methods("Order", [query])
+        self.assertEqual(self.shop.chat.pushes[0][1], [])
+
+    def test_empty_batch_does_not_push(self):
+        with self.registry.batch():
+            pass
+        self.assertEqual(self.shop.chat.pushes, [])
+
+
+class TestRegistryIndexes(unittest.TestCase):
+    def setUp(self):
+        self.shop = Shop()
+        self.registry = self.shop.registry
+        self.registry.register_model("Order", Order)
+        self.shop.chat.pushes.clear()
+
+    def test_unregister_model_deletes_its_linked_methods(self):
+        self.registry.link_model_to_methods("Order", [query, export])
+        self.registry.link_model_to_methods("User", [query])
+        self.registry.unregister_model("Order")
+        self.assertNotIn("query_Order_", self.registry.methods)
+        self.assertIsNone(self.registry.lookup("export_Order_"))
+        names, removed = self.shop.chat.pushes[-1]
+        self.assertEqual(removed, ["query_Order_", "export_Order_"])
+        self.assertNotIn("query_Order_", names)
+        self.assertIn("query_User_", names)
+        self.assertNotIn("query_Order_", self.registry.schema_cache)
+
+    def test_link_unlink_cycles_do_not_grow_the_registry(self):
+        baseline = (len(self.registry.methods), len(self.registry.method_models), len(self.registry.owner_methods["shop"]))
+        for _ in range(50):
+            self.registry.register_model("Order", Order)
+            self.registry.link_model_to_methods("Order", [query, export])
+            self.registry.unregister_model("Order")
+        self.assertEqual((len(self.registry.methods), len(self.registry.method_models), len(self.registry.owner_methods["shop"])), baseline)
+        self.assertEqual(self.registry.methods_for_model("Order"), [])
+
+    def test_indexes(self):
+        self.registry.link_model_to_methods("Order", [query, export])
+        self.assertEqual(self.registry.methods_for_model("Order"), ["query_Order_", "export_Order_"])
+        self.assertEqual(self.registry.models_for_method("shop_add_user"), {"User"})
+        self.assertEqual(self.registry.unlink_model_from_methods("Order", [export]), ["export_Order_"])
+        self.assertEqual(self.registry.methods_for_model("Order"), ["query_Order_"])
+        self.assertIn("Order", self.registry.models)
+
+    def test_unregister_owner(self):
+        self.registry.link_model_to_methods("Order", [query])
+        removed = self.registry.unregister_owner("shop")
+        self.assertIn("shop_add_user", removed)
+        self.assertEqual(self.registry.methods, {})
+        self.assertEqual(self.registry.model_methods, {})
+        self.assertEqual(self.shop.chat.pushes[-1], ([], removed))
+
+    def test_readers_see_whole_batches_only(self):
+        version = self.registry.version
+        with self.registry.batch():
+            self.registry.link_model_to_methods("User", [query])
+            self.registry.unregister_method("shop_add_user")
+            self.assertIsNone(self.registry.lookup("query_User_"))
+            self.assertIsNotNone(self.registry.lookup("shop_add_user"))
+        self.assertEqual(self.registry.version, version + 1)
+        self.assertIsNotNone(self.registry.lookup("query_User_"))
+        self.assertIsNone(self.registry.lookup("shop_add_user"))
+
+
+class Catalog(Shop):
+    def search(self, term: str, limit: int = 5):
+        """Search the catalog."""
+        return term
+
+    @classmethod
+    def sections(cls):
+        return []
+
+    @staticmethod
+    def helper(value):
+        return value
+
+
+class TestRegistryTemplates(unittest.TestCase):
+    def test_class_is_introspected_once(self):
+        RegistryTemplate.invalidate(Catalog)
+        with mock.patch.object(ModelValidator, "base_model_annotations", wraps=ModelValidator.base_model_annotations) as introspect:
+            Catalog()
+            first = introspect.call_count
+            for _ in range(10):
+                Catalog()
+        self.assertEqual(introspect.call_count, first)
+
+    def test_instances_bind_their_own_methods(self):
+        one, two = Catalog(), Catalog()
+        one.name = "one"
+        registry = Registry(one)
+        entry = registry.lookup("one_search")
+        self.assertIsInstance(entry, RegistryEntry)
+        self.assertFalse(hasattr(entry, "__dict__"))
+        self.assertIs(entry.method.__self__, one)
+        self.assertIs(entry.binder, two.registry.lookup("shop_search").binder)
+        self.assertIs(registry.lookup("one_sections").method.__self__, Catalog)
+        self.assertIsNone(registry.lookup("one_helper"))
+
+        schema = {tool["function"]["name"]: tool["function"] for tool in registry.generate_json_schema()}
+        self.assertEqual(schema["one_search"]["description"], "Search the catalog.")
+        self.assertEqual(schema["one_search"]["parameters"]["required"], ["term"])
+        self.assertNotIn("self", schema["one_search"]["parameters"]["properties"])
+
+
+if __name__ == "__main__":
+    unittest.main()
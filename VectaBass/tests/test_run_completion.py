@@ -0,0 +1,154 @@
+from types import SimpleNamespace
+import unittest
+from VectaBass.run_completion import Backoff, PollingCompletion, StreamingCompletion
+
+
+def make_run(status, run_id="run_1", required_action=None):
+    return SimpleNamespace(id=run_id, status=status, required_action=required_action)
+
+
+def make_event(name, data):
+    return SimpleNamespace(event=name, data=data)
+
+
+class ScriptedRuns:
+    """Fake runs resource that replays a scripted sequence of run statuses."""
+
+    def __init__(self, statuses=(), streams=()):
+        self.statuses = list(statuses)
+        self.streams = list(streams)
+        self.calls = []
+
+    def _next(self, name, kwargs):
+        self.calls.append((name, kwargs))
+        if kwargs.get("stream"):
+            return iter(self.streams.pop(0))
+        return self.statuses.pop(0)
+
+    def create(self, **kwargs):
+        return self._next("create", kwargs)
+
+    def retrieve(self, **kwargs):
+        return self._next("retrieve", kwargs)
+
+    def submit_tool_outputs(self, **kwargs):
+        return self._next("submit_tool_outputs", kwargs)
+
+    def cancel(self, **kwargs):
+        self.calls.append(("cancel", kwargs))
+        return make_run("cancelled")
+
+    def count(self, name):
+        return sum(1 for call, _ in self.calls if call == name)
+
+
+def make_client(runs):
+    return SimpleNamespace(beta=SimpleNamespace(threads=SimpleNamespace(runs=runs)))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestBackoff(unittest.TestCase):
+    def test_delays_grow_and_are_capped(self):
+        delays = Backoff(initial=0.1, factor=2.0, maximum=0.5, jitter=0).delays()
+        self.assertEqual([next(delays) for _ in range(5)], [0.1, 0.2, 0.4, 0.5, 0.5])
+
+    def test_jitter_stays_within_spread(self):
+        delays = Backoff(initial=1.0, factor=1.0, maximum=1.0, jitter=0.2).delays()
+        for _ in range(50):
+            self.assertTrue(0.8 <= next(delays) <= 1.2)
+
+
+class TestPollingCompletion(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def engine(self, timeout=600.0):
+        return PollingCompletion(Backoff(initial=0.05, factor=2.0, maximum=1.0, jitter=0), timeout=timeout, sleep=self.clock.sleep, clock=self.clock)
+
+    def test_single_retrieve_per_poll(self):
+        runs = ScriptedRuns([make_run("queued"), make_run("in_progress"), make_run("in_progress"), make_run("completed")])
+        run = self.engine().run(make_client(runs), "thread_1", "asst_1", [], on_action=None)
+        self.assertEqual(run.status, "completed")
+        self.assertEqual(runs.count("retrieve"), 3)
+        self.assertEqual(self.clock.sleeps, [0.05, 0.1, 0.2])
+
+    def test_completed_on_create_never_polls(self):
+        runs = ScriptedRuns([make_run("completed")])
+        self.engine().run(make_client(runs), "thread_1", "asst_1", [], on_action=None)
+        self.assertEqual(runs.count("retrieve"), 0)
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_requires_action_submits_outputs_and_resets_backoff(self):
+        action = SimpleNamespace(name="action")
+        outputs = [{"tool_call_id": "call_1", "output": "{}"}]
+        runs = ScriptedRuns([make_run("queued"), make_run("in_progress"), make_run("requires_action", required_action=action), make_run("in_progress"), make_run("completed")])
+        seen = []
+
+        def on_action(required_action):
+            seen.append(required_action)
+            return outputs
+
+        run = self.engine().run(make_client(runs), "thread_1", "asst_1", [], on_action)
+        self.assertEqual(run.status, "completed")
+        self.assertEqual(seen, [action])
+        submit = [kwargs for name, kwargs in runs.calls if name == "submit_tool_outputs"]
+        self.assertEqual(submit, [{"thread_id": "thread_1", "run_id": "run_1", "tool_outputs": outputs}])
+        self.assertEqual(self.clock.sleeps, [0.05, 0.1, 0.05])
+
+    def test_deadline_cancels_run(self):
+        runs = ScriptedRuns([make_run("queued")] + [make_run("in_progress")] * 20)
+        run = self.engine(timeout=1.0).run(make_client(runs), "thread_1", "asst_1", [], on_action=None)
+        self.assertEqual(run.status, "cancelled")
+        self.assertEqual(runs.count("cancel"), 1)
+        self.assertLessEqual(self.clock.now, 1.0)
+
+    def test_terminal_failure_is_returned(self):
+        runs = ScriptedRuns([make_run("queued"), make_run("failed")])
+        run = self.engine().run(make_client(runs), "thread_1", "asst_1", [], on_action=None)
+        self.assertEqual(run.status, "failed")
+
+
+class TestStreamingCompletion(unittest.TestCase):
+    def test_consumes_events_and_submits_tool_outputs(self):
+        action = SimpleNamespace(name="action")
+        first = [
+            make_event("thread.run.created", make_run("queued")),
+            make_event("thread.run.in_progress", make_run("in_progress")),
+            make_event("thread.run.step.created", SimpleNamespace(status="in_progress")),
+            make_event("thread.run.requires_action", make_run("requires_action", required_action=action)),
+        ]
+        second = [
+            make_event("thread.message.delta", SimpleNamespace()),
+            make_event("thread.run.completed", make_run("completed")),
+        ]
+        runs = ScriptedRuns(streams=[first, second])
+        events = []
+        run = StreamingCompletion().run(make_client(runs), "thread_1", "asst_1", [], lambda required_action: [], on_event=lambda event: events.append(event.event))
+        self.assertEqual(run.status, "completed")
+        self.assertEqual(runs.count("retrieve"), 0)
+        self.assertTrue(runs.calls[1][1]["stream"])
+        self.assertEqual(events[-2:], ["thread.message.delta", "thread.run.completed"])
+
+    def test_falls_back_to_polling_when_stream_drops(self):
+        clock = FakeClock()
+        fallback = PollingCompletion(Backoff(jitter=0), sleep=clock.sleep, clock=clock)
+        runs = ScriptedRuns([make_run("completed")], streams=[[make_event("thread.run.in_progress", make_run("in_progress"))]])
+        run = StreamingCompletion(fallback).run(make_client(runs), "thread_1", "asst_1", [], on_action=None)
+        self.assertEqual(run.status, "completed")
+        self.assertEqual(runs.count("retrieve"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,9 @@
 from enum import Enum
+from typing import List
+from types import SimpleNamespace
 import unittest
 from pydantic import BaseModel
-from schema_generator import python_type_to_json_schema
+from schema_generator import generate_method_schema, generate_tool_schema, python_type_to_json_schema
 
 
 class MatchType(str, Enum):
@@ -81,5 +83,79 @@ class TestPythonTypeToJsonSchema(unittest.TestCase):
         self.assertEqual(schema, expected_schema)
 
 
+class TreeNode(BaseModel):
+    label: str
+    children: List["TreeNode"] = []
+
+
+class Department(BaseModel):
+    name: str
+    staff: List["Employee"]
+
+
+class Employee(BaseModel):
+    name: str
+    department: Department
+
+
+class Company(BaseModel):
+    root: TreeNode
+
+
+TreeNode.model_rebuild()
+Department.model_rebuild()
+
+
+def add_person(person: TestModel, age: int):
+    """Adds a person"""
+
+
+def plant(tree: TreeNode):
+    pass
+
+
+class TestSchemaCaching(unittest.TestCase):
+    def test_self_referencing_model_uses_defs(self):
+        schema = python_type_to_json_schema(TreeNode)
+        body = {"type": "object", "properties": {"label": {"type": "string"}, "children": {"type": "array", "items": {"$ref": "#/$defs/TreeNode"}}}, "required": ["label"]}
+        self.assertEqual(schema, {"$ref": "#/$defs/TreeNode", "$defs": {"TreeNode": body}})
+
+    def test_mutually_recursive_models_are_emitted_once(self):
+        schema = python_type_to_json_schema(Employee)
+        self.assertEqual(schema["$ref"], "#/$defs/Employee")
+        self.assertEqual(set(schema["$defs"]), {"Employee", "Department"})
+        self.assertEqual(schema["$defs"]["Department"]["properties"]["staff"]["items"], {"$ref": "#/$defs/Employee"})
+
+    def test_recursive_model_nested_in_plain_model(self):
+        schema = python_type_to_json_schema(Company)
+        self.assertEqual(schema["properties"]["root"], {"$ref": "#/$defs/TreeNode"})
+        self.assertIn("TreeNode", schema["$defs"])
+
+    def test_model_schemas_are_shared(self):
+        self.assertIs(python_type_to_json_schema(TestModel), python_type_to_json_schema(list[TestModel])["items"])
+
+    def test_method_schema_carries_defs(self):
+        schema = generate_method_schema("plant", SimpleNamespace(method=plant, annotations={}))
+        parameters = schema["function"]["parameters"]
+        self.assertEqual(parameters["properties"]["tree"], {"$ref": "#/$defs/TreeNode"})
+        self.assertIn("TreeNode", parameters["$defs"])
+
+    def test_tool_schema_only_rebuilds_changed_entries(self):
+        first = SimpleNamespace(method=add_person, annotations={})
+        second = SimpleNamespace(method=plant, annotations={})
+        registry = SimpleNamespace(methods={"add_person": first, "plant": second}, schema_cache={})
+        before = generate_tool_schema(registry)
+        self.assertEqual(before[0]["function"]["description"], "Adds a person")
+
+        registry.methods["plant"] = SimpleNamespace(method=plant, annotations={})
+        after = generate_tool_schema(registry)
+        self.assertIs(after[0], before[0])
+        self.assertIsNot(after[1], before[1])
+
+        del registry.methods["add_person"]
+        self.assertEqual(len(generate_tool_schema(registry)), 1)
+        self.assertEqual(list(registry.schema_cache), ["plant"])
+
+
 if __name__ == "__main__":
     unittest.main()
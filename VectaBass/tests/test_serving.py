@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import unittest
+
+from VectaBass.agents.base_manager import BaseManager
+from VectaBass.fake_openai import FakeAsyncOpenAI, FakeBackend, FakeOpenAI
+from VectaBass.pub_sub_manager import PubSub
+from VectaBass.run_completion import AsyncPollingCompletion, Backoff, PollingCompletion
+from VectaBass.serving import AsyncSessionServer, SessionServer
+
+
+class Support(BaseManager):
+    def lookup(self, key: str):
+        return key.upper()
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestSessionServer(unittest.TestCase):
+    def setUp(self):
+        self.backend = FakeBackend(run_duration=0.01)
+        self.manager = Support("support", client=FakeOpenAI(self.backend))
+        self.manager.assistant_manager.chat.strategy.completion = PollingCompletion(Backoff(initial=0.001, maximum=0.005, jitter=0))
+        self.clock = Clock()
+        self.server = SessionServer(self.manager, max_sessions=3, idle_timeout=60, clock=self.clock)
+
+    def listen(self, session_key):
+        replies = []
+        PubSub().subscribe(self.server.topic(session_key), replies.append)
+        return replies
+
+    def test_sessions_share_one_assistant_and_publish_on_their_own_topic(self):
+        alice, bob, manager = self.listen("alice"), self.listen("bob"), []
+        PubSub().subscribe(f"print_message_{self.manager.name}", manager.append)
+        self.server.send_message("alice", "hi from alice")
+        self.server.send_message("bob", "hi from bob")
+        self.assertEqual([reply.split("\n", 1)[1] for reply in alice], ["echo: hi from alice"])
+        self.assertEqual([reply.split("\n", 1)[1] for reply in bob], ["echo: hi from bob"])
+        self.assertEqual(manager, [])
+        self.assertEqual(self.backend.calls["assistants.create"], 1)
+        self.assertNotEqual(self.server.session("alice").thread.id, self.server.session("bob").thread.id)
+
+    def test_concurrent_sessions_never_overlap_runs_on_a_thread(self):
+        self.server.max_sessions = 100
+        keys = [f"user{index}" for index in range(8)]
+        replies = {key: self.listen(key) for key in keys}
+
+        def talk(key):
+            for turn in range(3):
+                self.server.send_message(key, f"{key} turn {turn}")
+
+        workers = [threading.Thread(target=talk, args=(key,)) for key in keys for _ in range(2)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        for key in keys:
+            self.server.session(key).queue.join()
+            self.assertEqual(len(replies[key]), 6)
+        self.assertEqual(self.backend.calls["threads.create"], 8)
+
+    def test_least_recently_used_idle_sessions_are_evicted_and_reattached(self):
+        for key in ("a", "b", "c"):
+            self.server.send_message(key, "hello")
+        thread_id = self.server.session("a").thread.id
+        self.server.send_message("d", "hello")
+        self.assertEqual(list(self.server.sessions), ["c", "a", "d"])
+        self.assertEqual(self.server.evicted, 1)
+
+        self.clock.now = 61
+        self.server.session("c")
+        self.assertEqual(list(self.server.sessions), ["c"])
+        # The thread outlives the local state
+        self.server.send_message("a", "back again")
+        self.assertEqual(self.server.session("a").thread.id, thread_id)
+
+    def test_closing_a_session_can_delete_its_thread(self):
+        self.server.send_message("a", "hello")
+        thread_id = self.server.session("a").thread.id
+        self.server.close_session("a", delete_thread=True)
+        self.assertNotIn("a", self.server)
+        self.assertNotIn(thread_id, self.backend.threads)
+        self.server.send_message("a", "hello again")
+        self.assertNotEqual(self.server.session("a").thread.id, thread_id)
+
+    def test_needs_an_assistants_manager(self):
+        with self.assertRaises(ValueError):
+            SessionServer(Support("completions", client=FakeOpenAI(self.backend), chat_api="chat_completions"))
+
+
+class TestAsyncSessionServer(unittest.TestCase):
+    def test_sessions_run_concurrently_and_in_order(self):
+        backend = FakeBackend(run_duration=0.01)
+        manager = Support("support", asynchronous=True, client=FakeAsyncOpenAI(backend))
+        manager.assistant_manager.chat.strategy.completion = AsyncPollingCompletion(Backoff(initial=0.001, maximum=0.005, jitter=0))
+        server = AsyncSessionServer(manager)
+
+        async def main():
+            sends = [server.send_message(f"user{index % 4}", f"turn {index}") for index in range(12)]
+            return await asyncio.gather(*sends)
+
+        replies = asyncio.run(main())
+        self.assertEqual(replies, [f"echo: turn {index}" for index in range(12)])
+        self.assertEqual(backend.calls["assistants.create"], 1)
+        self.assertEqual(backend.calls["threads.create"], 4)
+        self.assertEqual(len(server), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import json
+import os
+import tempfile
+import unittest
+import unittest.mock
+from types import SimpleNamespace
+
+from VectaBass.agents.base_manager import BaseManager
+from VectaBass.client_pool import LimitedClient, RateLimiter
+from VectaBass.fake_openai import FakeAPIError, FakeBackend, FakeOpenAI, ToolCallResponder
+from VectaBass.run_completion import Backoff, PollingCompletion
+from VectaBass.telemetry import JSONLinesSink, MemorySink, PrometheusSink, Telemetry, prometheus_text
+
+
+class Lookup(BaseManager):
+    def lookup(self, key: str):
+        return key.upper()
+
+
+class TestTelemetry(unittest.TestCase):
+    def setUp(self):
+        self.telemetry = Telemetry()
+        self.sink = self.telemetry.add_sink(MemorySink())
+
+    def test_spans_feed_histograms_and_sinks(self):
+        with self.telemetry.span("run.poll"):
+            pass
+        with self.assertRaises(KeyError):
+            with self.telemetry.span("tool.execute", tool="lookup"):
+                raise KeyError("missing")
+        self.assertEqual(self.telemetry.histogram("run.poll").count, 1)
+        self.assertEqual(self.telemetry.histogram("tool.execute", tool="lookup").count, 1)
+        failed = self.sink.named("tool.execute")[0]
+        self.assertEqual(failed["labels"], {"tool": "lookup"})
+        self.assertEqual(failed["error"], "KeyError: 'missing'")
+
+    def test_counters_and_prometheus_text(self):
+        self.telemetry.count("api.calls", endpoint="beta.threads.create")
+        self.telemetry.count("api.calls", 2, endpoint="beta.threads.create")
+        self.telemetry.observe("run.create", 0.003)
+        text = prometheus_text(self.telemetry.metrics())
+        self.assertIn("# TYPE vectabass_api_calls_total counter", text)
+        self.assertIn('vectabass_api_calls_total{endpoint="beta.threads.create"} 3', text)
+        self.assertIn('vectabass_run_create_seconds_bucket{le="0.0025"} 0', text)
+        self.assertIn('vectabass_run_create_seconds_bucket{le="0.005"} 1', text)
+        self.assertIn('vectabass_run_create_seconds_bucket{le="+Inf"} 1', text)
+        self.assertIn("vectabass_run_create_seconds_count 1", text)
+
+    def test_file_sinks(self):
+        with tempfile.TemporaryDirectory() as directory:
+            lines = self.telemetry.add_sink(JSONLinesSink(os.path.join(directory, "trace.jsonl")))
+            prometheus = self.telemetry.add_sink(PrometheusSink(os.path.join(directory, "metrics.prom")))
+            with self.telemetry.span("message.add"):
+                pass
+            self.telemetry.flush()
+            lines.close()
+            with open(lines.path) as f:
+                records = [json.loads(line) for line in f]
+            self.assertEqual([record["type"] for record in records], ["span", "metrics"])
+            with open(prometheus.path) as f:
+                self.assertEqual(f.read(), prometheus.text)
+            self.assertIn("vectabass_message_add_seconds_count 1", prometheus.text)
+
+    def test_disabled_telemetry_records_nothing(self):
+        self.telemetry.enabled = False
+        with self.telemetry.span("run.poll"):
+            self.telemetry.count("api.calls")
+        self.assertEqual(self.telemetry.metrics()["counters"], [])
+        self.assertEqual(list(self.sink.spans), [])
+
+
+class TestTurnInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.telemetry = Telemetry.shared()
+        self.sink = self.telemetry.add_sink(MemorySink())
+        self.addCleanup(self.telemetry.remove_sink, self.sink)
+
+    def test_every_phase_of_a_turn_is_timed(self):
+        backend = FakeBackend(responder=ToolCallResponder([("lookup", {"key": "a"})]))
+        manager = Lookup("lookup", client=FakeOpenAI(backend))
+        strategy = manager.assistant_manager.chat.strategy
+        strategy.completion = PollingCompletion(Backoff(initial=0.001, maximum=0.005, jitter=0))
+        waits = self.telemetry.histogram("queue.wait")
+        waited = waits.count if waits else 0
+
+        with self.assertLogs("VectaBass.tool_dispatch", "DEBUG") as logs:
+            strategy.send_message("look a up")
+        self.assertIn("lookup", logs.output[0])
+
+        names = {span["name"] for span in self.sink.spans}
+        self.assertLessEqual({"message.add", "run.create", "run.poll", "run.submit_tool_outputs", "messages.fetch", "tool.execute"}, names)
+        self.assertEqual(self.sink.named("tool.execute")[0]["labels"], {"tool": "Lookup.lookup"})
+        self.assertEqual(self.telemetry.histogram("queue.wait").count, waited + 1)
+
+    def test_api_calls_and_retries_are_counted_per_endpoint(self):
+        failures = [FakeAPIError("busy", status_code=503)]
+
+        def create(**kwargs):
+            if failures:
+                raise failures.pop()
+            return SimpleNamespace(id="thread_1")
+
+        target = SimpleNamespace(beta=SimpleNamespace(threads=SimpleNamespace(create=create)))
+        client = LimitedClient(target, RateLimiter())
+        calls = self.telemetry.counter("api.calls", endpoint="beta.threads.create")
+        retries = self.telemetry.counter("api.retries", endpoint="beta.threads.create", rate_limited=False)
+        with unittest.mock.patch("VectaBass.client_pool.retry_after", return_value=0.01):
+            self.assertEqual(client.beta.threads.create().id, "thread_1")
+        self.assertEqual(self.telemetry.counter("api.calls", endpoint="beta.threads.create"), calls + 2)
+        self.assertEqual(self.telemetry.counter("api.retries", endpoint="beta.threads.create", rate_limited=False), retries + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
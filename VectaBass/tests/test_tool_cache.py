@@ -0,0 +1,145 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+import unittest
+from enum import Enum
+from types import SimpleNamespace
+
+from pydantic import BaseModel
+
+from VectaBass.registry import Registry
+from VectaBass.stores import SQLiteStore
+from VectaBass.tool_cache import ToolCache, cached
+from VectaBass.tool_dispatch import ToolDispatcher
+
+
+class Shape(str, Enum):
+    SQUARE = "square"
+
+
+class Query(BaseModel):
+    text: str
+    tags: dict = {}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Lookup:
+    name = "lookup"
+    identifier = "lookup"
+
+    def __init__(self):
+        self.assistant_manager = SimpleNamespace(chat=SimpleNamespace(add_tool=lambda config, tools_to_remove: None))
+        self.calls = 0
+        self.registry = Registry(self)
+
+    @cached(maxsize=16)
+    def search(self, query: Query, shape: Shape = Shape.SQUARE, limit: int = 10):
+        self.calls += 1
+        time.sleep(0.05)
+        return f"{query.text}:{limit}"
+
+    @cached()
+    async def fetch(self, value: int):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return value
+
+    @cached()
+    def broken(self, value: int):
+        self.calls += 1
+        raise RuntimeError("lookup failed")
+
+
+def tool_call(call_id, name, **arguments):
+    return SimpleNamespace(id=call_id, function=SimpleNamespace(name=f"lookup_{name}", arguments=json.dumps(arguments)))
+
+
+class TestToolCache(unittest.TestCase):
+    def method(self, query, shape=Shape.SQUARE, limit=10):
+        return None
+
+    def test_keys_are_canonical(self):
+        cache = ToolCache("search")
+        first = cache.key(self.method, {"query": Query(text="a", tags={"x": 1, "y": 2})})
+        second = cache.key(self.method, {"query": Query(text="a", tags={"y": 2, "x": 1}), "shape": "square", "limit": 10})
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, cache.key(self.method, {"query": Query(text="b")}))
+
+    def test_lru_and_ttl(self):
+        clock = FakeClock()
+        cache = ToolCache("search", ttl=10, maxsize=2, clock=clock)
+        for value in ("a", "b", "a", "c"):
+            cache.call(self.method, {"query": value}, lambda value=value: value.upper())
+        # "b" was least recently used when "c" arrived
+        self.assertEqual(cache.stats()["evictions"], 1)
+        self.assertEqual(cache.call(self.method, {"query": "b"}, lambda: "fresh"), "fresh")
+        clock.now += 11
+        self.assertEqual(cache.call(self.method, {"query": "c"}, lambda: "expired"), "expired")
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_shared_store(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache.db")
+            first, second = ToolCache("search", store=SQLiteStore(path)), ToolCache("search", store=SQLiteStore(path))
+            first.call(self.method, {"query": "a"}, lambda: {"rows": [1, 2]})
+            self.assertEqual(second.call(self.method, {"query": "a"}, lambda: "recomputed"), {"rows": [1, 2]})
+            self.assertEqual(second.stats()["store_hits"], 1)
+            # Not JSON serialisable: cached locally only
+            first.call(self.method, {"query": "b"}, lambda: object)
+            self.assertEqual(second.call(self.method, {"query": "b"}, lambda: "local"), "local")
+            first.store.close()
+            second.store.close()
+
+
+class TestCachedTools(unittest.TestCase):
+    def setUp(self):
+        self.manager = Lookup()
+        self.dispatcher = ToolDispatcher(max_workers=8)
+        for name in ("search", "fetch", "broken"):
+            getattr(Lookup, name).__tool_cache__.clear()
+
+    def tearDown(self):
+        self.dispatcher.shutdown()
+
+    def test_registry_picks_up_the_cache(self):
+        self.assertIs(self.manager.registry.lookup("lookup_search").cache, Lookup.search.__tool_cache__)
+
+    def test_concurrent_identical_calls_run_once(self):
+        calls = [tool_call(f"call_{i}", "search", query={"text": "q"}) for i in range(5)] + [tool_call("call_5", "search", query={"text": "q"}, limit=10)]
+        outputs = self.dispatcher.dispatch(self.manager, calls)
+        self.assertEqual(self.manager.calls, 1)
+        self.assertTrue(all("q:10" in output["output"] for output in outputs))
+        self.dispatcher.dispatch(self.manager, calls[:1])
+        self.assertEqual(self.manager.calls, 1)
+        self.assertGreaterEqual(Lookup.search.__tool_cache__.stats()["hits"], 1)
+
+    def test_results_are_shared_between_managers(self):
+        self.dispatcher.dispatch(self.manager, [tool_call("call_1", "search", query={"text": "q"})])
+        other = Lookup()
+        self.dispatcher.dispatch(other, [tool_call("call_1", "search", query={"text": "q"})])
+        self.assertEqual(other.calls, 0)
+
+    def test_errors_are_not_cached(self):
+        for _ in range(2):
+            outputs = self.dispatcher.dispatch(self.manager, [tool_call("call_1", "broken", value=1)])
+            self.assertIn("lookup failed", outputs[0]["output"])
+        self.assertEqual(self.manager.calls, 2)
+
+    def test_async_dispatch(self):
+        calls = [tool_call(f"call_{i}", "fetch", value=3) for i in range(4)]
+        outputs = asyncio.run(self.dispatcher.adispatch(self.manager, calls))
+        self.assertEqual(self.manager.calls, 1)
+        self.assertTrue(all(output["output"] == '{"result":3}' for output in outputs))
+
+
+if __name__ == "__main__":
+    unittest.main()
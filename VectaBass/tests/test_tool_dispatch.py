@@ -0,0 +1,140 @@
+import asyncio
+import json
+import threading
+import time
+from types import SimpleNamespace
+import unittest
+from pydantic import BaseModel
+
+from VectaBass.agents.base_manager import BaseManager
+from VectaBass.fake_openai import FakeOpenAI
+from VectaBass.registry import Registry
+from VectaBass.tool_dispatch import ToolDispatcher, dispatch_options
+
+
+class Point(BaseModel):
+    x: int
+    y: int
+
+
+class ToolBox:
+    """Stands in for a BaseManager: just enough for the Registry to introspect."""
+
+    name = "box"
+    identifier = "box"
+
+    def __init__(self):
+        self.assistant_manager = SimpleNamespace(chat=SimpleNamespace(add_tool=lambda config, tools_to_remove: None))
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+        self.registry = Registry(self)
+
+    def slow(self, value: int):
+        time.sleep(0.2)
+        return value * 2
+
+    def norm(self, point: Point):
+        return abs(point.x) + abs(point.y)
+
+    @dispatch_options(timeout=0.05)
+    def hang(self):
+        time.sleep(0.5)
+        return "late"
+
+    @dispatch_options(max_concurrency=2)
+    def limited(self):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.05)
+        with self.lock:
+            self.active -= 1
+        return "ok"
+
+    async def fetch(self, value: int):
+        await asyncio.sleep(0.2)
+        return value
+
+
+class Crunch(BaseManager):
+    @dispatch_options(cpu_bound=True)
+    def square(self, value: int):
+        return value * value
+
+
+def tool_call(call_id, name, **arguments):
+    return SimpleNamespace(id=call_id, function=SimpleNamespace(name=f"box_{name}", arguments=json.dumps(arguments)))
+
+
+class TestToolDispatcher(unittest.TestCase):
+    def setUp(self):
+        self.box = ToolBox()
+        self.dispatcher = ToolDispatcher(max_workers=8)
+
+    def tearDown(self):
+        self.dispatcher.shutdown()
+
+    def test_registry_reads_dispatch_options(self):
+        self.assertEqual(self.box.registry.methods["box_hang"].options.timeout, 0.05)
+        self.assertEqual(self.box.registry.methods["box_limited"].options.max_concurrency, 2)
+        self.assertIsNone(self.box.registry.methods["box_slow"].options.timeout)
+
+    def test_sync_tools_run_in_parallel_and_keep_order(self):
+        calls = [tool_call(f"call_{i}", "slow", value=i) for i in range(5)]
+        started = time.monotonic()
+        outputs = self.dispatcher.dispatch(self.box, calls)
+        self.assertLess(time.monotonic() - started, 0.6)
+        self.assertEqual([output["tool_call_id"] for output in outputs], [f"call_{i}" for i in range(5)])
+        self.assertEqual([output["output"] for output in outputs], [f'{{"result":{i * 2}}}' for i in range(5)])
+
+    def test_models_and_unknown_tools(self):
+        outputs = self.dispatcher.dispatch(self.box, [tool_call("a", "norm", point={"x": -1, "y": 2}), tool_call("b", "missing")])
+        self.assertEqual(outputs[0]["output"], '{"result":3}')
+        self.assertIn("not found in any registry", outputs[1]["output"])
+
+    def test_per_call_timeout(self):
+        outputs = self.dispatcher.dispatch(self.box, [tool_call("a", "hang"), tool_call("b", "slow", value=1)])
+        self.assertIn("timed out", outputs[0]["output"])
+        self.assertEqual(outputs[1]["output"], '{"result":2}')
+
+    def test_timed_out_calls_do_not_hold_the_shared_pool(self):
+        dispatcher = ToolDispatcher(max_workers=1, timeout_workers=1)
+        self.addCleanup(dispatcher.shutdown)
+        self.assertIn("timed out", dispatcher.dispatch(self.box, [tool_call("a", "hang")])[0]["output"])
+        self.assertEqual(dispatcher.overrunning, 1)
+        started = time.monotonic()
+        outputs = dispatcher.dispatch(self.box, [tool_call("b", "norm", point={"x": 1, "y": 1}), tool_call("c", "norm", point={"x": 2, "y": 2})])
+        self.assertLess(time.monotonic() - started, 0.3)
+        self.assertEqual([output["output"] for output in outputs], ['{"result":2}', '{"result":4}'])
+        time.sleep(0.6)
+        self.assertEqual(dispatcher.overrunning, 0)
+
+    def test_cpu_bound_tools_of_a_manager_run_in_processes(self):
+        manager = Crunch("crunch", client=FakeOpenAI())
+        dispatcher = ToolDispatcher(process_workers=2)
+        self.addCleanup(dispatcher.shutdown)
+        calls = [SimpleNamespace(id=f"call_{i}", function=SimpleNamespace(name=f"{manager.name}_square", arguments=json.dumps({"value": i}))) for i in range(3)]
+        outputs = dispatcher.dispatch(manager, calls)
+        self.assertEqual([output["output"] for output in outputs], ['{"result":0}', '{"result":1}', '{"result":4}'])
+
+    def test_per_tool_concurrency_limit(self):
+        self.dispatcher.dispatch(self.box, [tool_call(f"call_{i}", "limited") for i in range(6)])
+        self.assertEqual(self.box.peak, 2)
+
+    def test_async_dispatch_awaits_coroutines_concurrently(self):
+        calls = [tool_call(f"call_{i}", "fetch", value=i) for i in range(5)] + [tool_call("sync", "slow", value=3)]
+        started = time.monotonic()
+        outputs = asyncio.run(self.dispatcher.adispatch(self.box, calls))
+        self.assertLess(time.monotonic() - started, 0.6)
+        self.assertEqual([output["output"] for output in outputs], [f'{{"result":{i}}}' for i in range(5)] + ['{"result":6}'])
+
+    def test_async_dispatch_timeout_and_limit(self):
+        calls = [tool_call("a", "hang")] + [tool_call(f"call_{i}", "limited") for i in range(4)]
+        outputs = asyncio.run(self.dispatcher.adispatch(self.box, calls))
+        self.assertIn("timed out", outputs[0]["output"])
+        self.assertEqual(self.box.peak, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import array
+import dataclasses
+import datetime
+import json
+import os
+import tempfile
+import unittest
+from enum import Enum
+from types import SimpleNamespace
+
+from pydantic import BaseModel
+
+from VectaBass.tool_dispatch import DispatchOptions
+from VectaBass.tool_output import ToolOutputEncoder, ToolOutputPager, jsonable
+
+
+class Status(Enum):
+    OPEN = "open"
+
+
+class Ticket(BaseModel):
+    id: int
+    status: Status
+
+
+@dataclasses.dataclass
+class Row:
+    name: str
+    tags: set
+
+
+def invocation(output, call_id="call_1", max_output_bytes=None):
+    return SimpleNamespace(tool_call=SimpleNamespace(id=call_id), output=output, options=DispatchOptions(max_output_bytes=max_output_bytes))
+
+
+class TestToolOutputEncoder(unittest.TestCase):
+    def test_native_types_become_compact_json(self):
+        value = {
+            "ticket": Ticket(id=1, status=Status.OPEN),
+            "row": Row("a", {"y", "x"}),
+            "when": datetime.date(2024, 1, 2),
+            "raw": b"\xff\x00",
+            "text": b"plain",
+            "array": array.array("i", [1, 2]),
+        }
+        self.assertEqual(
+            jsonable(value),
+            {
+                "ticket": {"id": 1, "status": "open"},
+                "row": {"name": "a", "tags": ["x", "y"]},
+                "when": "2024-01-02",
+                "raw": {"base64": "/wA="},
+                "text": "plain",
+                "array": [1, 2],
+            },
+        )
+        output = ToolOutputEncoder().encode_run([invocation({"result": [1, 2]})])[0]["output"]
+        self.assertEqual(output, '{"result":[1,2]}')
+
+    def test_oversized_list_is_truncated_with_a_handle(self):
+        encoder = ToolOutputEncoder(max_bytes=1000)
+        rows = [{"id": i, "name": f"row {i}"} for i in range(500)]
+        output = encoder.encode_run([invocation({"result": rows})])[0]["output"]
+        self.assertLessEqual(len(output.encode()), 1000)
+        decoded = json.loads(output)
+        self.assertTrue(decoded["truncated"])
+        self.assertEqual(decoded["result"][0], rows[0])
+        self.assertRegex(decoded["result"][-1], r"more items")
+
+        shown = len(decoded["result"]) - 1
+        page = encoder.page(decoded["handle"], offset=shown)
+        self.assertEqual(page["result"][0], rows[shown])
+        self.assertEqual(page["offset"], shown)
+
+        # Walking the pages returns every row exactly once
+        collected, offset = rows[:shown], shown
+        while offset is not None:
+            page = encoder.page(decoded["handle"], offset)
+            collected.extend(page["result"])
+            offset = page["next_offset"]
+        self.assertEqual(collected, rows)
+
+    def test_per_tool_budget_and_long_strings(self):
+        encoder = ToolOutputEncoder(max_bytes=10_000)
+        output = encoder.encode_run([invocation({"result": "x" * 5000}, max_output_bytes=500)])[0]["output"]
+        self.assertLessEqual(len(output), 500)
+        self.assertIn("more bytes", json.loads(output)["result"])
+
+    def test_run_budget_is_shared(self):
+        encoder = ToolOutputEncoder(max_bytes=10_000, run_max_tokens=750)
+        outputs = encoder.encode_run([invocation({"result": "small"}, "a"), invocation({"result": "y" * 8000}, "b"), invocation({"result": "z" * 8000}, "c")])
+        self.assertEqual(outputs[0]["output"], '{"result":"small"}')
+        self.assertLessEqual(sum(len(output["output"]) for output in outputs), 3000)
+        self.assertTrue(all(json.loads(output["output"])["truncated"] for output in outputs[1:]))
+
+    def test_spill_to_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            encoder = ToolOutputEncoder(max_bytes=400, spill_dir=directory)
+            rows = list(range(1000))
+            decoded = json.loads(encoder.encode_run([invocation({"result": rows})])[0]["output"])
+            with open(decoded["spilled_to"], encoding="utf-8") as f:
+                self.assertEqual(json.load(f), {"result": rows})
+            self.assertEqual(os.path.dirname(decoded["spilled_to"]), directory)
+
+    def test_spill_path_counts_against_the_budget(self):
+        with tempfile.TemporaryDirectory() as directory:
+            encoder = ToolOutputEncoder(max_bytes=400, spill_dir=os.path.join(directory, "spilled" * 20))
+            output = encoder.encode_run([invocation({"result": "x" * 5000})])[0]["output"]
+            self.assertLessEqual(len(output.encode()), 400)
+            self.assertIn("spilled_to", json.loads(output))
+
+    def test_pager_mixin(self):
+        encoder = ToolOutputEncoder(max_bytes=300)
+        manager = ToolOutputPager()
+        manager.assistant_manager = SimpleNamespace(chat=SimpleNamespace(strategy=SimpleNamespace(dispatcher=SimpleNamespace(encoder=encoder))))
+        handle = json.loads(encoder.encode_run([invocation({"result": "abc" * 200})], owner=manager)[0]["output"])["handle"]
+        self.assertTrue(manager.read_tool_output(handle, 3)["result"].startswith("abc"))
+        self.assertIn("error", manager.read_tool_output("missing"))
+
+    def test_pages_are_kept_per_owner(self):
+        encoder = ToolOutputEncoder(max_bytes=300, keep_pages=2)
+        chatty, quiet = ToolOutputPager(), ToolOutputPager()
+        handle = json.loads(encoder.encode({"result": "q" * 1000}, owner=quiet))["handle"]
+        for _ in range(5):
+            encoder.encode({"result": "c" * 1000}, owner=chatty)
+        self.assertTrue(encoder.page(handle, owner=quiet)["result"].startswith("q"))
+        self.assertIn("error", encoder.page(handle, owner=chatty))
+        encoder.forget(quiet)
+        self.assertIn("error", encoder.page(handle, owner=quiet))
+
+
+if __name__ == "__main__":
+    unittest.main()
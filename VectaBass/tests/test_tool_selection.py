@@ -0,0 +1,122 @@
+import unittest
+
+from VectaBass.agents.base_manager import BaseManager
+from VectaBass.fake_openai import FakeBackend, FakeOpenAI
+from VectaBass.run_completion import Backoff, PollingCompletion
+from VectaBass.tool_selection import ToolSelector, pin_tool, tokenize
+
+
+def tool(name, description="", **properties):
+    parameters = {"type": "object", "properties": {key: {"type": kind} for key, kind in properties.items()}, "required": []}
+    return {"type": "function", "function": {"name": name, "description": description, "parameters": parameters}}
+
+
+TOOLS = [
+    tool("shop_get_order", "Look an order up by its number.", order_id="string"),
+    tool("shop_cancel_order", "Cancel an order that has not shipped.", order_id="string", reason="string"),
+    tool("shop_track_parcel", "Where a parcel is right now.", tracking_number="string"),
+    tool("shop_refund", "Refund a payment.", payment_id="string", amount="number"),
+    tool("shop_weather", "Forecast for a city.", city="string"),
+    tool("shop_help", "What the assistant can do."),
+]
+
+
+class Shop(BaseManager):
+    tool_selector = ToolSelector(top_k=1)
+
+    def get_order(self, order_id: str):
+        """Look an order up by its number."""
+        return order_id
+
+    def track_parcel(self, tracking_number: str):
+        """Where a parcel is right now."""
+        return tracking_number
+
+    def refund(self, payment_id: str, amount: float):
+        """Refund a payment."""
+        return amount
+
+    @pin_tool
+    def handoff(self, reason: str):
+        """Pass the conversation to a human."""
+        return reason
+
+
+class TestToolSelector(unittest.TestCase):
+    def names(self, tools):
+        return [tool["function"]["name"] for tool in tools]
+
+    def test_tokenize_splits_identifiers_and_folds_plurals(self):
+        self.assertEqual(tokenize("getOrders for tracking_number 42"), ["get", "order", "for", "tracking", "number", "42"])
+
+    def test_top_matches_are_kept_in_their_original_order(self):
+        selector = ToolSelector(top_k=2)
+        self.assertEqual(self.names(selector.select("cancel my orders please", TOOLS)), ["shop_get_order", "shop_cancel_order"])
+        self.assertEqual(self.names(selector.select("where is parcel ABC?", TOOLS)), ["shop_track_parcel"])
+
+    def test_pinned_tools_are_always_sent(self):
+        selector = ToolSelector(top_k=1, pinned=["help"])
+        self.assertEqual(self.names(selector.select("refund me", TOOLS)), ["shop_refund", "shop_help"])
+
+    def test_no_match_or_few_tools_send_everything(self):
+        selector = ToolSelector(top_k=2)
+        self.assertEqual(selector.select("hello there", TOOLS), TOOLS)
+        self.assertEqual(ToolSelector(top_k=10).select("refund", TOOLS), TOOLS)
+
+    def test_embeddings_can_replace_keywords(self):
+        vocabulary = ["money", "weather"]
+
+        def embed(texts):
+            # Stand-in for a local embedding model
+            synonyms = {"money": ("refund", "payment", "cash"), "weather": ("forecast", "rain", "city")}
+            return [[sum(text.lower().count(word) for word in synonyms[axis]) for axis in vocabulary] for text in texts]
+
+        selector = ToolSelector(top_k=1, embed=embed)
+        self.assertEqual(self.names(selector.select("will it rain?", TOOLS)), ["shop_weather"])
+        self.assertEqual(self.names(selector.select("I want my cash back", TOOLS)), ["shop_refund"])
+
+    def test_index_is_built_once_per_tool_list(self):
+        selector = ToolSelector(top_k=1)
+        selector.select("refund", TOOLS)
+        index = selector.index(TOOLS)[0]
+        selector.select("parcel", list(TOOLS))
+        self.assertIs(selector.index(TOOLS)[0], index)
+        self.assertIsNot(selector.index(TOOLS[:-1])[0], index)
+
+    def test_instances_share_one_index(self):
+        def instance_tools(index):
+            prefix = f"shop_{index:032x}"
+            return [tool(f"{prefix}_refund", "Refund a payment."), tool(f"{prefix}_track_parcel", "Where a parcel is."), tool(f"{prefix}_help", "What I can do.")]
+
+        selector = ToolSelector(top_k=1, cache_size=2)
+        chosen = [self.names(selector.select("refund it", instance_tools(index))) for index in range(20)]
+        self.assertEqual(chosen, [[f"shop_{index:032x}_refund"] for index in range(20)])
+        self.assertEqual(len(selector._indexes), 1)
+
+    def test_instances_with_explicit_identifiers_share_one_index(self):
+        selector = ToolSelector(top_k=1, cache_size=2)
+        client = FakeOpenAI(FakeBackend())
+        for identifier in ("STATIC", "eu_west", "refund"):
+            manager = Shop("shop", identifier=identifier, client=client)
+            self.addCleanup(manager.close)
+            tools = manager.registry.generate_json_schema()
+            chosen = self.names(selector.select("where is my parcel?", tools, manager.registry))
+            self.assertEqual(sorted(chosen), [f"{manager.name}_handoff", f"{manager.name}_track_parcel"])
+        self.assertEqual(len(selector._indexes), 1)
+
+
+class TestRunTools(unittest.TestCase):
+    def test_runs_carry_the_selected_and_pinned_tools_only(self):
+        backend = FakeBackend()
+        manager = Shop("shop", client=FakeOpenAI(backend))
+        strategy = manager.assistant_manager.chat.strategy
+        strategy.completion = PollingCompletion(Backoff(initial=0.001, maximum=0.005, jitter=0))
+        strategy.send_message("where is my parcel?")
+        run = next(iter(backend.runs.values()))
+        names = [tool.function.name[len(manager.name) + 1 :] for tool in run.tools]
+        self.assertEqual(sorted(names), ["handoff", "track_parcel"])
+        self.assertEqual(len(strategy.assistant.tools), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+# thread_pool.py
+import logging
+import threading
+from collections import deque
+
+from .client_pool import ClientPool
+
+logger = logging.getLogger(__name__)
+
+
+class WarmThreadPool:
+    """Keeps `size` empty conversation threads created ahead of time, so starting a conversation costs no round trip.
+
+    `take()` hands out a pre-created thread (or None when the pool is empty) and tops the pool up on a
+    background thread. It only ever blocks on its own lock, so async strategies can use it as well.
+    Strategies created without a pool use the one set up by `WarmThreadPool.install()`, if any.
+    """
+
+    installed = None
+
+    def __init__(self, client=None, size=4, prefill=True):
+        self.client = client or ClientPool.shared().client(key="thread-pool")
+        self.size = size
+        self.threads = deque()
+        self.lock = threading.Lock()
+        self.refilling = False
+        self.closed = False
+        if prefill:
+            self._refill_soon()
+
+    @classmethod
+    def install(cls, size=4, client=None):
+        """Create the process-wide pool used by every strategy that is not given one."""
+        if cls.installed is not None:
+            cls.installed.close()
+        cls.installed = cls(client=client, size=size)
+        return cls.installed
+
+    def __len__(self):
+        return len(self.threads)
+
+    def take(self):
+        with self.lock:
+            thread = self.threads.popleft() if self.threads else None
+        self._refill_soon()
+        return thread
+
+    def acquire(self):
+        """A pre-created thread if one is ready, otherwise a new one created on the spot."""
+        return self.take() or self.client.beta.threads.create()
+
+    def refill(self):
+        while not self.closed and len(self.threads) < self.size:
+            try:
+                thread = self.client.beta.threads.create()
+            except Exception as e:
+                logger.error("An error occurred while pre-creating a thread: %s", e)
+                return
+            with self.lock:
+                self.threads.append(thread)
+
+    def close(self, delete=False):
+        """Stop refilling; with `delete=True` the threads that were never handed out are deleted."""
+        self.closed = True
+        with self.lock:
+            threads, self.threads = list(self.threads), deque()
+        if delete:
+            for thread in threads:
+                self.client.beta.threads.delete(thread.id)
+
+    def _refill_soon(self):
+        with self.lock:
+            if self.refilling or self.closed or len(self.threads) >= self.size:
+                return
+            self.refilling = True
+        threading.Thread(target=self._refill, name="thread-pool-refill", daemon=True).start()
+
+    def _refill(self):
+        try:
+            self.refill()
+        finally:
+            with self.lock:
+                self.refilling = False
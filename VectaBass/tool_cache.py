@@ -0,0 +1,223 @@
+# tool_cache.py
+"""
+Memoisation for pure tool methods.
+
+    class Lookup(BaseManager):
+        @cached(ttl=300, maxsize=1024)
+        def find_customer(self, query: CustomerQuery):
+            ...
+
+The decorator attaches a ToolCache to the function; the Registry puts it on the RegistryEntry and the
+ToolDispatcher answers repeated calls from it. Keys are the canonical JSON of the call's arguments with
+defaults applied, so pydantic models, enums and dict ordering do not matter. Results are shared by
+every manager exposing the method unless `per_instance=True`.
+
+Entries live in an in-memory LRU bounded by `maxsize` and expire after `ttl` seconds. An optional store
+(see stores.py, e.g. SQLiteStore) is consulted on a local miss and written on every fill, so several
+processes can share results; only JSON serialisable results are written to it. Concurrent identical
+calls are deduplicated: one runs, the others wait for its result. Exceptions are never cached.
+"""
+import asyncio
+import hashlib
+import inspect
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from enum import Enum
+
+from pydantic import BaseModel
+
+from .telemetry import count
+
+
+def cached(ttl=None, maxsize=128, store=None, per_instance=False):
+    """Cache a manager method's results by arguments. The Registry picks the cache up when the method is registered."""
+
+    def decorator(method):
+        method.__tool_cache__ = ToolCache(method.__qualname__, ttl=ttl, maxsize=maxsize, store=store, per_instance=per_instance)
+        return method
+
+    return decorator
+
+
+def get_tool_cache(method):
+    return getattr(method, "__tool_cache__", None)
+
+
+def canonical(value):
+    if isinstance(value, BaseModel):
+        return {"__model__": type(value).__qualname__, "fields": canonical(value.model_dump(mode="json"))}
+    if isinstance(value, Enum):
+        return canonical(value.value)
+    if isinstance(value, dict):
+        return {str(key): canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [canonical(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted((canonical(item) for item in value), key=repr)
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return repr(value)
+
+
+class ToolCache:
+    def __init__(self, name, ttl=None, maxsize=128, store=None, per_instance=False, clock=time.time):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.store = store
+        self.per_instance = per_instance
+        self.clock = clock
+        self.lock = threading.Lock()
+        # key -> (expires at or None, value), least recently used first
+        self.entries = OrderedDict()
+        self.inflight = {}
+        self.signatures = {}
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.store_hits = 0
+        self.evictions = 0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared": self.shared,
+            "store_hits": self.store_hits,
+            "evictions": self.evictions,
+            "size": len(self.entries),
+        }
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def key(self, method, arguments):
+        func = getattr(method, "__func__", method)
+        signature = self.signatures.get(func)
+        if signature is None:
+            signature = self.signatures[func] = inspect.signature(method)
+        try:
+            bound = signature.bind_partial(**arguments)
+            bound.apply_defaults()
+            arguments = bound.arguments
+        except TypeError:
+            pass
+        scope = [self.name]
+        if self.per_instance:
+            owner = getattr(method, "__self__", None)
+            scope.append(getattr(owner, "name", id(owner)))
+        payload = json.dumps([scope, canonical(arguments)], sort_keys=True, separators=(",", ":"), default=repr)
+        return f"{self.name}:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+    def call(self, method, arguments, compute):
+        """Cached result of `compute()` for these arguments, computing it at most once at a time."""
+        key = self.key(method, arguments)
+        with self.lock:
+            found, value = self._lookup(key)
+            if found:
+                return value
+            future = self.inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self.inflight[key] = Future()
+                self.misses += 1
+                count("tool_cache.misses", cache=self.name)
+            else:
+                self.shared += 1
+        if not owner:
+            return future.result()
+
+        try:
+            found, value, expires = self._load(key)
+            if not found:
+                value = compute()
+                expires = None if self.ttl is None else self.clock() + self.ttl
+            self._fill(key, value, expires, persist=not found)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+
+    async def acall(self, method, arguments, compute):
+        """Async counterpart of `call`; `compute` returns an awaitable."""
+        key = self.key(method, arguments)
+        with self.lock:
+            found, value = self._lookup(key)
+            if found:
+                return value
+            future = self.inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self.inflight[key] = Future()
+                self.misses += 1
+                count("tool_cache.misses", cache=self.name)
+            else:
+                self.shared += 1
+        if not owner:
+            return await asyncio.wrap_future(future)
+
+        try:
+            found, value, expires = self._load(key)
+            if not found:
+                value = await compute()
+                expires = None if self.ttl is None else self.clock() + self.ttl
+            self._fill(key, value, expires, persist=not found)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+
+    def _lookup(self, key):
+        # Called with the lock held
+        entry = self.entries.get(key)
+        if entry is None:
+            return False, None
+        expires, value = entry
+        if expires is not None and expires <= self.clock():
+            del self.entries[key]
+            return False, None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        count("tool_cache.hits", cache=self.name)
+        return True, value
+
+    def _load(self, key):
+        if self.store is None:
+            return False, None, None
+        record = self.store.get(key)
+        if record is None:
+            return False, None, None
+        if record["expires"] is not None and record["expires"] <= self.clock():
+            self.store.delete(key)
+            return False, None, None
+        with self.lock:
+            self.store_hits += 1
+        count("tool_cache.hits", cache=self.name, source="store")
+        return True, record["value"], record["expires"]
+
+    def _fill(self, key, value, expires, persist=True):
+        with self.lock:
+            self.entries[key] = (expires, value)
+            self.entries.move_to_end(key)
+            while self.maxsize and len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        if persist and self.store is not None:
+            try:
+                json.dumps(value)
+            except (TypeError, ValueError):
+                # Not JSON serialisable, keep it in this process only
+                return
+            self.store.set(key, {"expires": expires, "value": value})
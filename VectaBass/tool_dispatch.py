@@ -0,0 +1,285 @@
+# tool_dispatch.py
+import asyncio
+import inspect
+import logging
+import threading
+import time
+import weakref
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import nullcontext
+from typing import Optional
+
+from pydantic import BaseModel
+from .pub_sub_manager import PubSub
+from .telemetry import count, span
+from .tool_output import ToolOutputEncoder
+
+logger = logging.getLogger(__name__)
+
+
+class DispatchOptions(BaseModel):
+    max_concurrency: Optional[int] = None
+    timeout: Optional[float] = None
+    cpu_bound: bool = False
+    max_output_bytes: Optional[int] = None
+
+
+def dispatch_options(max_concurrency=None, timeout=None, cpu_bound=False, max_output_bytes=None):
+    """Declare per-tool dispatch limits on a manager method. The Registry stores them on the RegistryEntry."""
+
+    def decorator(method):
+        method.__dispatch_options__ = DispatchOptions(max_concurrency=max_concurrency, timeout=timeout, cpu_bound=cpu_bound, max_output_bytes=max_output_bytes)
+        return method
+
+    return decorator
+
+
+def get_dispatch_options(method):
+    return getattr(method, "__dispatch_options__", None) or DispatchOptions()
+
+
+class ToolInvocation:
+    def __init__(self, tool_call, method=None, method_args=None, options=None, output=None, cache=None):
+        self.tool_call = tool_call
+        self.method = method
+        self.method_args = method_args
+        self.options = options or DispatchOptions()
+        self.output = output
+        self.cache = cache
+
+
+def tool_label(method):
+    # "Class.method": bounded by the code, unlike the identifier which carries each manager's uuid
+    method = getattr(method, "__func__", method)
+    return getattr(method, "__qualname__", None) or getattr(method, "__name__", repr(method))
+
+
+def run_detached(function, arguments):
+    # Runs in a worker process, with no manager to bind to
+    return function(None, **arguments)
+
+
+def resolve_tool_call(manager, tool_call):
+    """Find the registered method for a tool call and bind its arguments with the entry's precompiled binder."""
+    func_identifier = tool_call.function.name
+    method_details = manager.registry.lookup(func_identifier)
+    logger.debug("Calling %s with %s", func_identifier, tool_call.function.arguments)
+    if not method_details:
+        return ToolInvocation(tool_call, output={"error": f"Method identifier {func_identifier} not found in any registry."})
+
+    try:
+        method_args = method_details.binder.bind(tool_call.function.arguments)
+    except Exception as e:
+        logger.error("Error processing %s: %s", func_identifier, e)
+        count("tool.errors", tool=tool_label(method_details.method))
+        return ToolInvocation(tool_call, output={"error": str(e)})
+
+    return ToolInvocation(tool_call, method_details.method, method_args, method_details.options, cache=method_details.cache)
+
+
+class ToolDispatcher:
+    """Runs the tool calls of one run concurrently while keeping outputs in tool call order.
+
+    Sync methods run on a bounded thread pool, `async def` methods are awaited concurrently and
+    `cpu_bound` tools go to a process pool when `process_workers` is set. Only the function and its
+    arguments are sent there, never the manager (its locks and weak references cannot be pickled):
+    a cpu_bound method gets `self=None` and must work from its arguments alone.
+    Results are turned into outputs by the ToolOutputEncoder, which keeps them within budget.
+
+    A thread cannot be stopped, so a sync call that times out keeps running until it returns. Calls
+    with a timeout therefore run on their own pool of `timeout_workers` threads, where a hung tool
+    can only hold up other tools with a timeout, never the rest of the swarm's tools. `overrunning`
+    counts the calls still running past their timeout.
+    """
+
+    _shared = None
+
+    def __init__(self, max_workers=None, process_workers=0, default_timeout=None, encoder=None, timeout_workers=None):
+        self.max_workers = max_workers
+        self.timeout_workers = timeout_workers
+        self.process_workers = process_workers
+        self.default_timeout = default_timeout
+        self.encoder = encoder or ToolOutputEncoder()
+        self.pubsub = PubSub()
+        self._thread_pool = None
+        self._timeout_pool = None
+        self._process_pool = None
+        self._overrunning = 0
+        self._overrun_lock = threading.Lock()
+        self._pool_lock = threading.Lock()
+        self._limits = {}
+        self._async_limits = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def shared(cls):
+        """Process-wide dispatcher, so all agents share one bounded pool."""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def dispatch(self, manager, tool_calls):
+        invocations = [resolve_tool_call(manager, tool_call) for tool_call in tool_calls]
+        pending = [invocation for invocation in invocations if invocation.method is not None]
+
+        if len(pending) == 1 and self._timeout(pending[0]) is None:
+            # Nothing to overlap with, skip the pool hand-off
+            self._capture(pending[0], lambda: self._run_limited(pending[0]))
+        else:
+            started = time.monotonic()
+            futures = [(invocation, self._threads_for(invocation).submit(self._run_limited, invocation)) for invocation in pending]
+            for invocation, future in futures:
+                timeout = self._timeout(invocation)
+                remaining = None if timeout is None else max(0.0, started + timeout - time.monotonic())
+                self._capture(invocation, lambda: future.result(timeout=remaining), future)
+
+        return self.encoder.encode_run(invocations, owner=manager)
+
+    async def adispatch(self, manager, tool_calls):
+        invocations = [resolve_tool_call(manager, tool_call) for tool_call in tool_calls]
+        pending = [invocation for invocation in invocations if invocation.method is not None]
+        results = await asyncio.gather(*(self._ainvoke(invocation) for invocation in pending), return_exceptions=True)
+        for invocation, result in zip(pending, results):
+            if isinstance(result, asyncio.TimeoutError):
+                invocation.output = self._timeout_error(invocation)
+            elif isinstance(result, Exception):
+                invocation.output = {"error": str(result)}
+                self._failed(invocation, result)
+            else:
+                invocation.output = {"result": result}
+        return self.encoder.encode_run(invocations, owner=manager)
+
+    @property
+    def overrunning(self):
+        """Sync calls that timed out but are still holding a thread."""
+        return self._overrunning
+
+    def shutdown(self, wait=True):
+        with self._pool_lock:
+            for pool in (self._thread_pool, self._timeout_pool, self._process_pool):
+                if pool is not None:
+                    pool.shutdown(wait=wait)
+            self._thread_pool = None
+            self._timeout_pool = None
+            self._process_pool = None
+
+    def _capture(self, invocation, get_result, future=None):
+        try:
+            invocation.output = {"result": get_result()}
+        except FutureTimeoutError:
+            invocation.output = self._timeout_error(invocation)
+            self._overran(invocation, future)
+        except Exception as e:
+            invocation.output = {"error": str(e)}
+            self._failed(invocation, e)
+
+    def _failed(self, invocation, error):
+        logger.error("Error processing %s: %s", invocation.tool_call.function.name, error)
+        count("tool.errors", tool=tool_label(invocation.method))
+
+    def _timeout(self, invocation):
+        return invocation.options.timeout if invocation.options.timeout is not None else self.default_timeout
+
+    def _timeout_error(self, invocation):
+        return {"error": f"Tool {invocation.tool_call.function.name} timed out after {self._timeout(invocation)}s."}
+
+    def _overran(self, invocation, future):
+        # The call goes on in its thread, count it until it returns
+        if future is None or future.done():
+            return
+        with self._overrun_lock:
+            self._overrunning += 1
+        logger.warning("Tool %s timed out and is still running, %s call(s) past their timeout", invocation.tool_call.function.name, self._overrunning)
+        future.add_done_callback(self._overrun_done)
+
+    def _overrun_done(self, future):
+        # Not the pool lock, shutdown holds it while waiting for this very thread
+        with self._overrun_lock:
+            self._overrunning -= 1
+
+    def _run_limited(self, invocation):
+        # Cache hits and calls joining an identical one in flight skip the concurrency limit
+        if invocation.cache is not None:
+            return invocation.cache.call(invocation.method, invocation.method_args, lambda: self._run_uncached(invocation))
+        return self._run_uncached(invocation)
+
+    def _run_uncached(self, invocation):
+        with self._limit(invocation), span("tool.execute", tool=tool_label(invocation.method)):
+            self.pubsub.publish(f"system_function_call", invocation.method.__name__)
+            return self._call(invocation)
+
+    async def _ainvoke(self, invocation):
+        if invocation.cache is not None:
+            return await invocation.cache.acall(invocation.method, invocation.method_args, lambda: self._ainvoke_uncached(invocation))
+        return await self._ainvoke_uncached(invocation)
+
+    async def _ainvoke_uncached(self, invocation):
+        async with self._async_limit(invocation):
+            future = None
+            if inspect.iscoroutinefunction(invocation.method):
+                self.pubsub.publish(f"system_function_call", invocation.method.__name__)
+                call = invocation.method(**invocation.method_args)
+            else:
+                future = self._threads_for(invocation).submit(self._run_unlimited, invocation)
+                call = asyncio.wrap_future(future)
+            with span("tool.execute", tool=tool_label(invocation.method)):
+                try:
+                    return await asyncio.wait_for(call, self._timeout(invocation))
+                except asyncio.TimeoutError:
+                    self._overran(invocation, future)
+                    raise
+
+    def _run_unlimited(self, invocation):
+        self.pubsub.publish(f"system_function_call", invocation.method.__name__)
+        return self._call(invocation)
+
+    def _call(self, invocation):
+        if invocation.options.cpu_bound and self.process_workers:
+            method = invocation.method
+            if inspect.ismethod(method):
+                return self._processes().submit(run_detached, method.__func__, invocation.method_args).result()
+            return self._processes().submit(method, **invocation.method_args).result()
+        if inspect.iscoroutinefunction(invocation.method):
+            return asyncio.run(invocation.method(**invocation.method_args))
+        return invocation.method(**invocation.method_args)
+
+    def _limit_key(self, invocation):
+        # Limits are per tool, shared by every manager instance exposing it
+        return getattr(invocation.method, "__func__", invocation.method)
+
+    def _limit(self, invocation):
+        if not invocation.options.max_concurrency:
+            return nullcontext()
+        key = self._limit_key(invocation)
+        with self._pool_lock:
+            if key not in self._limits:
+                self._limits[key] = threading.BoundedSemaphore(invocation.options.max_concurrency)
+            return self._limits[key]
+
+    def _async_limit(self, invocation):
+        if not invocation.options.max_concurrency:
+            return nullcontext()
+        limits = self._async_limits.setdefault(asyncio.get_running_loop(), {})
+        key = self._limit_key(invocation)
+        if key not in limits:
+            limits[key] = asyncio.Semaphore(invocation.options.max_concurrency)
+        return limits[key]
+
+    def _threads(self):
+        with self._pool_lock:
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="vectabass-tool")
+            return self._thread_pool
+
+    def _threads_for(self, invocation):
+        if self._timeout(invocation) is None:
+            return self._threads()
+        with self._pool_lock:
+            if self._timeout_pool is None:
+                self._timeout_pool = ThreadPoolExecutor(max_workers=self.timeout_workers, thread_name_prefix="vectabass-tool-timed")
+            return self._timeout_pool
+
+    def _processes(self):
+        with self._pool_lock:
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(max_workers=self.process_workers)
+            return self._process_pool
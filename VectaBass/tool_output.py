@@ -0,0 +1,222 @@
+# tool_output.py
+"""
+Encodes tool results into the `output` strings submitted back to a run.
+
+Outputs are compact JSON: pydantic models, enums, dataclasses, sets, dates, bytes and array-likes
+(anything with `tolist()`) are converted natively instead of going through repr. Each output is held
+to a byte budget (the tool's `max_output_bytes`, else the encoder's `max_bytes`) and all outputs of
+one run share `run_max_bytes`; token budgets are converted at about four bytes per token.
+
+An output over budget is either spilled to a JSON file under `spill_dir` with a preview of it in the
+output, or truncated: lists keep their leading items, strings their beginning, dicts their first keys.
+Either way the output says so, and carries a handle that `page(handle, offset)` (exposed to the
+model through ToolOutputPager) can read the rest with. Pages belong to the manager whose tools made
+them: each manager keeps its own `keep_pages` latest, and cannot read another manager's handles.
+"""
+import base64
+import dataclasses
+import datetime
+import json
+import os
+import threading
+import uuid
+import weakref
+from collections import OrderedDict
+from enum import Enum
+
+from pydantic import BaseModel
+
+BYTES_PER_TOKEN = 4
+# Room for the envelope around a truncated value
+ENVELOPE_BYTES = 160
+
+
+class _Unscoped:
+    # Page owner for outputs encoded without a manager
+    pass
+
+
+_UNSCOPED = _Unscoped()
+
+
+def jsonable(value):
+    """Plain JSON data (dicts, lists, str, numbers, bool, None) for a tool result."""
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, Enum):
+        return jsonable(value.value)
+    if isinstance(value, dict):
+        return {str(key): jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [jsonable(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted((jsonable(item) for item in value), key=repr)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return jsonable(dataclasses.asdict(value))
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        data = bytes(value)
+        try:
+            return data.decode("utf-8")
+        except UnicodeDecodeError:
+            return {"base64": base64.b64encode(data).decode("ascii")}
+    if hasattr(value, "tolist"):
+        # numpy arrays and scalars, array.array, ...
+        return jsonable(value.tolist())
+    return str(value)
+
+
+def dumps(value):
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def size(value):
+    return len(dumps(value).encode("utf-8"))
+
+
+def fitting_prefix(items, budget):
+    """How many leading items of a list fit in `budget` encoded bytes."""
+    low, high = 0, len(items)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if size(items[:middle]) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def shrink(value, budget):
+    """Cut plain JSON data down to roughly `budget` encoded bytes, marking what was left out."""
+    if size(value) <= budget:
+        return value
+    if isinstance(value, str):
+        encoded = value.encode("utf-8")
+        keep = max(0, budget - 40)
+        return encoded[:keep].decode("utf-8", errors="ignore") + f"...[{len(encoded) - keep} more bytes]"
+    if isinstance(value, list):
+        items = value[: fitting_prefix(value, budget - 32)]
+        if not items and value:
+            items = [shrink(value[0], budget - 32)]
+        return items + [f"...{len(value) - len(items)} more items"]
+    if isinstance(value, dict):
+        kept, used = {}, 2
+        for index, (key, item) in enumerate(value.items()):
+            remaining = budget - used - len(key) - 40
+            if remaining <= 0:
+                kept["..."] = f"{len(value) - index} more keys"
+                break
+            item = shrink(item, remaining)
+            kept[key] = item
+            used += size(item) + len(key) + 4
+        return kept
+    return value
+
+
+class ToolOutputEncoder:
+    def __init__(self, max_bytes=16_000, run_max_bytes=48_000, max_tokens=None, run_max_tokens=None, spill_dir=None, keep_pages=256):
+        self.max_bytes = max_tokens * BYTES_PER_TOKEN if max_tokens else max_bytes
+        self.run_max_bytes = run_max_tokens * BYTES_PER_TOKEN if run_max_tokens else run_max_bytes
+        self.spill_dir = spill_dir
+        self.keep_pages = keep_pages
+        # owner (the manager) -> {handle: full value of an output that was cut}, most recent last
+        self.pages = weakref.WeakKeyDictionary()
+        self.lock = threading.Lock()
+
+    def encode_run(self, invocations, owner=None):
+        """The tool outputs of one run, in order, each within its own budget and together within the run budget.
+
+        Handles of cut outputs are kept for `owner`, usually the manager the tools belong to.
+        """
+        payloads = [self.payload(invocation.output) for invocation in invocations]
+        budgets = [self.tool_budget(invocation) for invocation in invocations]
+        sizes = [size(payload) for payload in payloads]
+        if self.run_max_bytes and sum(min(s, b) for s, b in zip(sizes, budgets)) > self.run_max_bytes:
+            budgets = self.share(sizes, budgets)
+        return [
+            {"tool_call_id": invocation.tool_call.id, "output": self.encode(payload, budget, known_size=known, owner=owner)}
+            for invocation, payload, budget, known in zip(invocations, payloads, budgets, sizes)
+        ]
+
+    def payload(self, output):
+        if isinstance(output, dict) and ("result" in output or "error" in output):
+            return {key: jsonable(value) for key, value in output.items()}
+        return {"result": jsonable(output)}
+
+    def tool_budget(self, invocation):
+        options = getattr(invocation, "options", None)
+        budget = getattr(options, "max_output_bytes", None)
+        return budget or self.max_bytes
+
+    def share(self, sizes, budgets):
+        # Small outputs keep what they need, the rest split what is left of the run budget evenly
+        shared = list(budgets)
+        remaining = self.run_max_bytes
+        order = sorted(range(len(sizes)), key=lambda index: min(sizes[index], budgets[index]))
+        for position, index in enumerate(order):
+            fair = remaining // (len(order) - position)
+            shared[index] = max(ENVELOPE_BYTES * 2, min(sizes[index], budgets[index], fair))
+            remaining -= shared[index]
+        return shared
+
+    def encode(self, payload, budget=None, known_size=None, owner=None):
+        budget = budget or self.max_bytes
+        total = known_size if known_size is not None else size(payload)
+        if total <= budget:
+            return dumps(payload)
+
+        key = "result" if "result" in payload else "error"
+        handle = self.keep(payload[key], owner)
+        envelope = {"truncated": True, "original_bytes": total, "handle": handle}
+        room = budget - ENVELOPE_BYTES
+        if self.spill_dir is not None:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            path = os.path.join(self.spill_dir, f"{handle}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(dumps(payload))
+            envelope["spilled_to"] = path
+            # The path is part of the output, so it comes out of the value's share
+            room -= size({"spilled_to": path})
+        return dumps({key: shrink(payload[key], room), **envelope})
+
+    def keep(self, value, owner=None):
+        handle = uuid.uuid4().hex[:12]
+        with self.lock:
+            pages = self.pages.setdefault(_UNSCOPED if owner is None else owner, OrderedDict())
+            pages[handle] = value
+            while len(pages) > self.keep_pages:
+                pages.popitem(last=False)
+        return handle
+
+    def forget(self, owner):
+        """Drop every page kept for `owner`, e.g. when its manager closes."""
+        with self.lock:
+            self.pages.pop(owner, None)
+
+    def page(self, handle, offset=0, owner=None):
+        """The part of a cut output from `offset` on (items for lists, characters for strings), within the tool budget."""
+        with self.lock:
+            value = self.pages.get(_UNSCOPED if owner is None else owner, {}).get(handle)
+        if value is None:
+            return {"error": f"Unknown or expired output handle {handle}."}
+        budget = self.max_bytes - ENVELOPE_BYTES
+        if isinstance(value, list):
+            part = value[offset : offset + max(1, fitting_prefix(value[offset:], budget))]
+        elif isinstance(value, str):
+            part = value[offset:].encode("utf-8")[:budget].decode("utf-8", errors="ignore")
+        else:
+            return {"result": shrink(value, budget)}
+        following = offset + len(part)
+        return {"result": part, "offset": offset, "next_offset": following if following < len(value) else None}
+
+
+class ToolOutputPager:
+    """Mixin for BaseManager subclasses that lets the model read the rest of a truncated tool output."""
+
+    def read_tool_output(self, handle: str, offset: int = 0):
+        """Read more of a truncated tool output, given its handle and the offset to continue from."""
+        dispatcher = self.assistant_manager.chat.strategy.dispatcher
+        return dispatcher.encoder.page(handle, offset, owner=self)
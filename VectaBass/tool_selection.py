@@ -0,0 +1,194 @@
+# tool_selection.py
+"""
+Per message tool selection, so a run only carries the tools relevant to what was asked.
+
+A ToolSelector indexes the tool schemas (names, descriptions, parameter and field names, enum
+values) offline and keeps the `top_k` best matches for each incoming message, plus the pinned
+tools, which are always sent. Matching is BM25 over keywords by default; pass `embed`, a function
+turning a list of texts into vectors, to rank by cosine similarity with a local embedding model
+instead. Indexes are keyed on the tools' method names and descriptions, without the manager name the
+registry put in front of them, so every instance of an agent class shares one index, built once.
+
+Managers opt in with a `tool_selector` class attribute (or the strategies' `tool_selector`
+argument); the selected tools are passed as the run's `tools`, overriding the assistant's list for
+that run only. Pin tools by name on the selector or with the `pin_tool` decorator. A message that
+matches nothing gets every tool, as does a manager with no more than `top_k` tools.
+"""
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+
+_WORDS = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+# Manager identifiers in tool names carry a uuid, which says nothing about the tool
+_IDENTIFIER = re.compile(r"^[0-9a-f]{32}$")
+# "<agent>_<uuid>_<method>" up to the method name, for tools given without their registry
+_INSTANCE_PREFIX = re.compile(r"^.*_[0-9a-f]{32}_")
+
+
+def pin_tool(method):
+    """Always send this tool, whatever the message."""
+    method.__pinned_tool__ = True
+    return method
+
+
+def is_pinned_tool(method):
+    return getattr(getattr(method, "__func__", method), "__pinned_tool__", False)
+
+
+def select_tools(selector, messages, tools, registry=None):
+    """`tools` narrowed down to what the text of `messages` calls for, or unchanged without a selector."""
+    if selector is None or not tools:
+        return tools
+    text = "\n".join(message for message in messages if isinstance(message, str))
+    return selector.select(text, tools, registry)
+
+
+def tokenize(text):
+    # snake_case, camelCase and plain words alike, with plurals folded so "orders" finds `get_order`
+    words = [word.lower() for part in re.split(r"[^0-9A-Za-z]+", text or "") if not _IDENTIFIER.match(part) for word in _WORDS.findall(part)]
+    return [word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word for word in words]
+
+
+def tool_key(name, registry=None):
+    """A tool name without the manager identifier it was registered under."""
+    if registry is not None:
+        # Registered as "<owner name>_<method name>", whatever the owner's identifier looks like
+        owner = registry.method_owners.get(name, registry.parent.name)
+        if name.startswith(f"{owner}_"):
+            return name[len(owner) + 1 :]
+    return _INSTANCE_PREFIX.sub("", name, count=1)
+
+
+def tool_function(tool):
+    # Registry schemas are dicts, the assistant's tools are API objects
+    function = tool["function"] if isinstance(tool, dict) else tool.function
+    if isinstance(function, dict):
+        return function["name"], function.get("description") or "", function.get("parameters") or {}
+    return function.name, function.description or "", function.parameters or {}
+
+
+def schema_words(schema):
+    # Property names, descriptions and enum values, through nested objects, arrays and $defs
+    words = []
+    if isinstance(schema, dict):
+        for name, value in schema.get("properties", {}).items():
+            words.append(name)
+            words.extend(schema_words(value))
+        for key in ("items", "additionalProperties"):
+            words.extend(schema_words(schema.get(key)))
+        for value in schema.get("$defs", {}).values():
+            words.extend(schema_words(value))
+        words.extend(str(value) for value in schema.get("enum", ()))
+        if schema.get("description"):
+            words.append(schema["description"])
+    return words
+
+
+def tool_document(tool, registry=None):
+    name, description, parameters = tool_function(tool)
+    return " ".join([tool_key(name, registry), description, *schema_words(parameters)])
+
+
+class BM25Index:
+    def __init__(self, documents, k1=1.5, b=0.75):
+        terms = [Counter(tokenize(document)) for document in documents]
+        lengths = [sum(counts.values()) for counts in terms]
+        average_length = (sum(lengths) / len(lengths) if lengths else 0.0) or 1.0
+        self.size = len(terms)
+        # term -> [(document position, term weight)], so a query only visits the documents it matches
+        self.postings = {}
+        for position, (counts, length) in enumerate(zip(terms, lengths)):
+            norm = k1 * (1 - b + b * length / average_length)
+            for term, count in counts.items():
+                self.postings.setdefault(term, []).append((position, count * (k1 + 1) / (count + norm)))
+        self.idf = {term: math.log(1 + (self.size - len(postings) + 0.5) / (len(postings) + 0.5)) for term, postings in self.postings.items()}
+
+    def scores(self, query):
+        scores = [0.0] * self.size
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is not None:
+                for position, weight in self.postings[term]:
+                    scores[position] += idf * weight
+        return scores
+
+
+class EmbeddingIndex:
+    def __init__(self, documents, embed):
+        self.embed = embed
+        self.vectors = [self.normalize(vector) for vector in embed(list(documents))]
+
+    @staticmethod
+    def normalize(vector):
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def scores(self, query):
+        query = self.normalize(self.embed([query])[0])
+        return [sum(a * b for a, b in zip(query, vector)) for vector in self.vectors]
+
+
+class ToolSelector:
+    """Keeps the `top_k` tools best matching a message, plus the pinned ones.
+
+    `pinned` takes tool names, matched as full identifiers or as the method name they end with.
+    Scores at or below `min_score` never select a tool.
+    """
+
+    def __init__(self, top_k=8, pinned=(), embed=None, min_score=0.0, cache_size=8):
+        self.top_k = top_k
+        self.pinned = set(pinned)
+        self.embed = embed
+        self.min_score = min_score
+        self.cache_size = cache_size
+        # instance independent tool list key -> (index, pinned positions); a selector set on a class
+        # serves every instance, positions map back to each instance's own tool list
+        self._indexes = OrderedDict()
+        self.lock = threading.Lock()
+
+    def pin(self, *names):
+        with self.lock:
+            self.pinned.update(names)
+            self._indexes.clear()
+
+    def unpin(self, *names):
+        with self.lock:
+            self.pinned.difference_update(names)
+            self._indexes.clear()
+
+    def select(self, text, tools, registry=None):
+        """The tools to send for a message, in their original order."""
+        tools = list(tools or ())
+        if len(tools) <= self.top_k:
+            return tools
+        index, pinned = self.index(tools, registry)
+        ranked = sorted((-score, position) for position, score in enumerate(index.scores(text)) if score > self.min_score)
+        if not ranked:
+            return tools
+        chosen = set(pinned)
+        chosen.update(position for _, position in ranked[: self.top_k])
+        return [tool for position, tool in enumerate(tools) if position in chosen]
+
+    def index(self, tools, registry=None):
+        functions = [tool_function(tool) for tool in tools]
+        key = tuple((tool_key(name, registry), description) for name, description, _ in functions)
+        with self.lock:
+            cached = self._indexes.get(key)
+            if cached is not None:
+                self._indexes.move_to_end(key)
+                return cached
+        documents = [tool_document(tool, registry) for tool in tools]
+        index = EmbeddingIndex(documents, self.embed) if self.embed else BM25Index(documents)
+        pinned = {position for position, (name, _, _) in enumerate(functions) if self.is_pinned(name, registry)}
+        with self.lock:
+            self._indexes[key] = (index, pinned)
+            while len(self._indexes) > self.cache_size:
+                self._indexes.popitem(last=False)
+        return index, pinned
+
+    def is_pinned(self, name, registry=None):
+        if name in self.pinned or any(name.endswith(f"_{pinned}") for pinned in self.pinned):
+            return True
+        entry = registry.lookup(name) if registry is not None else None
+        return entry is not None and is_pinned_tool(entry.method)
@@ -0,0 +1,30 @@
+"""
+Runs the whole benchmark suite.
+
+    python -m benchmarks [--json results.json]
+"""
+import argparse
+import json
+
+from . import bench_agent_loop, bench_dispatch, bench_memory, bench_registry, bench_startup
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VectaBass hot path benchmarks")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    results = {
+        "dispatch": bench_dispatch.main(),
+        "registry": bench_registry.main(),
+        "agent_loop": bench_agent_loop.main(),
+        "memory": bench_memory.main(),
+        "startup": bench_startup.main(),
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+End-to-end turns per second against the in-process fake backend, for the Assistants API strategies and
+the chat completions one. The latency rows give every API call a fixed round trip.
+
+    python -m benchmarks.bench_agent_loop
+"""
+import asyncio
+
+from VectaBass.agents.base_manager import BaseManager
+from VectaBass.fake_openai import FakeAsyncOpenAI, FakeBackend, FakeOpenAI, ToolCallResponder
+from VectaBass.run_completion import AsyncPollingCompletion, Backoff, PollingCompletion, StreamingCompletion
+
+from .common import Timer, quiet, report
+
+
+class LoopAgent(BaseManager):
+    def lookup(self, key: str):
+        return key.upper()
+
+
+def sync_turns(turns, completion=None, responder=None, run_duration=0.0, api_latency=0.0, chat_api="assistants"):
+    backend = FakeBackend(run_duration=run_duration, api_latency=api_latency, responder=responder)
+    with quiet():
+        agent = LoopAgent("loop", client=FakeOpenAI(backend), chat_api=chat_api)
+        if completion is not None:
+            agent.assistant_manager.chat.strategy.completion = completion
+        with Timer() as timer:
+            for i in range(turns):
+                agent.assistant_manager.send_message(f"turn {i}")
+    return turns / timer.elapsed, backend
+
+
+def async_turns(agents, turns, run_duration=0.0):
+    backend = FakeBackend(run_duration=run_duration)
+    with quiet():
+        managers = [LoopAgent("loop", asynchronous=True, client=FakeAsyncOpenAI(backend)) for _ in range(agents)]
+        for manager in managers:
+            manager.assistant_manager.chat.strategy.completion = AsyncPollingCompletion(Backoff(initial=0.005, maximum=0.05))
+
+        async def converse(manager):
+            for i in range(turns):
+                await manager.assistant_manager.send_message(f"turn {i}")
+
+        async def main():
+            await asyncio.gather(*(converse(manager) for manager in managers))
+
+        with Timer() as timer:
+            asyncio.run(main())
+    return agents * turns / timer.elapsed, backend
+
+
+def main(turns=50, agents=200):
+    polling = PollingCompletion(Backoff(initial=0.001, maximum=0.01))
+    tool_responder = ToolCallResponder([("lookup", {"key": "a"}), ("lookup", {"key": "b"})])
+    rows = {}
+    rate, backend = sync_turns(turns, polling)
+    rows["sync polling turns/s"] = f"{rate:10.1f}  ({sum(backend.calls.values()) / turns:.1f} API calls/turn)"
+    rate, backend = sync_turns(turns, polling, tool_responder)
+    rows["sync polling, 2 tool calls turns/s"] = f"{rate:10.1f}  ({sum(backend.calls.values()) / turns:.1f} API calls/turn)"
+    rate, backend = sync_turns(turns, StreamingCompletion(), tool_responder)
+    rows["sync streaming, 2 tool calls turns/s"] = f"{rate:10.1f}  ({sum(backend.calls.values()) / turns:.1f} API calls/turn)"
+    rate, backend = sync_turns(turns, None, tool_responder, chat_api="chat_completions")
+    rows["sync completions, 2 tool calls turns/s"] = f"{rate:10.1f}  ({sum(backend.calls.values()) / turns:.1f} API calls/turn)"
+    for label, chat_api, completion in (("streaming", "assistants", StreamingCompletion()), ("completions", "chat_completions", None)):
+        rate, backend = sync_turns(10, completion, tool_responder, api_latency=0.02, chat_api=chat_api)
+        rows[f"{label}, 20 ms RTT, 2 tool calls turns/s"] = f"{rate:10.1f}  ({sum(backend.calls.values()) / 10:.1f} API calls/turn)"
+    rate, backend = async_turns(agents, 5, run_duration=0.05)
+    rows[f"async, {agents} agents x 5 turns turns/s"] = f"{rate:10.1f}  ({backend.calls['threads.runs.retrieve'] / (agents * 5):.1f} polls/turn)"
+    report("Agent loop", rows)
+    return rows
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Per-call tool dispatch overhead: the legacy per-call reflection path against the precompiled binders.
+
+    python -m benchmarks.bench_dispatch
+"""
+import json
+import timeit
+from types import SimpleNamespace
+from typing import Dict, List
+
+from pydantic import BaseModel
+
+from VectaBass.registry import Registry
+from VectaBass.tool_dispatch import resolve_tool_call
+
+from .common import quiet, report
+
+
+class Address(BaseModel):
+    street: str
+    city: str
+
+
+class Customer(BaseModel):
+    name: str
+    age: int
+    address: Address
+
+
+class CRM:
+    name = "crm"
+    identifier = "crm"
+
+    def __init__(self):
+        self.assistant_manager = SimpleNamespace(chat=SimpleNamespace(add_tool=lambda config, tools_to_remove: None))
+        self.registry = Registry(self)
+
+    def add_customer(self, customer: Customer, tags: List[str], scores: Dict[str, int]):
+        return customer.name
+
+
+def legacy_resolve(manager, tool_call):
+    """The reflection based argument handling process_tool_calls used before binders."""
+    arguments = json.loads(tool_call.function.arguments)
+    method_details = manager.registry.methods.get(tool_call.function.name) or manager.registry.model_methods.get(tool_call.function.name)
+    owner = method_details.method.__self__
+    method = getattr(owner, method_details.method.__name__)
+    method_args = {}
+    for arg_name, arg_value in arguments.items():
+        model_class = method_details.annotations.get(arg_name)
+        if model_class and isinstance(model_class, type) and issubclass(model_class, BaseModel):
+            method_args[arg_name] = model_class(**arg_value)
+        else:
+            method_args[arg_name] = arg_value
+    return method, method_args
+
+
+def main(number=20000):
+    with quiet():
+        manager = CRM()
+    arguments = {"customer": {"name": "Ada", "age": 36, "address": {"street": "1 Loop", "city": "London"}}, "tags": ["vip"], "scores": {"q1": 3}}
+    tool_call = SimpleNamespace(id="call_1", function=SimpleNamespace(name="crm_add_customer", arguments=json.dumps(arguments)))
+
+    with quiet():
+        legacy = timeit.timeit(lambda: legacy_resolve(manager, tool_call), number=number)
+        binder = timeit.timeit(lambda: resolve_tool_call(manager, tool_call), number=number)
+
+    rows = {"legacy reflection us/call": f"{legacy / number * 1e6:8.2f}", "compiled binder us/call": f"{binder / number * 1e6:8.2f}"}
+    report("Tool dispatch overhead", rows)
+    return rows
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Memory retained per BaseManager instance, booted against the fake backend.
+
+    python -m benchmarks.bench_memory
+"""
+import gc
+import tracemalloc
+
+from VectaBass.agents.base_manager import BaseManager
+from VectaBass.fake_openai import FakeBackend, FakeOpenAI
+
+from .common import Timer, quiet, report
+
+
+class MemoryAgent(BaseManager):
+    def remember(self, fact: str):
+        return fact
+
+
+def main(counts=(1, 10, 100, 1000)):
+    rows = {}
+    for count in counts:
+        client = FakeOpenAI(FakeBackend())
+        with quiet():
+            gc.collect()
+            tracemalloc.start()
+            before = tracemalloc.get_traced_memory()[0]
+            with Timer() as timer:
+                agents = [MemoryAgent("memory", client=client).start() for _ in range(count)]
+            gc.collect()
+            after = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+        rows[f"{count:>5} agents"] = f"{(after - before) / count / 1024:8.1f} KiB/agent, boot {timer.elapsed / count * 1e3:7.2f} ms/agent"
+        del agents
+    report("Memory per agent (includes fake backend state)", rows)
+    return rows
+
+
+if __name__ == "__main__":
+    main()
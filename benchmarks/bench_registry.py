@@ -0,0 +1,85 @@
+"""
+Registry construction and tool schema build time against the number of registered methods, and
+how much of the schema per message tool selection sends.
+
+    python -m benchmarks.bench_registry
+"""
+import json
+from types import SimpleNamespace
+from typing import List
+
+from pydantic import BaseModel
+
+from VectaBass.registry import Registry
+from VectaBass.tool_selection import ToolSelector
+
+from .common import Timer, quiet, report
+
+
+class Filters(BaseModel):
+    field: str
+    values: List[str]
+
+
+def make_manager_class(methods):
+    def make_method(i):
+        def method(self, query: str, filters: Filters, limit: int = 10):
+            """Look things up."""
+            return query
+
+        method.__name__ = f"tool_{i}"
+        return method
+
+    namespace = {f"tool_{i}": make_method(i) for i in range(methods)}
+    return type(f"Manager{methods}", (), namespace)
+
+
+def build(manager_class):
+    manager = manager_class()
+    manager.name = manager.identifier = "bench"
+    manager.assistant_manager = SimpleNamespace(chat=SimpleNamespace(add_tool=lambda config, tools_to_remove: None))
+    manager.registry = Registry(manager)
+    return manager
+
+
+def churn(manager, cycles=200):
+    # Per tenant model linked to a handful of methods, then dropped again
+    registry = manager.registry
+    methods = [getattr(manager, f"tool_{i}") for i in range(5)]
+    for cycle in range(cycles):
+        model = type(f"Tenant{cycle}", (BaseModel,), {"__annotations__": {"tenant": str}})
+        with registry.batch():
+            registry.register_model(model.__name__, model)
+            registry.link_model_to_methods(model.__name__, methods)
+        registry.unregister_model(model.__name__)
+
+
+def main(sizes=(10, 100, 1000)):
+    rows = {}
+    with quiet():
+        for size in sizes:
+            manager_class = make_manager_class(size)
+            with Timer() as cold:
+                manager = build(manager_class)
+            with Timer() as warm:
+                build(manager_class)
+            with Timer() as regenerate:
+                schema = manager.registry.generate_json_schema()
+            selector = ToolSelector(top_k=8)
+            selector.index(schema)
+            with Timer() as selecting:
+                selected = selector.select("run tool 7 on this query", schema)
+            sent = len(json.dumps(selected)) / len(json.dumps(schema))
+            with Timer() as linking:
+                churn(manager)
+            rows[f"{size:>5} methods"] = (
+                f"first build {cold.elapsed * 1e3:8.2f} ms, next instance {warm.elapsed * 1e3:8.2f} ms, schema regen {regenerate.elapsed * 1e3:7.3f} ms, "
+                f"link+unlink {linking.elapsed / 200 * 1e3:7.3f} ms, {len(manager.registry.methods)} entries after, "
+                f"selection {selecting.elapsed * 1e3:7.3f} ms for {len(selected)} tools ({sent:6.1%} of the schema)"
+            )
+    report("Registry and schema build", rows)
+    return rows
+
+
+if __name__ == "__main__":
+    main()
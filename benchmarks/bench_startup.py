@@ -0,0 +1,64 @@
+"""
+Import time of the package and boot time of N agents against a fake backend with API latency.
+
+    python -m benchmarks.bench_startup
+"""
+import asyncio
+import os
+import subprocess
+import sys
+
+from VectaBass.agents.base_manager import BaseManager, aboot_many, boot_many
+from VectaBass.fake_openai import FakeAsyncOpenAI, FakeBackend, FakeOpenAI
+
+from .common import Timer, quiet, report
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import VectaBass.agents.base_manager; print(time.perf_counter() - t)"
+
+
+class BootAgent(BaseManager):
+    def lookup(self, key: str):
+        return key
+
+    def store(self, key: str, value: str):
+        return value
+
+
+def import_time(runs=5):
+    env = {**os.environ, "PYTHONPATH": REPO_ROOT}
+    samples = [float(subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], env=env, capture_output=True, text=True, check=True).stdout) for _ in range(runs)]
+    return min(samples)
+
+
+def boot(count, mode, api_latency):
+    backend = FakeBackend(api_latency=api_latency)
+    asynchronous = mode == "aboot_many"
+    client = FakeAsyncOpenAI(backend) if asynchronous else FakeOpenAI(backend)
+    with quiet():
+        with Timer() as timer:
+            managers = [BootAgent("boot", asynchronous=asynchronous, client=client) for _ in range(count)]
+            if mode == "sequential":
+                for manager in managers:
+                    manager.start()
+            elif mode == "boot_many":
+                boot_many(managers)
+            else:
+                asyncio.run(aboot_many(managers))
+    writes = backend.calls["assistants.create"] + backend.calls["assistants.update"]
+    return f"{timer.elapsed * 1e3:9.1f} ms  ({writes / count:.1f} writes/agent)"
+
+
+def main(counts=(10, 100, 500), api_latency=0.005):
+    rows = {"import VectaBass.agents.base_manager": f"{import_time() * 1e3:9.1f} ms"}
+    for count in counts:
+        for mode in ("sequential", "boot_many", "aboot_many"):
+            if mode == "sequential" and count > 100:
+                continue
+            rows[f"{count:>4} agents, {mode}"] = boot(count, mode, api_latency)
+    report(f"Startup ({api_latency * 1e3:.0f} ms API latency)", rows)
+    return rows
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+import contextlib
+import io
+import time
+
+
+@contextlib.contextmanager
+def quiet():
+    """Swallow the framework's console output so it does not skew timings."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+class Timer:
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.started
+
+
+def report(title, rows):
+    print(f"\n{title}")
+    for label, value in rows.items():
+        print(f"  {label:<40} {value}")